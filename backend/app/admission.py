@@ -0,0 +1,275 @@
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from app.config import settings
+from app.metrics import Counter, Gauge, Histogram
+
+admission_in_flight = Gauge(
+    "admission_in_flight",
+    "Requests admitted and running, by route class",
+    ["route_class"],
+)
+admission_queue_depth = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for admission, by route class",
+    ["route_class"],
+)
+admission_rejected = Counter(
+    "admission_rejected_total",
+    "Requests shed with 503, by route class and reason (queue_full, timeout, loop_lag)",
+    ["route_class", "reason"],
+)
+admission_queue_wait = Histogram(
+    "admission_queue_wait_seconds",
+    "Time requests spent queued before being admitted",
+    ["route_class"],
+)
+event_loop_lag = Gauge(
+    "event_loop_lag_seconds",
+    "How late the event loop runs a timer (smoothed)",
+)
+
+
+@dataclass
+class RouteClass:
+    name: str
+    priority: int  # lower runs first when slots free up
+    share: float  # fraction of ADMISSION_MAX_CONCURRENCY this class may use
+    max_queue: int
+    queue_timeout: float  # seconds
+    shed_on_lag: bool = False  # rejected outright while the event loop lags
+    in_flight: int = field(default=0, init=False)
+    queued: int = field(default=0, init=False)
+
+    def limit(self, total: int) -> int:
+        return max(1, int(total * self.share))
+
+
+# Checkout and auth can always use every slot; lower classes leave headroom for them
+ROUTE_CLASSES: Dict[str, RouteClass] = {
+    "critical": RouteClass("critical", 0, 1.0, 200, 10.0),
+    "admin": RouteClass("admin", 1, 0.25, 20, 5.0),
+    "default": RouteClass("default", 1, 0.75, 100, 5.0),
+    "catalog": RouteClass("catalog", 2, 0.75, 100, 2.0, shed_on_lag=True),
+}
+
+# (methods or None for any, path prefix, class); first match wins
+ROUTE_CLASS_RULES: List[Tuple[Optional[Set[str]], str, str]] = [
+    (None, "/api/auth", "critical"),
+    (None, "/api/cart", "critical"),
+    ({"POST"}, "/api/orders", "critical"),
+    (None, "/api/orders/summary", "admin"),
+    (None, "/api/orders/metrics", "admin"),
+    (None, "/api/orders/all", "admin"),
+    (None, "/api/admin", "admin"),
+    (None, "/api/products/import", "admin"),
+    (None, "/api/products/pricing", "admin"),
+    ({"GET", "HEAD"}, "/api/products", "catalog"),
+    ({"GET", "HEAD"}, "/api/categories", "catalog"),
+    ({"GET", "HEAD"}, "/api/upload", "catalog"),
+]
+
+# Probes and scrapes must answer even when everything else is shed; event
+# streams stay open for minutes and would hold a slot the whole time
+EXEMPT_PREFIXES = ("/api/health", "/metrics", "/docs", "/redoc", "/openapi.json", "/api/orders/events")
+
+
+def classify(method: str, path: str, authenticated: bool) -> Optional[str]:
+    """Route class for a request, or None when it bypasses admission"""
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    for methods, prefix, name in ROUTE_CLASS_RULES:
+        if path.startswith(prefix) and (methods is None or method in methods):
+            # Signed-in shoppers browse ahead of anonymous traffic
+            return "default" if name == "catalog" and authenticated else name
+    return "default"
+
+
+class LoopLagMonitor:
+    """Measure event loop responsiveness: a timer that should fire every
+    `interval` seconds and how late it actually fires"""
+
+    def __init__(self, interval: float = 0.25, alpha: float = 0.3):
+        self.interval = interval
+        self.alpha = alpha
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            sample = max(0.0, time.perf_counter() - expected)
+            self.lag = self.alpha * sample + (1 - self.alpha) * self.lag
+            event_loop_lag.set(self.lag)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+loop_monitor = LoopLagMonitor()
+
+
+class AdmissionController:
+    """Per-worker concurrency limit with per-class caps, bounded queues and
+    priority hand-off: a freed slot goes to the highest-priority waiter"""
+
+    def __init__(self, max_concurrency: int, classes: Dict[str, RouteClass]):
+        self.max_concurrency = max_concurrency
+        self.classes = classes
+        self.in_flight = 0
+        self._waiters: Dict[int, Deque[Tuple[RouteClass, asyncio.Future]]] = {}
+        for route_class in classes.values():
+            self._waiters.setdefault(route_class.priority, deque())
+
+    def _has_capacity(self, route_class: RouteClass) -> bool:
+        return (
+            self.in_flight < self.max_concurrency
+            and route_class.in_flight < route_class.limit(self.max_concurrency)
+        )
+
+    def _waiting_ahead(self, route_class: RouteClass) -> bool:
+        """Whether a queued request of equal or higher priority could take a slot now"""
+        for priority, queue in self._waiters.items():
+            if priority > route_class.priority:
+                continue
+            for waiting_class, future in queue:
+                if not future.done() and waiting_class.in_flight < waiting_class.limit(self.max_concurrency):
+                    return True
+        return False
+
+    def _grant(self, route_class: RouteClass):
+        self.in_flight += 1
+        route_class.in_flight += 1
+        admission_in_flight.set(route_class.in_flight, route_class=route_class.name)
+
+    async def acquire(self, route_class: RouteClass) -> Optional[str]:
+        """Wait for a slot; returns None when admitted or the rejection reason"""
+        if route_class.shed_on_lag and loop_monitor.lag * 1000 > settings.admission_max_loop_lag_ms:
+            return "loop_lag"
+        if self._has_capacity(route_class) and not self._waiting_ahead(route_class):
+            self._grant(route_class)
+            return None
+        if route_class.queued >= route_class.max_queue:
+            return "queue_full"
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (route_class, future)
+        queue = self._waiters[route_class.priority]
+        queue.append(waiter)
+        route_class.queued += 1
+        admission_queue_depth.set(route_class.queued, route_class=route_class.name)
+        started = time.perf_counter()
+        self._wake()
+        try:
+            await asyncio.wait_for(future, route_class.queue_timeout)
+        except asyncio.TimeoutError:
+            return "timeout"
+        except BaseException:
+            # Client went away; hand the slot on if it was granted meanwhile
+            if future.done() and not future.cancelled():
+                self.release(route_class)
+            raise
+        finally:
+            if waiter in queue:
+                queue.remove(waiter)
+            route_class.queued -= 1
+            admission_queue_depth.set(route_class.queued, route_class=route_class.name)
+        admission_queue_wait.observe(time.perf_counter() - started, route_class=route_class.name)
+        return None
+
+    def release(self, route_class: RouteClass):
+        self.in_flight -= 1
+        route_class.in_flight -= 1
+        admission_in_flight.set(route_class.in_flight, route_class=route_class.name)
+        self._wake()
+
+    def _wake(self):
+        for priority in sorted(self._waiters):
+            queue = self._waiters[priority]
+            for waiter in list(queue):
+                if self.in_flight >= self.max_concurrency:
+                    return
+                route_class, future = waiter
+                if future.done():
+                    continue
+                if route_class.in_flight < route_class.limit(self.max_concurrency):
+                    queue.remove(waiter)
+                    self._grant(route_class)
+                    future.set_result(True)
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "classes": {
+                name: {
+                    "in_flight": c.in_flight,
+                    "limit": c.limit(self.max_concurrency),
+                    "queued": c.queued,
+                    "max_queue": c.max_queue,
+                }
+                for name, c in self.classes.items()
+            },
+        }
+
+    def saturated(self) -> List[str]:
+        """Classes whose queue is full, i.e. currently shedding"""
+        return [name for name, c in self.classes.items() if c.queued >= c.max_queue]
+
+
+admission = AdmissionController(settings.admission_max_concurrency, ROUTE_CLASSES)
+
+
+class AdmissionMiddleware:
+    """Queue or shed requests by route class before they reach a handler"""
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+        self.body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.admission_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        authenticated = any(name == b"authorization" for name, _ in scope["headers"])
+        name = classify(scope["method"], scope["path"], authenticated)
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.controller.classes[name]
+        rejected = await self.controller.acquire(route_class)
+        if rejected is not None:
+            admission_rejected.inc(route_class=name, reason=rejected)
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(self.body)).encode()),
+                    (b"retry-after", str(settings.admission_retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": self.body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.config import settings
+from app.database import get_database
+from app.metrics import Counter, Gauge, Histogram
+from app.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+# {product_id, day: "YYYY-MM-DD", views, add_to_cart, add_to_cart_units}
+PRODUCT_STATS_COLLECTION = "product_stats_daily"
+# {term (folded query), day, searches, zero_results}
+SEARCH_TERMS_COLLECTION = "search_terms_daily"
+# One document per search, kept ANALYTICS_SEARCH_RETENTION_DAYS (TTL)
+SEARCH_EVENTS_COLLECTION = "search_events"
+
+analytics_events = Counter("analytics_events_total", "Analytics events recorded", ["kind"])
+analytics_dropped = Counter(
+    "analytics_events_dropped_total", "Analytics events lost: buffer full or failed flush", ["kind", "reason"]
+)
+analytics_pending = Gauge("analytics_events_pending", "Analytics events waiting for the next flush")
+analytics_flush_duration = Histogram("analytics_flush_duration_seconds", "Time to write one analytics batch")
+
+# An event is (kind, key, amount, search results or None), recorded in the
+# request's capture list too (see capture_events)
+Event = Tuple[str, object, int, Optional[int]]
+_captured: ContextVar[Optional[list]] = ContextVar("analytics_captured", default=None)
+
+
+def capture_events() -> list:
+    """Collect the events recorded while handling the current request.
+
+    The response cache stores them with the response and replays them on a
+    hit, so views and searches served from cache are counted too.
+    """
+    events = []
+    _captured.set(events)
+    return events
+
+
+class AnalyticsCollector:
+    """Write-behind buffer for product views, add-to-carts and searches.
+
+    Recording only updates in-memory counters (no await, so no lock is needed
+    on the event loop); a background task writes them as one bulk_write of
+    $inc upserts per collection every ANALYTICS_FLUSH_INTERVAL_MS, or sooner
+    once ANALYTICS_FLUSH_EVENTS are pending. At most ANALYTICS_MAX_PENDING
+    events wait in memory; more are dropped and counted.
+    """
+
+    def __init__(self):
+        self._products: Dict[Tuple[ObjectId, str], List[int]] = {}
+        self._terms: Dict[Tuple[str, str], List[int]] = {}
+        self._searches: List[dict] = []
+        self.pending = 0
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def record_view(self, product_id: ObjectId):
+        self._record(("view", product_id, 1, None))
+
+    def record_add_to_cart(self, product_id: ObjectId, quantity: int):
+        self._record(("add_to_cart", product_id, quantity, None))
+
+    def record_search(self, query: str, results: int):
+        term = " ".join(tokenize(query))
+        if term:
+            self._record(("search", term, 1, results))
+
+    def replay(self, events: List[Event]):
+        for event in events:
+            self._add(event)
+
+    def _record(self, event: Event):
+        if not settings.analytics_enabled:
+            return
+        captured = _captured.get()
+        if captured is not None:
+            captured.append(event)
+        self._add(event)
+
+    def _add(self, event: Event):
+        kind, key, amount, results = event
+        if self.pending >= settings.analytics_max_pending:
+            analytics_dropped.inc(kind=kind, reason="buffer_full")
+            return
+        now = datetime.utcnow()
+        day = now.strftime("%Y-%m-%d")
+        if kind == "search":
+            counts = self._terms.setdefault((key, day), [0, 0])
+            counts[0] += 1
+            counts[1] += results == 0
+            self._searches.append({
+                "term": key,
+                "results": results,
+                "at": now,
+                "expires_at": now + timedelta(days=settings.analytics_search_retention_days),
+            })
+        else:
+            counts = self._products.setdefault((key, day), [0, 0, 0])
+            if kind == "view":
+                counts[0] += amount
+            else:
+                counts[1] += 1
+                counts[2] += amount
+        self.pending += 1
+        analytics_events.inc(kind=kind)
+        analytics_pending.set(self.pending)
+        if self.pending >= settings.analytics_flush_events:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of events"""
+        if not self.pending:
+            return 0
+        products, terms, searches, count = self._products, self._terms, self._searches, self.pending
+        self._products, self._terms, self._searches, self.pending = {}, {}, [], 0
+        analytics_pending.set(0)
+
+        started = time.perf_counter()
+        try:
+            database = get_database()
+            if products:
+                await database[PRODUCT_STATS_COLLECTION].bulk_write([
+                    UpdateOne(
+                        {"product_id": product_id, "day": day},
+                        {"$inc": {"views": views, "add_to_cart": adds, "add_to_cart_units": units}},
+                        upsert=True,
+                    )
+                    for (product_id, day), (views, adds, units) in products.items()
+                ], ordered=False)
+            if terms:
+                await database[SEARCH_TERMS_COLLECTION].bulk_write([
+                    UpdateOne(
+                        {"term": term, "day": day},
+                        {"$inc": {"searches": searches_count, "zero_results": zero_results}},
+                        upsert=True,
+                    )
+                    for (term, day), (searches_count, zero_results) in terms.items()
+                ], ordered=False)
+            if searches:
+                await database[SEARCH_EVENTS_COLLECTION].insert_many(searches, ordered=False)
+        except Exception:
+            # Retrying would let a MongoDB outage grow the buffer without bound
+            logger.exception("Could not write %d analytics events", count)
+            analytics_dropped.inc(count, kind="all", reason="flush_error")
+        analytics_flush_duration.observe(time.perf_counter() - started)
+        return count
+
+    async def _run(self):
+        interval = settings.analytics_flush_interval_ms / 1000
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        if settings.analytics_enabled and self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher after a last flush of what is buffered"""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+analytics = AnalyticsCollector()
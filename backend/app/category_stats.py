@@ -0,0 +1,119 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from pymongo import ReplaceOne, UpdateOne
+from app.response_cache import response_cache
+
+# One document per category, _id = category id. Counts include subcategories
+# (products are counted for every entry of their category_path), matching
+# what ?category= returns. min_price/max_price are absent for empty categories.
+STATS_COLLECTION = "category_stats"
+
+
+def stats_pipeline(category_ids: Optional[List] = None) -> List[dict]:
+    """Group products by every category on their path; all categories when ids is None"""
+    match = [] if category_ids is None else [{"$match": {"category_path": {"$in": category_ids}}}]
+    return match + [
+        {"$unwind": "$category_path"},
+        *match,
+        {"$group": {
+            "_id": "$category_path",
+            "product_count": {"$sum": 1},
+            "in_stock_count": {"$sum": {"$cond": [{"$gt": ["$stock", 0]}, 1, 0]}},
+            "min_price": {"$min": "$effective_price"},
+            "max_price": {"$max": "$effective_price"},
+        }},
+    ]
+
+
+def stats_document(category_id, stats: Optional[dict], now: datetime) -> dict:
+    doc = {"_id": category_id, "product_count": 0, "in_stock_count": 0, "updated_at": now}
+    if stats:
+        doc.update({field: value for field, value in stats.items() if value is not None})
+    return doc
+
+
+async def refresh_category_stats(database, category_ids: Iterable):
+    """Recompute stats for some categories from their products (bulk writes, moves)"""
+    category_ids = list({category_id for category_id in category_ids if category_id is not None})
+    if not category_ids:
+        return
+    cursor = database.products.aggregate(stats_pipeline(category_ids))
+    found = {stats["_id"]: stats async for stats in cursor}
+    now = datetime.utcnow()
+    await database[STATS_COLLECTION].bulk_write([
+        ReplaceOne({"_id": category_id}, stats_document(category_id, found.get(category_id), now), upsert=True)
+        for category_id in category_ids
+    ], ordered=False)
+    response_cache.invalidate("categories")
+
+
+async def refresh_price_bounds(database, category_id):
+    """Re-read min/max effective_price of one category from the (category_path, effective_price) index"""
+    bounds = {}
+    for field, direction in (("min_price", 1), ("max_price", -1)):
+        product = await database.products.find_one(
+            {"category_path": category_id}, {"effective_price": 1}, sort=[("effective_price", direction)]
+        )
+        if product is not None and product.get("effective_price") is not None:
+            bounds[field] = product["effective_price"]
+    update = {"$set": bounds} if bounds else {"$unset": {"min_price": "", "max_price": ""}}
+    await database[STATS_COLLECTION].update_one({"_id": category_id}, update)
+
+
+async def record_product_change(database, before: Optional[dict], after: Optional[dict]):
+    """Adjust stats for one product write; `before`/`after` are None on insert/delete.
+
+    Counts are $inc'ed and price bounds widened with $min/$max. Bounds can't
+    be narrowed that way, so categories the old price may have bounded are
+    re-read from the index.
+    """
+    deltas: Dict[object, Dict[str, int]] = defaultdict(lambda: {"product_count": 0, "in_stock_count": 0})
+    for doc, sign in ((before, -1), (after, 1)):
+        for category_id in (doc or {}).get("category_path", []):
+            deltas[category_id]["product_count"] += sign
+            deltas[category_id]["in_stock_count"] += sign * (doc.get("stock", 0) > 0)
+
+    after_path = set((after or {}).get("category_path", []))
+    after_price = (after or {}).get("effective_price")
+    now = datetime.utcnow()
+    operations = []
+    for category_id, delta in deltas.items():
+        update = {"$set": {"updated_at": now}, "$inc": delta}
+        if category_id in after_path and after_price is not None:
+            update["$min"] = {"min_price": after_price}
+            update["$max"] = {"max_price": after_price}
+        operations.append(UpdateOne({"_id": category_id}, update, upsert=True))
+    if operations:
+        await database[STATS_COLLECTION].bulk_write(operations, ordered=False)
+
+    if before is not None:
+        before_price = before.get("effective_price")
+        for category_id in before.get("category_path", []):
+            if category_id not in after_path or before_price != after_price:
+                await refresh_price_bounds(database, category_id)
+    response_cache.invalidate("categories")
+
+
+async def reconcile_category_stats(database) -> int:
+    """Rebuild every category's stats from the products; returns categories written"""
+    found = {stats["_id"]: stats async for stats in database.products.aggregate(stats_pipeline())}
+    category_ids = set(found)
+    async for category in database.categories.find({}, {"_id": 1}):
+        category_ids.add(category["_id"])
+
+    now = datetime.utcnow()
+    operations = [
+        ReplaceOne({"_id": category_id}, stats_document(category_id, found.get(category_id), now), upsert=True)
+        for category_id in category_ids
+    ]
+    if operations:
+        await database[STATS_COLLECTION].bulk_write(operations, ordered=False)
+    await database[STATS_COLLECTION].delete_many({"_id": {"$nin": list(category_ids)}})
+    response_cache.invalidate("categories")
+    return len(operations)
+
+
+async def get_category_stats(database, category_ids: List) -> Dict[object, dict]:
+    cursor = database[STATS_COLLECTION].find({"_id": {"$in": category_ids}})
+    return {stats["_id"]: stats async for stats in cursor}
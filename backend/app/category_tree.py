@@ -0,0 +1,56 @@
+from typing import List, Optional
+from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
+
+# Categories store `ancestors` (root first, excluding themselves); products store
+# `category_path` = their category's ancestors + the category, so one multikey
+# index answers "everything in this subtree".
+
+
+async def category_path(database, category_id: Optional[ObjectId]) -> List[ObjectId]:
+    """Ancestors of a category followed by the category itself ([] for none)"""
+    if category_id is None:
+        return []
+    category = await database.categories.find_one({"_id": category_id}, {"ancestors": 1})
+    if category is None:
+        raise ValueError("Category not found")
+    return category.get("ancestors", []) + [category_id]
+
+
+async def move_category(database, category: dict, parent_id: Optional[ObjectId]) -> List[ObjectId]:
+    """Rewrite the ancestors of a category and its subtree, and the
+    category_path of their products, for a new parent; returns the new ancestors"""
+    ancestors = await category_path(database, parent_id)
+    if category["_id"] in ancestors:
+        raise ValueError("A category cannot be moved under itself or its subcategories")
+
+    # Every affected path is old_ancestors + [category, ...]; swap the prefix
+    depth = len(category.get("ancestors", []))
+    subtree = [category] + await database.categories.find(
+        {"ancestors": category["_id"]}, {"ancestors": 1}
+    ).to_list(length=None)
+
+    category_operations, product_operations = [], []
+    for doc in subtree:
+        new_ancestors = ancestors + doc.get("ancestors", [])[depth:]
+        category_operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"ancestors": new_ancestors}}))
+        product_operations.append(
+            UpdateMany({"category": doc["_id"]}, {"$set": {"category_path": new_ancestors + [doc["_id"]]}})
+        )
+    await database.categories.bulk_write(category_operations, ordered=False)
+    await database.products.bulk_write(product_operations, ordered=False)
+    return ancestors
+
+
+def build_tree(categories: List[dict]) -> List[dict]:
+    """Nest categories (already sorted) under their parents. A category whose
+    parent is not in the list is left out, with its subtree."""
+    nodes = {category["_id"]: {**category, "children": []} for category in categories}
+    roots = []
+    for category in categories:
+        node = nodes[category["_id"]]
+        if category.get("parent") is None:
+            roots.append(node)
+        elif category["parent"] in nodes:
+            nodes[category["parent"]]["children"].append(node)
+    return roots
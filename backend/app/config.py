@@ -1,15 +1,145 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
     mongodb_url: str = "mongodb://localhost:27017"
     database_name: str = "product_catalog"
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 0
+    mongodb_max_idle_time_ms: Optional[int] = None
+    mongodb_wait_queue_timeout_ms: Optional[int] = None
+    mongodb_server_selection_timeout_ms: int = 30000
+    mongodb_connect_timeout_ms: int = 20000
+    mongodb_socket_timeout_ms: Optional[int] = None
+    mongodb_compressors: Optional[str] = None  # e.g. "zstd,snappy,zlib"
+    # Catalog reads (product/category listings). Secondaries (e.g.
+    # "secondaryPreferred") offload the primary, but a lagging one can refill
+    # the response cache with data older than the write that invalidated it
+    mongodb_catalog_read_preference: str = "primary"
+    mongodb_catalog_max_staleness_seconds: int = 90
+    # Log commands slower than this (0 disables the slow-query log)
+    mongodb_slow_query_ms: int = 100
+    mongodb_slow_query_log_chars: int = 1000
+    # Startup only logs pending indexes/migrations: `python manage_schema.py apply`
+    # runs them as a deploy step. Enable to apply them at startup (local development)
+    schema_auto_apply: bool = False
+    migration_batch_size: int = 1000
+
+    # In-process cache of anonymous catalog GET responses
+    response_cache_enabled: bool = True
+    response_cache_max_bytes: int = 32 * 1024 * 1024
+    # Also bounds how long other workers may serve data this worker changed
+    response_cache_ttl: int = 30
+
+    # On-demand profiling (admin X-Profile: 1 header, or 1-in-N sampling of a route)
+    profile_interval_ms: float = 2.0
+    profile_ring_size: int = 50
+    profile_sample_route: Optional[str] = None
+    profile_sample_every: int = 0
+
+    # Bulk product import: rows per bulk_write, per-row errors kept in the report
+    product_import_batch_size: int = 1000
+    product_import_max_errors: int = 1000
+    # Admission control: in-flight requests per worker, shared by route classes
+    # (see app/admission.py); anonymous catalog reads are shed while the event
+    # loop lags more than admission_max_loop_lag_ms
+    admission_enabled: bool = True
+    admission_max_concurrency: int = 64
+    admission_max_loop_lag_ms: float = 200.0
+    admission_retry_after: int = 2
+
+    # Background jobs (app/jobs.py): jobs run at once per queue in each worker,
+    # lease renewed while a job runs, retries with exponential backoff
+    jobs_enabled: bool = True
+    job_queues: Dict[str, int] = {"default": 4, "maintenance": 1}
+    job_poll_interval: float = 2.0
+    job_lease_seconds: int = 300
+    job_max_attempts: int = 5
+    job_retry_backoff: float = 10.0
+    job_retry_backoff_max: float = 3600.0
+    job_retention_seconds: int = 7 * 24 * 3600  # finished jobs are then deleted (TTL)
+    job_metrics_interval: int = 15
+
+    # Seconds between checks for sales due to start or end (0 disables the job)
+    pricing_schedule_interval: int = 30
+
+    # Seconds between full rebuilds of category_stats, correcting drift (0 disables)
+    category_stats_reconcile_interval: int = 3600
+
+    # "Frequently bought together": neighbours kept per product, and how many
+    # orders a pair needs before it counts; rebuilt on this cron schedule (UTC, empty disables)
+    recommendations_top_k: int = 20
+    recommendations_min_count: int = 2
+    recommendations_cron: Optional[str] = "30 3 * * *"
+
+    # Bestseller ranking kept in memory by each worker (0 disables the refresh loop)
+    trending_refresh_interval: int = 300
+    trending_half_life_hours: float = 72.0
+    trending_window_days: int = 30
+    trending_size: int = 24  # products kept per list
+    trending_candidates: int = 5000  # top products the per-category lists are cut from
+
+    # In-process product search (app/search.py): seconds between syncs of
+    # changed products (0 disables the engine and falls back to $text) and
+    # between full rebuilds; fuzzy matching of unknown query terms
+    search_sync_interval: int = 10
+    search_rebuild_interval: int = 3600
+    search_max_results: int = 1000
+    search_fuzzy_min_similarity: float = 0.4
+    search_fuzzy_expansions: int = 3
+    # Carts nobody has changed for this many days are deleted (TTL index on
+    # expires_at, set on every cart write)
+    cart_ttl_days: int = 30
+    # Completed/cancelled orders unchanged for this many days move to
+    # orders_archive in batches, on this cron schedule (UTC, empty disables);
+    # the archive is created with this block compressor (empty: server default)
+    order_archive_after_days: int = 180
+    order_archive_batch_size: int = 1000
+    order_archive_cron: str = "0 4 * * *"
+    order_archive_compressor: Optional[str] = "zstd"
+    # Product view / add-to-cart / search analytics (app/analytics.py): buffered
+    # in memory and written in batches every ANALYTICS_FLUSH_INTERVAL_MS or once
+    # ANALYTICS_FLUSH_EVENTS are pending; beyond ANALYTICS_MAX_PENDING events are dropped
+    analytics_enabled: bool = True
+    analytics_flush_interval_ms: int = 1000
+    analytics_flush_events: int = 5000
+    analytics_max_pending: int = 50000
+    analytics_search_retention_days: int = 30  # raw search events (TTL)
+    # Live order feed for the admin dashboard (GET /api/orders/events): MongoDB
+    # change streams when the deployment has them (replica set), otherwise
+    # events from this worker's own order writes
+    order_events_change_streams: bool = True
+    order_events_buffer: int = 1000  # recent events kept for Last-Event-ID resume
+    order_events_queue_size: int = 1000  # per client; one that falls behind is told to reload
+    order_events_keepalive: int = 15
+    order_events_retry_ms: int = 3000
+    order_events_max_subscribers: int = 100
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     upload_dir: str = "./uploads"
     allowed_extensions: List[str] = ["image/jpeg", "image/png", "image/webp"]
+    image_workers: int = 2
+    image_quality: int = 82
+    upload_max_age: int = 3600
+    upload_immutable_max_age: int = 31536000
+    # e.g. "/_protected_uploads/" to let nginx stream upload bytes
+    upload_accel_redirect_prefix: Optional[str] = None
+    max_upload_size: int = 10 * 1024 * 1024
+
+    # Upload storage: "local" (upload_dir) or "s3" (any S3-compatible store)
+    storage_backend: str = "local"
+    s3_bucket: str = ""
+    s3_prefix: str = "uploads"
+    s3_endpoint_url: Optional[str] = None  # e.g. http://minio:9000
+    s3_region: Optional[str] = None
+    s3_access_key_id: Optional[str] = None
+    s3_secret_access_key: Optional[str] = None
+    s3_public_url: Optional[str] = None  # CDN/bucket URL when objects are public
+    s3_presign_expires: int = 3600
+    s3_multipart_chunk_size: int = 8 * 1024 * 1024
+    s3_max_connections: int = 20
     
     class Config:
         env_file = ".env"
@@ -1,18 +1,59 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 from app.config import settings
+from app.mongo_monitoring import CommandLatencyListener, PoolListener
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
 
 
 class Database:
     client: AsyncIOMotorClient = None
+    catalog: AsyncIOMotorDatabase = None
 
 
 db = Database()
 
 
+def client_options() -> dict:
+    """Build MongoClient keyword arguments from settings"""
+    options = {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+        "connectTimeoutMS": settings.mongodb_connect_timeout_ms,
+        "event_listeners": [PoolListener(), CommandLatencyListener()],
+    }
+    if settings.mongodb_max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.mongodb_max_idle_time_ms
+    if settings.mongodb_wait_queue_timeout_ms is not None:
+        options["waitQueueTimeoutMS"] = settings.mongodb_wait_queue_timeout_ms
+    if settings.mongodb_socket_timeout_ms is not None:
+        options["socketTimeoutMS"] = settings.mongodb_socket_timeout_ms
+    if settings.mongodb_compressors:
+        options["compressors"] = settings.mongodb_compressors
+    return options
+
+
+def catalog_read_preference():
+    """Read preference for catalog reads, with bounded staleness where allowed"""
+    mode = READ_PREFERENCES.get(settings.mongodb_catalog_read_preference)
+    if mode is None:
+        raise ValueError(f"Unknown read preference: {settings.mongodb_catalog_read_preference}")
+    if mode is Primary:
+        return Primary()
+    return mode(max_staleness=settings.mongodb_catalog_max_staleness_seconds)
+
+
 async def connect_to_mongo():
     """Create database connection"""
-    db.client = AsyncIOMotorClient(settings.mongodb_url)
-    await create_indexes()
+    db.client = AsyncIOMotorClient(settings.mongodb_url, **client_options())
+    db.catalog = db.client.get_database(settings.database_name, read_preference=catalog_read_preference())
 
 
 async def close_mongo_connection():
@@ -21,34 +62,16 @@ async def close_mongo_connection():
         db.client.close()
 
 
-async def create_indexes():
-    """Create MongoDB indexes for better performance"""
-    database = db.client[settings.database_name]
-    
-    # Text index for products search
-    await database.products.create_index([
-        ("name", "text"),
-        ("description", "text"),
-        ("brand", "text")
-    ])
-    
-    # Single field indexes
-    await database.products.create_index("category")
-    await database.products.create_index("price")
-    await database.products.create_index("slug", unique=True)
-    await database.products.create_index("createdAt")
-    
-    # Index for users
-    await database.users.create_index("email", unique=True)
-    await database.users.create_index("username", unique=True)
-
-    # Indexes for orders
-    await database.orders.create_index("user_id")
-    await database.orders.create_index("created_at")
-    await database.orders.create_index("status")
-
-
 def get_database():
-    """Get database instance"""
+    """Get database instance (reads go to the primary)"""
     return db.client[settings.database_name]
 
+
+def get_catalog_database():
+    """Get database instance for catalog reads that tolerate bounded staleness.
+
+    Never use it for cart, checkout or auth: a secondary may lag behind writes.
+    """
+    if db.catalog is None:
+        return get_database()
+    return db.catalog
@@ -0,0 +1,64 @@
+import time
+from starlette.routing import Match
+from app.metrics import Counter, Gauge, Histogram
+
+http_requests = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["method"],
+)
+
+
+def route_template(app, scope) -> str:
+    """Resolve the route path template (e.g. /api/products/{product_id}) so
+    labels stay bounded no matter which ids are requested"""
+    partial = None
+    for route in getattr(app, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """Count requests and time them per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = time.perf_counter()
+        http_requests_in_flight.inc(method=method)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec(method=method)
+            route = route_template(scope["app"], scope)
+            http_request_duration.observe(elapsed, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=str(status_code))
@@ -0,0 +1,129 @@
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from PIL import Image, ImageOps
+from app.config import settings
+from app.database import get_database
+from app.storage import get_storage
+
+# Longest edge in pixels for each generated variant
+VARIANT_SIZES = {
+    "thumb": 160,
+    "card": 480,
+    "detail": 1200,
+}
+
+# Output format -> (Pillow format name, file extension, content type)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared image processing pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.image_workers)
+    return _pool
+
+
+def shutdown_process_pool():
+    """Stop the image processing pool"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def variant_filename(filename: str, size: str, fmt: str) -> str:
+    """Build the stored name of a variant, e.g. `<stem>_card.webp`"""
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}_{size}.{VARIANT_FORMATS[fmt][1]}"
+
+
+def variant_key(filename: str, size: str, fmt: str) -> str:
+    """Storage key of a variant"""
+    return f"variants/{variant_filename(filename, size, fmt)}"
+
+
+def render_variants(data: bytes) -> Tuple[Dict[str, int], Dict[Tuple[str, str], bytes]]:
+    """Resize an image into every variant size and format.
+
+    Runs inside the process pool, so it only takes and returns picklable values.
+    Returns the original dimensions and the encoded bytes keyed by (size, format).
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        original = {"width": image.width, "height": image.height}
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        rendered = {}
+        for size, edge in VARIANT_SIZES.items():
+            resized = image.copy()
+            # Never upscale: small originals are stored at their own size
+            resized.thumbnail((edge, edge), Image.LANCZOS)
+            for fmt, (pil_format, _, _) in VARIANT_FORMATS.items():
+                frame = resized
+                if pil_format == "JPEG" and frame.mode == "RGBA":
+                    background = Image.new("RGB", frame.size, (255, 255, 255))
+                    background.paste(frame, mask=frame.split()[3])
+                    frame = background
+                buffer = io.BytesIO()
+                frame.save(buffer, pil_format, quality=settings.image_quality, optimize=True)
+                rendered[(size, fmt)] = buffer.getvalue()
+    return original, rendered
+
+
+async def generate_variants(data: bytes) -> Tuple[Dict[str, int], Dict[Tuple[str, str], bytes]]:
+    """Render variants in the process pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), render_variants, data)
+
+
+def pick_variant_format(accept: Optional[str]) -> str:
+    """Serve WebP to clients that advertise it, JPEG otherwise"""
+    if accept and "image/webp" in accept:
+        return "webp"
+    return "jpeg"
+
+
+async def process_upload(filename: str):
+    """Generate, store and record the variants of an uploaded image"""
+    storage = get_storage()
+    data = await storage.read(filename)
+
+    original, rendered = await generate_variants(data)
+
+    variants = []
+    for (size, fmt), content in rendered.items():
+        name = variant_filename(filename, size, fmt)
+        await storage.save_bytes(variant_key(filename, size, fmt), content, VARIANT_FORMATS[fmt][2])
+        variants.append({
+            "size": size,
+            "format": fmt,
+            "filename": name,
+            "content_type": VARIANT_FORMATS[fmt][2],
+            "bytes": len(content),
+        })
+
+    database = get_database()
+    await database.uploads.update_one(
+        {"filename": filename},
+        {
+            "$set": {
+                "width": original["width"],
+                "height": original["height"],
+                "variants": variants,
+                "variants_generated_at": datetime.utcnow(),
+            },
+            "$setOnInsert": {"size": len(data), "created_at": datetime.utcnow()},
+        },
+        upsert=True,
+    )
+    return variants
@@ -0,0 +1,364 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.config import settings
+from app.database import get_database
+from app.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# One document per job: {queue, name, payload, status, run_at, attempts,
+# max_attempts, lease_until, worker, schedule, result, error, ...}.
+# status: queued -> running -> done | failed (back to queued on retry)
+JOBS_COLLECTION = "jobs"
+# One document per schedule: {_id: job name, spec, next_run_at, last_run_at}
+SCHEDULES_COLLECTION = "job_schedules"
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+jobs_processed = Counter(
+    "jobs_processed_total", "Jobs finished by this worker", ["queue", "name", "outcome"]
+)
+job_duration = Histogram(
+    "job_duration_seconds", "Run time of jobs", ["queue", "name"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+jobs_running = Gauge("jobs_running", "Jobs running in this worker", ["queue"])
+jobs_by_status = Gauge("jobs", "Jobs in the queue collection", ["queue", "status"])
+
+Handler = Callable[[dict], Awaitable[Optional[dict]]]
+
+
+class JobSpec:
+    def __init__(self, name: str, handler: Handler, queue: str, max_attempts: int, lease_seconds: int):
+        self.name = name
+        self.handler = handler
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+
+class Schedule:
+    """When a job is enqueued: every `every` seconds or on a cron expression (UTC)"""
+
+    def __init__(self, name: str, every: Optional[int], cron: Optional[str], payload: dict):
+        self.name = name
+        self.every = every
+        self.cron = cron
+        self.payload = payload
+        self.spec = f"every {every}s" if every else f"cron {cron}"
+        if cron:
+            next_cron_time(cron, datetime.utcnow())  # fail at import on a bad expression
+
+    def first_run(self, now: datetime) -> datetime:
+        return now if self.every else next_cron_time(self.cron, now)
+
+    def next_run(self, now: datetime) -> datetime:
+        return now + timedelta(seconds=self.every) if self.every else next_cron_time(self.cron, now)
+
+
+registry: Dict[str, JobSpec] = {}
+schedules: Dict[str, Schedule] = {}
+
+
+def job(name: str, queue: str = "default", max_attempts: Optional[int] = None,
+        lease_seconds: Optional[int] = None):
+    """Register an async handler taking the job payload; its return value is stored as the result"""
+    def decorator(handler: Handler) -> Handler:
+        registry[name] = JobSpec(
+            name, handler, queue,
+            max_attempts or settings.job_max_attempts,
+            lease_seconds or settings.job_lease_seconds,
+        )
+        return handler
+    return decorator
+
+
+def schedule(name: str, every: Optional[int] = None, cron: Optional[str] = None, payload: Optional[dict] = None):
+    """Enqueue a registered job periodically; no-op when both every and cron are empty/0"""
+    if every or cron:
+        schedules[name] = Schedule(name, every, cron, payload or {})
+
+
+# Cron fields: minute, hour, day of month, month, day of week (0 = Sunday)
+CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+def parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    """`*`, `5`, `1-5`, `*/15`, `10-50/20` and comma lists of those"""
+    values = set()
+    for part in field.split(","):
+        expr, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if expr == "*":
+            start, end = low, high
+        elif "-" in expr:
+            start, end = (int(value) for value in expr.split("-", 1))
+        else:
+            start = int(expr)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Invalid cron field: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def next_cron_time(expression: str, after: datetime) -> datetime:
+    """First minute strictly after `after` matching a 5-field cron expression"""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron expression needs 5 fields: {expression}")
+    minutes, hours, days, months, weekdays = (
+        parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_RANGES)
+    )
+    # As in cron, a restricted day of month and day of week match either way
+    either_day = fields[2] != "*" and fields[4] != "*"
+
+    t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = t + timedelta(days=5 * 366)
+    while t < limit:
+        if t.month not in months:
+            t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            continue
+        day_match, weekday_match = t.day in days, (t.weekday() + 1) % 7 in weekdays
+        if not (day_match or weekday_match if either_day else day_match and weekday_match):
+            t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            continue
+        if t.hour not in hours:
+            t = t.replace(minute=0) + timedelta(hours=1)
+            continue
+        if t.minute not in minutes:
+            t += timedelta(minutes=1)
+            continue
+        return t
+    raise ValueError(f"Cron expression never matches: {expression}")
+
+
+async def enqueue(database, name: str, payload: Optional[dict] = None, run_at: Optional[datetime] = None,
+                  schedule_name: Optional[str] = None) -> dict:
+    """Queue a registered job to run at `run_at` (now by default)"""
+    spec = registry.get(name)
+    if spec is None:
+        raise ValueError(f"Unknown job: {name}")
+    now = datetime.utcnow()
+    doc = {
+        "queue": spec.queue,
+        "name": name,
+        "payload": payload or {},
+        "status": "queued",
+        "run_at": run_at or now,
+        "attempts": 0,
+        "max_attempts": spec.max_attempts,
+        "schedule": schedule_name,
+        "created_at": now,
+    }
+    doc["_id"] = (await database[JOBS_COLLECTION].insert_one(doc)).inserted_id
+    return doc
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, capped"""
+    delay = min(settings.job_retry_backoff * 2 ** (attempts - 1), settings.job_retry_backoff_max)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobRunner:
+    """Runs queued jobs in this worker, up to JOB_QUEUES[queue] at a time per
+    queue, and enqueues scheduled jobs.
+
+    A job is claimed by atomically setting a lease, which is extended while
+    it runs. If the worker dies, the lease expires and another worker takes
+    the job again, so handlers must be safe to run more than once.
+    """
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._loops: list = []
+        self._active: Set[asyncio.Task] = set()
+
+    async def claim(self, database, queue: str) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await database[JOBS_COLLECTION].find_one_and_update(
+            {"queue": queue, "$or": [
+                {"status": "queued", "run_at": {"$lte": now}},
+                # Abandoned by a worker that stopped heartbeating
+                {"status": "running", "lease_until": {"$lt": now}},
+            ]},
+            {"$set": {"status": "running", "worker": self.owner, "started_at": now,
+                      "lease_until": now + timedelta(seconds=settings.job_lease_seconds)},
+             "$inc": {"attempts": 1}},
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _finish(self, database, job: dict, update: dict):
+        # Only while the lease is ours; a job taken over elsewhere is left alone
+        await database[JOBS_COLLECTION].update_one(
+            {"_id": job["_id"], "status": "running", "worker": self.owner}, update
+        )
+
+    async def _heartbeat(self, database, job: dict, lease_seconds: int):
+        # The claim used the default lease; switch to the job's own right away
+        while True:
+            await database[JOBS_COLLECTION].update_one(
+                {"_id": job["_id"], "status": "running", "worker": self.owner},
+                {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=lease_seconds)}},
+            )
+            await asyncio.sleep(lease_seconds / 3)
+
+    async def execute(self, database, job: dict):
+        spec = registry.get(job["name"])
+        queue, name = job["queue"], job["name"]
+        now = datetime.utcnow()
+        if spec is None or job["attempts"] > job.get("max_attempts", settings.job_max_attempts):
+            error = f"Unknown job: {name}" if spec is None else "Lease expired on the last attempt"
+            await self._finish(database, job, {"$set": {
+                "status": "failed", "error": error, "finished_at": now,
+                "expires_at": now + timedelta(seconds=settings.job_retention_seconds),
+            }})
+            jobs_processed.inc(queue=queue, name=name, outcome="failed")
+            return
+
+        jobs_running.inc(queue=queue)
+        heartbeat = asyncio.create_task(self._heartbeat(database, job, spec.lease_seconds))
+        started = time.perf_counter()
+        try:
+            result = await spec.handler(job.get("payload", {}))
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back rather than wait for the lease
+            await self._finish(database, job, {
+                "$set": {"status": "queued", "run_at": datetime.utcnow()}, "$inc": {"attempts": -1}
+            })
+            raise
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed", name, job["_id"])
+            now = datetime.utcnow()
+            if job["attempts"] < job.get("max_attempts", spec.max_attempts):
+                update = {"status": "queued", "error": repr(exc),
+                          "run_at": now + timedelta(seconds=retry_delay(job["attempts"]))}
+                outcome = "retried"
+            else:
+                update = {"status": "failed", "error": repr(exc), "finished_at": now,
+                          "expires_at": now + timedelta(seconds=settings.job_retention_seconds)}
+                outcome = "failed"
+            await self._finish(database, job, {"$set": update})
+            jobs_processed.inc(queue=queue, name=name, outcome=outcome)
+        else:
+            now = datetime.utcnow()
+            await self._finish(database, job, {
+                "$set": {
+                    "status": "done", "result": result, "finished_at": now,
+                    "expires_at": now + timedelta(seconds=settings.job_retention_seconds),
+                },
+                "$unset": {"error": ""},
+            })
+            jobs_processed.inc(queue=queue, name=name, outcome="done")
+        finally:
+            heartbeat.cancel()
+            job_duration.observe(time.perf_counter() - started, queue=queue, name=name)
+            jobs_running.dec(queue=queue)
+
+    async def _work(self, queue: str, concurrency: int):
+        slots = asyncio.Semaphore(concurrency)
+        while True:
+            await slots.acquire()
+            job = None
+            try:
+                database = get_database()
+                job = await self.claim(database, queue)
+            except Exception:
+                logger.exception("Could not claim a job from queue %s", queue)
+            if job is None:
+                slots.release()
+                await asyncio.sleep(settings.job_poll_interval)
+                continue
+            task = asyncio.create_task(self.execute(database, job))
+            self._active.add(task)
+            task.add_done_callback(self._active.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def sync_schedules(self, database):
+        """Create schedule documents, resetting next_run_at when a spec changed"""
+        now = datetime.utcnow()
+        for name, entry in schedules.items():
+            try:
+                await database[SCHEDULES_COLLECTION].update_one(
+                    {"_id": name, "spec": {"$ne": entry.spec}},
+                    {"$set": {"spec": entry.spec, "next_run_at": entry.first_run(now)}},
+                    upsert=True,
+                )
+            except DuplicateKeyError:
+                pass  # already there with this spec
+
+    async def run_due_schedules(self, database) -> int:
+        """Enqueue every scheduled job that is due; returns how many were queued"""
+        queued = 0
+        for name, entry in schedules.items():
+            now = datetime.utcnow()
+            # Claiming the tick moves next_run_at, so one worker enqueues it
+            claimed = await database[SCHEDULES_COLLECTION].find_one_and_update(
+                {"_id": name, "next_run_at": {"$lte": now}},
+                {"$set": {"next_run_at": entry.next_run(now), "last_run_at": now}},
+            )
+            if claimed is None:
+                continue
+            # Skip the tick while the previous run is still pending
+            if await database[JOBS_COLLECTION].find_one(
+                {"schedule": name, "status": {"$in": ACTIVE_STATUSES}}, {"_id": 1}
+            ):
+                continue
+            await enqueue(database, name, entry.payload, schedule_name=name)
+            queued += 1
+        return queued
+
+    async def refresh_metrics(self, database):
+        cursor = database[JOBS_COLLECTION].aggregate([
+            {"$group": {"_id": {"queue": "$queue", "status": "$status"}, "count": {"$sum": 1}}},
+        ])
+        counts = {(row["_id"]["queue"], row["_id"]["status"]): row["count"] async for row in cursor}
+        # Label sets that emptied out since the last refresh go back to 0
+        for queue, status in set(jobs_by_status.snapshot()) | set(counts):
+            jobs_by_status.set(counts.get((queue, status), 0), queue=queue, status=status)
+
+    async def _schedule(self):
+        synced = False
+        metrics_at = 0.0
+        while True:
+            try:
+                database = get_database()
+                if not synced:
+                    await self.sync_schedules(database)
+                    synced = True
+                await self.run_due_schedules(database)
+                if time.monotonic() - metrics_at >= settings.job_metrics_interval:
+                    await self.refresh_metrics(database)
+                    metrics_at = time.monotonic()
+            except Exception:
+                logger.exception("Job scheduler run failed")
+            await asyncio.sleep(settings.job_poll_interval)
+
+    def start(self):
+        if not settings.jobs_enabled or self._loops:
+            return
+        self._loops.append(asyncio.create_task(self._schedule()))
+        for queue, concurrency in settings.job_queues.items():
+            if concurrency > 0:
+                self._loops.append(asyncio.create_task(self._work(queue, concurrency)))
+
+    async def stop(self):
+        tasks = self._loops + list(self._active)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loops = []
+
+
+job_runner = JobRunner()
+
@@ -1,7 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import connect_to_mongo, close_mongo_connection
-from app.routers import auth, products, categories, cart, upload, health, orders
+from app.images import shutdown_process_pool
+from app.jobs import job_runner
+import app.tasks  # noqa: F401  registers the jobs and their schedules
+from app.trending import trending as trending_ranking
+from app.search import product_search
+from app.order_feed import order_feed
+from app.analytics import analytics as analytics_collector
+from app.schema import ensure_schema
+from app.response_cache import ResponseCacheMiddleware
+from app.admission import AdmissionMiddleware, loop_monitor
+from app.http_metrics import MetricsMiddleware
+from app.profiling import ProfilingMiddleware
+from app.routers import auth, product_bulk, trending, products, reviews, categories, cart, upload, health, orders, jobs, analytics, metrics, profiling
 
 app = FastAPI(
     title="Product Catalog API",
@@ -9,6 +21,14 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control, innermost: cache hits are served without queueing and
+# 503s still pass through CORS
+app.add_middleware(AdmissionMiddleware)
+
+# Cache anonymous catalog reads. Added before CORS so it sits inside it,
+# and CORS then decorates cached responses per request origin.
+app.add_middleware(ResponseCacheMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -18,24 +38,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling; a header lookup per request when not in use
+app.add_middleware(ProfilingMiddleware)
+
+# Request metrics (outermost, so cached and rejected requests are counted too)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
+app.include_router(product_bulk.router)
+app.include_router(trending.router)
 app.include_router(products.router)
+app.include_router(reviews.router)
 app.include_router(categories.router)
 app.include_router(cart.router)
 app.include_router(upload.router)
 app.include_router(health.router)
 app.include_router(orders.router)
+app.include_router(jobs.router)
+app.include_router(analytics.router)
+app.include_router(metrics.router)
+app.include_router(profiling.router)
 
 
 @app.on_event("startup")
 async def startup_event():
+    loop_monitor.start()
     await connect_to_mongo()
+    await ensure_schema()
+    job_runner.start()
+    trending_ranking.start()
+    product_search.start()
+    order_feed.start()
+    analytics_collector.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await job_runner.stop()
+    await trending_ranking.stop()
+    await product_search.stop()
+    await order_feed.stop()
+    await analytics_collector.stop()
+    await loop_monitor.stop()
     await close_mongo_connection()
+    shutdown_process_pool()
 
 
 @app.get("/")
@@ -0,0 +1,144 @@
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Seconds; tuned for request and database latencies
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """Base for labelled metrics. Values are updated from worker threads
+    (pymongo listeners run inside motor's executor), hence the lock."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        registry[name] = self
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum, then count
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], dict]:
+        """Cumulative bucket counts, sum and count for every label set"""
+        result = {}
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = []
+                running = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    running += bucket_count
+                    cumulative.append((bound, running))
+                result[key] = {"buckets": cumulative, "sum": total, "count": count}
+        return result
+
+
+registry: Dict[str, Metric] = {}
+
+# Called right before rendering, to refresh gauges that are cheaper to read than to track
+collectors: List[Callable[[], None]] = []
+
+
+def register_collector(collector: Callable[[], None]):
+    collectors.append(collector)
+    return collector
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in the Prometheus text exposition format"""
+    for collector in collectors:
+        collector()
+
+    lines = []
+    for metric in registry.values():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        if isinstance(metric, Histogram):
+            for key, data in sorted(metric.snapshot().items()):
+                for bound, count in data["buckets"]:
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, key, le)} {count}")
+                inf = 'le="+Inf"'
+                lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, key, inf)} {data['count']}")
+                lines.append(f"{metric.name}_sum{_labels(metric.labelnames, key)} {_number(data['sum'])}")
+                lines.append(f"{metric.name}_count{_labels(metric.labelnames, key)} {data['count']}")
+        else:
+            for key, value in sorted(metric.snapshot().items()):
+                lines.append(f"{metric.name}{_labels(metric.labelnames, key)} {_number(value)}")
+    return "\n".join(lines) + "\n"
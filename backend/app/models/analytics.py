@@ -0,0 +1,17 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class ProductStatsResponse(BaseModel):
+    product_id: str
+    name: Optional[str] = None  # None once the product is deleted
+    views: int
+    add_to_cart: int
+    add_to_cart_units: int
+    conversion: float  # add-to-carts per view
+
+
+class SearchTermStatsResponse(BaseModel):
+    term: str
+    searches: int
+    zero_results: int
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -25,12 +25,12 @@ class CartItemCreate(BaseModel):
 
 
 class CartResponse(BaseModel):
-    id: str
+    id: Optional[str] = None  # None until the first item is added
     user_id: str
     items: List[CartItem]
     total: float
-    created_at: datetime
-    updated_at: datetime
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -32,6 +32,14 @@ class CategoryUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 
+class CategoryStats(BaseModel):
+    """Counts include subcategories; prices are after discount"""
+    product_count: int = 0
+    in_stock_count: int = 0
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+
 class CategoryResponse(BaseModel):
     id: str
     name: str
@@ -39,6 +47,8 @@ class CategoryResponse(BaseModel):
     description: Optional[str] = None
     image: Optional[str] = None
     parent: Optional[str] = None
+    ancestors: List[str] = []  # root first, ObjectIds as strings
+    stats: Optional[CategoryStats] = None
     is_active: bool
     created_at: datetime
     updated_at: datetime
@@ -47,3 +57,7 @@ class CategoryResponse(BaseModel):
         from_attributes = True
         json_encoders = {datetime: lambda v: v.isoformat()}
 
+
+class CategoryTreeNode(CategoryResponse):
+    children: List["CategoryTreeNode"] = []
+
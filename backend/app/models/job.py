@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+JOB_STATUSES = ["queued", "running", "done", "failed"]
+
+
+class JobCreate(BaseModel):
+    name: str
+    payload: Dict[str, Any] = {}
+    delay_seconds: int = Field(0, ge=0, description="Run no earlier than this many seconds from now")
+
+
+class JobResponse(BaseModel):
+    id: str
+    queue: str
+    name: str
+    payload: Dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    schedule: Optional[str] = None
+    run_at: datetime
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    worker: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class JobScheduleResponse(BaseModel):
+    name: str
+    spec: str
+    next_run_at: datetime
+    last_run_at: Optional[datetime] = None
+
+
+class JobStatsResponse(BaseModel):
+    counts: Dict[str, Dict[str, int]]  # queue -> status -> jobs
+    schedules: List[JobScheduleResponse]
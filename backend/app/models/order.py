@@ -51,6 +51,7 @@ class OrderResponse(BaseModel):
     status_notes: List[str] = []
     created_at: datetime
     updated_at: datetime
+    archived_at: Optional[datetime] = None  # set on orders read from orders_archive
 
     class Config:
         from_attributes = True
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+
+SCHEDULE_STATUSES = ["scheduled", "starting", "active", "ending", "ended", "completed", "cancelled", "failed"]
+
+
+class ProductSelector(BaseModel):
+    """Products a pricing change applies to; criteria are combined with AND"""
+    category: Optional[str] = None  # ObjectId as string; subcategories included
+    brand: Optional[str] = None
+    tags: Optional[List[str]] = None  # any of
+    ids: Optional[List[str]] = None
+    all: bool = False  # required to target the whole catalog
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        if not self.all and not (self.category or self.brand or self.tags or self.ids):
+            raise ValueError("Give at least one of category, brand, tags, ids (or all=true)")
+        return self
+
+
+class PriceChange(BaseModel):
+    discount: Optional[float] = Field(None, ge=0, le=100, description="New discount percent")
+    price: Optional[float] = Field(None, gt=0, description="New price")
+    price_percent: Optional[float] = Field(None, gt=-100, description="Change price by this percent, e.g. -10")
+
+    @model_validator(mode="after")
+    def check_change(self):
+        if self.price is not None and self.price_percent is not None:
+            raise ValueError("Use either price or price_percent")
+        if self.discount is None and self.price is None and self.price_percent is None:
+            raise ValueError("Give discount, price or price_percent")
+        return self
+
+
+class PriceItem(PriceChange):
+    product_id: str
+
+
+class BulkPricingRequest(BaseModel):
+    """Either `filter` + `change`, or per-product `items`.
+
+    Without dates the change is applied now and kept. With `ends_at` the
+    previous price/discount is restored when the sale ends.
+    """
+    name: Optional[str] = None
+    filter: Optional[ProductSelector] = None
+    change: Optional[PriceChange] = None
+    items: Optional[List[PriceItem]] = None
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if self.items is not None:
+            if self.filter is not None or self.change is not None:
+                raise ValueError("Use either items or filter + change")
+            if not self.items:
+                raise ValueError("items is empty")
+        elif self.filter is None or self.change is None:
+            raise ValueError("Give filter + change, or items")
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValueError("ends_at must be after starts_at")
+        return self
+
+
+class PricingResult(BaseModel):
+    matched: int = 0
+    modified: int = 0
+    skipped: int = 0  # already part of another running sale
+
+
+class PriceScheduleResponse(BaseModel):
+    id: str
+    name: Optional[str] = None
+    status: str
+    filter: Optional[ProductSelector] = None
+    change: Optional[PriceChange] = None
+    items_count: int = 0
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    applied: Optional[PricingResult] = None
+    reverted: Optional[PricingResult] = None
+    error: Optional[str] = None
+    created_by: Optional[str] = None
+    created_at: datetime
+
+
+class BulkPricingResponse(BaseModel):
+    status: str  # applied, scheduled, active
+    result: Optional[PricingResult] = None
+    schedule: Optional[PriceScheduleResponse] = None
@@ -41,6 +41,11 @@ class ProductCreate(BaseModel):
     stock: int = 0
 
 
+class ProductImportRow(ProductCreate):
+    """One row of a bulk import; `slug` is the upsert key (defaults to the name's slug)"""
+    slug: Optional[str] = None
+
+
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -63,6 +68,7 @@ class ProductResponse(BaseModel):
     price: float
     currency: str
     discount: float
+    effective_price: float  # price after discount
     category: Optional[str] = None
     tags: List[str]
     brand: Optional[str] = None
@@ -71,6 +77,7 @@ class ProductResponse(BaseModel):
     stock: int
     rating: float
     reviews_count: int
+    rating_histogram: Dict[str, int] = {}  # stars ("1".."5") -> number of reviews
     created_at: datetime
     updated_at: datetime
 
@@ -78,3 +85,35 @@ class ProductResponse(BaseModel):
         from_attributes = True
         json_encoders = {datetime: lambda v: v.isoformat()}
 
+
+
+class ProductImportError(BaseModel):
+    row: int
+    slug: Optional[str] = None
+    errors: List[str]
+
+
+class ProductImportResponse(BaseModel):
+    id: str
+    status: str  # running, completed, failed
+    format: str
+    dry_run: bool
+    processed: int
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[ProductImportError] = []
+    errors_truncated: bool = False
+    started_by: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class RelatedProductResponse(ProductResponse):
+    score: float  # cosine similarity of co-purchases, 0-1
+    bought_together: int  # orders containing both products
+
+
+class TrendingProductResponse(ProductResponse):
+    trending_score: float  # units sold, each halved in weight every TRENDING_HALF_LIFE_HOURS
+    recent_sales: int  # units sold in the last TRENDING_WINDOW_DAYS
@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+from pymongo import monitoring
+from app.config import settings
+from app.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger("app.mongo.slow")
+
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+pool_checkout_wait = Histogram(
+    "mongodb_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["address"],
+    buckets=POOL_WAIT_BUCKETS,
+)
+pool_checkout_failures = Counter(
+    "mongodb_pool_checkout_failures_total",
+    "Connection checkouts that failed (timeout, pool closed, connection error)",
+    ["address", "reason"],
+)
+pool_connections = Gauge(
+    "mongodb_pool_connections",
+    "Open connections in the pool",
+    ["address"],
+)
+pool_connections_in_use = Gauge(
+    "mongodb_pool_connections_in_use",
+    "Connections currently checked out of the pool",
+    ["address"],
+)
+pool_cleared = Counter(
+    "mongodb_pool_cleared_total",
+    "Times the pool was cleared (usually after a network error or failover)",
+    ["address"],
+)
+command_duration = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command round-trip time",
+    ["collection", "command"],
+)
+command_failures = Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["collection", "command"],
+)
+slow_commands = Counter(
+    "mongodb_slow_commands_total",
+    "MongoDB commands slower than MONGODB_SLOW_QUERY_MS",
+    ["collection", "command"],
+)
+
+
+# Command fields whose shape (keys and operators, no values) a slow-command
+# log line shows; documents and update bodies are never logged
+SHAPED_FIELDS = ("filter", "query", "sort", "projection", "pipeline", "hint")
+SHAPE_MAX_DEPTH = 6
+SHAPE_MAX_OPS = 3
+
+
+def query_shape(value, depth: int = 0):
+    """`value` with every scalar replaced by "?", e.g. {"email": "?"}"""
+    if depth < SHAPE_MAX_DEPTH:
+        if isinstance(value, dict):
+            return {key: query_shape(item, depth + 1) for key, item in value.items()}
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item, depth + 1) for item in value]
+    return "?"
+
+
+def command_summary(command) -> dict:
+    """What the slow-command log shows of a command: filter/pipeline shapes,
+    and only the number of inserted documents or update/delete statements"""
+    summary = {field: query_shape(command[field]) for field in SHAPED_FIELDS if field in command}
+    if "documents" in command:
+        summary["documents"] = len(command["documents"])
+    for field in ("updates", "deletes"):
+        if field in command:
+            statements = command[field]
+            summary[field] = len(statements)
+            summary["q"] = [query_shape(statement.get("q")) for statement in statements[:SHAPE_MAX_OPS]]
+    return summary
+
+
+def _address(address) -> str:
+    return f"{address[0]}:{address[1]}" if address else ""
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Measure pool occupancy and how long operations wait for a connection.
+
+    Checkout start and completion are reported on the thread running the
+    operation, so the start time is kept in a thread-local.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _wait_time(self):
+        started = getattr(self._local, "checkout_started", None)
+        self._local.checkout_started = None
+        return None if started is None else time.perf_counter() - started
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = self._wait_time()
+        address = _address(event.address)
+        pool_connections_in_use.inc(address=address)
+        if waited is not None:
+            pool_checkout_wait.observe(waited, address=address)
+
+    def connection_check_out_failed(self, event):
+        waited = self._wait_time()
+        address = _address(event.address)
+        if waited is not None:
+            pool_checkout_wait.observe(waited, address=address)
+        pool_checkout_failures.inc(address=address, reason=str(event.reason))
+
+    def connection_checked_in(self, event):
+        pool_connections_in_use.dec(address=_address(event.address))
+
+    def connection_created(self, event):
+        pool_connections.inc(address=_address(event.address))
+
+    def connection_closed(self, event):
+        pool_connections.dec(address=_address(event.address))
+
+    def pool_cleared(self, event):
+        pool_cleared.inc(address=_address(event.address))
+
+    def pool_closed(self, event):
+        address = _address(event.address)
+        pool_connections.set(0, address=address)
+        pool_connections_in_use.set(0, address=address)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+class CommandLatencyListener(monitoring.CommandListener):
+    """Record per collection/command latency and log slow commands"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def started(self, event):
+        collection = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        if not isinstance(collection, str):
+            # Database-level commands (ping, listIndexes on a cursor, ...)
+            collection = ""
+        # Keep only the redacted summary, not the command (and its documents)
+        summary = command_summary(event.command) if settings.mongodb_slow_query_ms else None
+        with self._lock:
+            self._inflight[(event.request_id, event.connection_id)] = (collection, event.database_name, summary)
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            collection, database_name, summary = self._inflight.pop(
+                (event.request_id, event.connection_id), ("", "", None)
+            )
+        seconds = event.duration_micros / 1_000_000
+        command_duration.observe(seconds, collection=collection, command=event.command_name)
+        if failed:
+            command_failures.inc(collection=collection, command=event.command_name)
+
+        if settings.mongodb_slow_query_ms and seconds * 1000 >= settings.mongodb_slow_query_ms:
+            slow_commands.inc(collection=collection, command=event.command_name)
+            logger.warning(
+                "Slow MongoDB command %s on %s.%s took %.1f ms: %.*s",
+                event.command_name,
+                database_name,
+                collection,
+                seconds * 1000,
+                settings.mongodb_slow_query_log_chars,
+                summary,
+            )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+def pool_wait_summary() -> dict:
+    """Checkout wait statistics per server, for the health endpoint"""
+    summary = {}
+    for (address,), data in pool_checkout_wait.snapshot().items():
+        summary[address] = {
+            "checkouts": data["count"],
+            "avg_wait_ms": round(data["sum"] / data["count"] * 1000, 3) if data["count"] else 0.0,
+            "wait_buckets_ms": {f"le_{bound * 1000:g}": count for bound, count in data["buckets"]},
+        }
+    for (address, reason), count in pool_checkout_failures.snapshot().items():
+        summary.setdefault(address, {}).setdefault("failures", {})[reason] = int(count)
+    return summary
@@ -0,0 +1,127 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from pymongo import ReplaceOne
+from app.config import settings
+from app.order_feed import order_feed
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "orders_archive"
+# All-time totals of the archived orders, so the order summary stays complete
+ARCHIVE_STATS_COLLECTION = "orders_archive_stats"
+# Orders in these states no longer change and can leave the hot collection
+ARCHIVABLE_STATUSES = ["completed", "cancelled"]
+
+
+def archive_collection_options() -> dict:
+    """create_collection options; block compression is fixed at creation"""
+    if not settings.order_archive_compressor:
+        return {}
+    return {"storageEngine": {"wiredTiger": {"configString": f"block_compressor={settings.order_archive_compressor}"}}}
+
+
+def with_archive(pipeline: List[dict]) -> List[dict]:
+    """Prefix for an orders aggregation that also reads orders_archive.
+
+    `pipeline` (typically $match, $sort, $limit) is applied to both
+    collections; sort and limit again after it to page over the combined
+    history without sorting everything that matched.
+    """
+    return pipeline + [{"$unionWith": {"coll": ARCHIVE_COLLECTION, "pipeline": pipeline}}]
+
+
+STATS_PIPELINE = [{"$group": {"_id": "$status", "count": {"$sum": 1}, "revenue": {"$sum": "$total"}}}]
+
+
+async def get_archive_stats(database) -> dict:
+    doc = await database[ARCHIVE_STATS_COLLECTION].find_one({"_id": "summary"}, {"_id": 0, "pending_batch": 0})
+    return {"total_orders": 0, "total_revenue": 0.0, "status_counts": {}, **(doc or {})}
+
+
+def stats_from_groups(groups: List[dict]) -> dict:
+    """Summary fields from STATS_PIPELINE-shaped groups"""
+    return {
+        "total_orders": sum(group["count"] for group in groups),
+        "total_revenue": sum(group["revenue"] for group in groups),
+        "status_counts": {group["_id"]: group["count"] for group in groups},
+    }
+
+
+async def finish_batch(database, ids: list) -> set:
+    """Settle a batch whose ids were recorded in pending_batch; returns the archived ids.
+
+    Orders still in `orders` (changed meanwhile, or not deleted before an
+    interruption) stay hot, without archived_at or an archive copy. The rest are added
+    to the totals in the same write that clears pending_batch, so a batch is
+    counted exactly once however often this runs.
+    """
+    archive = database[ARCHIVE_COLLECTION]
+    kept = await database.orders.distinct("_id", {"_id": {"$in": ids}})
+    if kept:
+        await archive.delete_many({"_id": {"$in": kept}})
+        await database.orders.update_many(
+            {"_id": {"$in": kept}, "archived_at": {"$exists": True}}, {"$unset": {"archived_at": ""}}
+        )
+    groups = await archive.aggregate([{"$match": {"_id": {"$in": ids}}}] + STATS_PIPELINE).to_list(length=None)
+    update = {"$unset": {"pending_batch": ""}}
+    if groups:
+        stats = stats_from_groups(groups)
+        counts = {f"status_counts.{status}": count for status, count in stats.pop("status_counts").items()}
+        update["$inc"] = {**stats, **counts}
+    await database[ARCHIVE_STATS_COLLECTION].update_one({"_id": "summary", "pending_batch": {"$exists": True}}, update)
+    return set(ids) - set(kept)
+
+
+async def archive_orders(database, older_than_days: Optional[int] = None, batch_size: Optional[int] = None) -> dict:
+    """Move finished orders not updated for `older_than_days` to orders_archive.
+
+    Each batch's ids are recorded (pending_batch) before it is copied
+    (replace by _id, so repeating it is harmless) and deleted, only if the
+    order is still unchanged. A run interrupted mid-batch leaves the record
+    behind, and the next run settles that batch first.
+    """
+    if older_than_days is None:
+        older_than_days = settings.order_archive_after_days
+    if batch_size is None:
+        batch_size = settings.order_archive_batch_size
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    query = {"status": {"$in": ARCHIVABLE_STATUSES}, "updated_at": {"$lt": cutoff}}
+    stats = database[ARCHIVE_STATS_COLLECTION]
+    moved = 0
+
+    interrupted = await stats.find_one({"_id": "summary", "pending_batch": {"$exists": True}})
+    if interrupted:
+        recovered = await finish_batch(database, interrupted["pending_batch"])
+        logger.warning("Settled an interrupted archive batch (%d orders archived)", len(recovered))
+        moved += len(recovered)
+
+    while True:
+        orders = await database.orders.find(query).limit(batch_size).to_list(length=batch_size)
+        if not orders:
+            break
+        ids = [order["_id"] for order in orders]
+        await stats.update_one({"_id": "summary"}, {"$set": {"pending_batch": ids}}, upsert=True)
+        now = datetime.utcnow()
+        await database[ARCHIVE_COLLECTION].bulk_write(
+            [ReplaceOne({"_id": order["_id"]}, {**order, "archived_at": now}, upsert=True) for order in orders],
+            ordered=False,
+        )
+        # Orders changed since they were read stay hot. Marking the others
+        # first tells the order feed (change streams) they were archived
+        unchanged = [{"_id": order["_id"], "updated_at": order["updated_at"]} for order in orders]
+        await database.orders.update_many({"$or": unchanged}, {"$set": {"archived_at": now}})
+        await database.orders.delete_many({"$or": unchanged})
+        archived = await finish_batch(database, ids)
+        for order in orders:
+            if order["_id"] in archived:
+                order_feed.publish_local("archived", {**order, "archived_at": now})
+        moved += len(archived)
+        logger.info("Archived %d orders (%d so far)", len(archived), moved)
+        if not archived:
+            # Everything read was changed meanwhile; leave the rest for the next run
+            break
+
+    return {"archived": moved, "cutoff": cutoff.isoformat()}
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Optional, Set
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from app.config import settings
+from app.database import get_database
+
+logger = logging.getLogger(__name__)
+
+# Events are {id, type, order_id, order}: type is created, updated, archived
+# or deleted and order the raw document (None on delete). A "reset" event
+# (no id) tells the client its position was lost and it should reload once.
+RESET = {"id": None, "type": "reset", "order_id": None, "order": None}
+
+# Orders only leave the collection through archiving, which first sets
+# archived_at (an "archived" event); the delete itself adds nothing
+WATCH_PIPELINE = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+CHANGE_TYPES = {"insert": "created", "update": "updated", "replace": "updated"}
+# Server error codes: change streams need a replica set; resume token too old
+NOT_SUPPORTED_CODES = {40573}
+HISTORY_LOST_CODES = {260, 280, 286}
+
+
+def change_event(change: dict) -> dict:
+    order = change.get("fullDocument")
+    if order is None:
+        # Already gone when the change was looked up
+        kind = "deleted"
+    elif order.get("archived_at") is not None:
+        kind = "archived"
+    else:
+        kind = CHANGE_TYPES[change["operationType"]]
+    return {
+        # The change stream resume token doubles as the SSE event id
+        "id": change["_id"]["_data"],
+        "type": kind,
+        "order_id": str(change["documentKey"]["_id"]),
+        "order": order,
+    }
+
+
+class Subscription:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.order_events_queue_size)
+        self.task: Optional[asyncio.Task] = None
+
+    def push(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: drop what is queued and make the client reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+
+class OrderFeed:
+    """Fan-out of order changes to connected admin dashboards.
+
+    With change streams (replica sets, Atlas) one stream per worker sees
+    every write from any process and event ids are resume tokens, so a
+    client reconnecting to another worker resumes where it stopped. On a
+    standalone server the feed falls back to events published by this
+    worker's own order writes.
+    """
+
+    def __init__(self):
+        self.mode: Optional[str] = None  # "change_stream" or "local" once known
+        self.buffer: deque = deque(maxlen=settings.order_events_buffer)
+        self.subscribers: Set[Subscription] = set()
+        self._boot = str(ObjectId())
+        self._sequence = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _publish(self, event: dict):
+        self.buffer.append(event)
+        for subscription in self.subscribers:
+            # Replaying subscriptions read their own stream instead
+            if subscription.task is None:
+                subscription.push(event)
+
+    def publish_local(self, kind: str, order: dict):
+        """Called after order writes; ignored when a change stream reports them"""
+        if self.mode == "change_stream":
+            return
+        self._sequence += 1
+        self._publish({
+            "id": f"{self._boot}-{self._sequence}",
+            "type": kind,
+            "order_id": str(order["_id"]),
+            "order": order,
+        })
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription()
+        # Counted against ORDER_EVENTS_MAX_SUBSCRIBERS even while replaying
+        self.subscribers.add(subscription)
+        if last_event_id:
+            ids = [event["id"] for event in self.buffer]
+            if last_event_id in ids:
+                for event in list(self.buffer)[ids.index(last_event_id) + 1:]:
+                    subscription.push(event)
+            elif self.mode == "change_stream":
+                # Older than this worker's buffer: replay from the token itself
+                subscription.task = asyncio.create_task(self._replay(subscription, last_event_id))
+            else:
+                subscription.push(RESET)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+        if subscription.task is not None:
+            subscription.task.cancel()
+
+    async def _replay(self, subscription: Subscription, token: str):
+        try:
+            async with get_database().orders.watch(
+                WATCH_PIPELINE, full_document="updateLookup", resume_after={"_data": token}
+            ) as stream:
+                async for change in stream:
+                    await subscription.queue.put(change_event(change))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.info("Could not resume order events from %s", token, exc_info=True)
+            # Switch to the shared events from here on
+            subscription.task = None
+            subscription.push(RESET)
+
+    async def _watch(self):
+        token = None
+        delay = 1
+        while True:
+            try:
+                async with get_database().orders.watch(
+                    WATCH_PIPELINE, full_document="updateLookup", resume_after=token
+                ) as stream:
+                    self.mode = "change_stream"
+                    delay = 1
+                    async for change in stream:
+                        token = change["_id"]
+                        self._publish(change_event(change))
+            except asyncio.CancelledError:
+                raise
+            except (OperationFailure, NotImplementedError) as exc:
+                code = getattr(exc, "code", None)
+                if self.mode is None and (code in NOT_SUPPORTED_CODES or isinstance(exc, NotImplementedError)):
+                    logger.info("Change streams unavailable, order feed uses in-process events")
+                    self.mode = "local"
+                    return
+                if code in HISTORY_LOST_CODES:
+                    # Missed changes can't be replayed; clients reload instead
+                    token = None
+                    self._publish(RESET)
+                logger.warning("Order change stream failed: %s", exc)
+            except Exception:
+                logger.exception("Order change stream failed")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    def start(self):
+        if self._task is not None:
+            return
+        if settings.order_events_change_streams:
+            self._task = asyncio.create_task(self._watch())
+        else:
+            self.mode = "local"
+
+    async def stop(self):
+        for subscription in list(self.subscribers):
+            self.unsubscribe(subscription)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+order_feed = OrderFeed()
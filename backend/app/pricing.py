@@ -0,0 +1,199 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from app.category_stats import refresh_category_stats
+from app.config import settings
+from app.models.pricing import PriceChange, PriceItem, PricingResult, ProductSelector
+from app.response_cache import response_cache
+
+SCHEDULES_COLLECTION = "price_schedules"
+# Field on products holding the pre-sale price/discount while a timed sale runs
+BACKUP_FIELD = "sale_backup"
+# A claim older than this is assumed to belong to a worker that died mid-way
+STALE_CLAIM = timedelta(minutes=10)
+
+# Denormalized price * (1 - discount / 100): what the cart charges, and what
+# listings filter and sort on so the index stays usable
+EFFECTIVE_PRICE = {
+    "$multiply": ["$price", {"$subtract": [1, {"$divide": [{"$ifNull": ["$discount", 0]}, 100]}]}]
+}
+
+
+def to_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC, like every other timestamp in the database"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def effective_price(price: float, discount: Optional[float]) -> float:
+    """Same arithmetic as EFFECTIVE_PRICE, for documents built in Python"""
+    return price * (1 - (discount or 0) / 100)
+
+
+def literal_pipeline(values: dict) -> List[dict]:
+    """Update pipeline setting plain values, then effective_price from the result"""
+    return [
+        {"$set": {field: {"$literal": value} for field, value in values.items()}},
+        {"$set": {"effective_price": EFFECTIVE_PRICE}},
+    ]
+
+
+def selector_query(selector: ProductSelector) -> dict:
+    query = {}
+    if selector.category:
+        query["category_path"] = ObjectId(selector.category)
+    if selector.brand:
+        query["brand"] = selector.brand
+    if selector.tags:
+        query["tags"] = {"$in": selector.tags}
+    if selector.ids:
+        query["_id"] = {"$in": [ObjectId(product_id) for product_id in selector.ids]}
+    return query
+
+
+def change_pipeline(change: PriceChange, schedule_id: Optional[ObjectId] = None) -> List[dict]:
+    """Update pipeline applying a change; with a schedule, back up the old values first"""
+    stages = []
+    if schedule_id is not None:
+        stages.append({"$set": {BACKUP_FIELD: {"schedule_id": schedule_id, "price": "$price", "discount": "$discount"}}})
+    values = {"updated_at": datetime.utcnow()}
+    if change.discount is not None:
+        values["discount"] = change.discount
+    if change.price is not None:
+        values["price"] = change.price
+    if change.price_percent is not None:
+        values["price"] = {"$round": [{"$multiply": ["$price", 1 + change.price_percent / 100]}, 0]}
+    stages.append({"$set": values})
+    stages.append({"$set": {"effective_price": EFFECTIVE_PRICE}})
+    return stages
+
+
+def revert_pipeline() -> List[dict]:
+    return [
+        {"$set": {"price": f"${BACKUP_FIELD}.price", "discount": f"${BACKUP_FIELD}.discount", "updated_at": datetime.utcnow()}},
+        {"$set": {"effective_price": EFFECTIVE_PRICE}},
+        {"$unset": BACKUP_FIELD},
+    ]
+
+
+async def apply_to_filter(database, selector: ProductSelector, change: PriceChange,
+                          schedule_id: Optional[ObjectId] = None) -> PricingResult:
+    """One server-side update_many for every matching product"""
+    query = selector_query(selector)
+    skipped = 0
+    if schedule_id is not None:
+        skipped = await database.products.count_documents({**query, BACKUP_FIELD: {"$exists": True}})
+        query[BACKUP_FIELD] = {"$exists": False}
+    result = await database.products.update_many(query, change_pipeline(change, schedule_id))
+    return PricingResult(matched=result.matched_count, modified=result.modified_count, skipped=skipped)
+
+
+async def apply_items(database, items: List[PriceItem], schedule_id: Optional[ObjectId] = None) -> PricingResult:
+    """Per-product changes as unordered bulk_write batches"""
+    total = PricingResult()
+    batch_size = settings.product_import_batch_size
+    for start in range(0, len(items), batch_size):
+        operations = []
+        for item in items[start:start + batch_size]:
+            query = {"_id": ObjectId(item.product_id)}
+            if schedule_id is not None:
+                query[BACKUP_FIELD] = {"$exists": False}
+            operations.append(UpdateOne(query, change_pipeline(item, schedule_id)))
+        result = await database.products.bulk_write(operations, ordered=False)
+        total.matched += result.matched_count
+        total.modified += result.modified_count
+    if schedule_id is not None:
+        total.skipped = len(items) - total.matched
+    return total
+
+
+async def apply_change(database, selector: Optional[ProductSelector], change: Optional[PriceChange],
+                       items: Optional[List[PriceItem]], schedule_id: Optional[ObjectId] = None) -> PricingResult:
+    if items is not None:
+        result = await apply_items(database, items, schedule_id)
+        query = {"_id": {"$in": [ObjectId(item.product_id) for item in items]}}
+    else:
+        result = await apply_to_filter(database, selector, change, schedule_id)
+        query = selector_query(selector)
+    # Price bounds of every category holding a changed product
+    if result.modified:
+        await refresh_category_stats(database, await database.products.distinct("category_path", query))
+    response_cache.invalidate("products")
+    return result
+
+
+async def revert_schedule(database, schedule_id: ObjectId) -> PricingResult:
+    """Restore the price/discount every product had before the sale"""
+    query = {f"{BACKUP_FIELD}.schedule_id": schedule_id}
+    categories = await database.products.distinct("category_path", query)
+    result = await database.products.update_many(query, revert_pipeline())
+    await refresh_category_stats(database, categories)
+    response_cache.invalidate("products")
+    return PricingResult(matched=result.matched_count, modified=result.modified_count)
+
+
+async def start_schedule(database, schedule: dict) -> dict:
+    """Apply a claimed schedule; timed sales stay active until ends_at"""
+    timed = schedule.get("ends_at") is not None
+    result = await apply_change(
+        database,
+        ProductSelector(**schedule["filter"]) if schedule.get("filter") else None,
+        PriceChange(**schedule["change"]) if schedule.get("change") else None,
+        [PriceItem(**item) for item in schedule["items"]] if schedule.get("items") else None,
+        schedule["_id"] if timed else None,
+    )
+    return await database[SCHEDULES_COLLECTION].find_one_and_update(
+        {"_id": schedule["_id"]},
+        {"$set": {"status": "active" if timed else "completed", "applied": result.model_dump(), "applied_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def end_schedule(database, schedule: dict, status: str = "ended") -> dict:
+    result = await revert_schedule(database, schedule["_id"])
+    return await database[SCHEDULES_COLLECTION].find_one_and_update(
+        {"_id": schedule["_id"]},
+        {"$set": {"status": status, "reverted": result.model_dump(), "reverted_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def claim(database, query: dict, status: str, recover_stale: Optional[dict] = None) -> Optional[dict]:
+    """Atomically move one schedule to `status` so only one worker runs it.
+
+    With `recover_stale` (a filter, possibly empty) a schedule matching it
+    that has been in `status` for STALE_CLAIM is taken over as well.
+    """
+    now = datetime.utcnow()
+    if recover_stale is not None:
+        query = {"$or": [query, {**recover_stale, "status": status, "claimed_at": {"$lt": now - STALE_CLAIM}}]}
+    return await database[SCHEDULES_COLLECTION].find_one_and_update(
+        query,
+        {"$set": {"status": status, "claimed_at": now}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def run_due_schedules(database) -> int:
+    """Start and end every schedule that is due; returns how many were handled"""
+    handled = 0
+    now = datetime.utcnow()
+    # A timed sale skips products that already hold its sale_backup, so it is
+    # safe to start again. An untimed change leaves no such marker and may
+    # have been applied in part (or twice, for price_percent): an admin decides.
+    failed = await database[SCHEDULES_COLLECTION].update_many(
+        {"status": "starting", "ends_at": None, "claimed_at": {"$lt": now - STALE_CLAIM}},
+        {"$set": {"status": "failed", "error": "Interrupted while applying; check the products before re-running"}},
+    )
+    handled += failed.modified_count
+    while schedule := await claim(
+        database, {"status": "scheduled", "starts_at": {"$lte": now}}, "starting", {"ends_at": {"$ne": None}}
+    ):
+        await start_schedule(database, schedule)
+        handled += 1
+    while schedule := await claim(database, {"status": "active", "ends_at": {"$lte": now}}, "ending", {}):
+        await end_schedule(database, schedule)
+        handled += 1
+    return handled
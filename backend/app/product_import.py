@@ -0,0 +1,290 @@
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.category_stats import refresh_category_stats
+from app.config import settings
+from app.models.product import ProductImportRow
+from app.pricing import literal_pipeline
+from app.reviews import rating_fields
+from app.response_cache import response_cache
+from app.utils import generate_slug
+
+IMPORTS_COLLECTION = "product_imports"
+
+# CSV cells holding several values, separated by "|"
+LIST_COLUMNS = ("tags", "images")
+
+# Filled in when the product doesn't have them yet (i.e. on insert), unless the row sets them
+INSERT_DEFAULTS = {
+    "currency": "VND",
+    "discount": 0.0,
+    "category": None,
+    "category_path": [],
+    "tags": [],
+    "brand": None,
+    "images": [],
+    "specs": {},
+    "stock": 0,
+}
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without holding more than one chunk"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_csv_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(line number, fields, error) per CSV record; the first record is the header.
+
+    Quoted cells may contain newlines, so lines are joined until the
+    quotes balance before the record is parsed.
+    """
+    header = None
+    record: List[str] = []
+    quotes = 0
+    line_number = 0
+    start = 0
+    async for line in iter_lines(stream):
+        line_number += 1
+        if not record:
+            start = line_number
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+
+        text = "".join(record)
+        record, quotes = [], 0
+        try:
+            cells = next(csv.reader([text]), [])
+        except csv.Error as e:
+            yield start, None, f"Invalid CSV: {e}"
+            continue
+        if header is None:
+            header = [cell.strip().lower() for cell in cells]
+            continue
+        if not any(cell.strip() for cell in cells):
+            continue
+        if len(cells) > len(header):
+            yield start, None, f"Expected {len(header)} columns, got {len(cells)}"
+            continue
+        try:
+            yield start, csv_fields(dict(zip(header, cells))), None
+        except ValueError as e:
+            yield start, None, str(e)
+
+    if record:
+        yield start, None, "Invalid CSV: unterminated quoted field"
+
+
+def csv_fields(row: Dict[str, str]) -> dict:
+    """Empty cells are left out, so they don't overwrite existing values"""
+    fields = {}
+    for column, value in row.items():
+        value = value.strip()
+        if not value:
+            continue
+        if column in LIST_COLUMNS:
+            fields[column] = [item.strip() for item in value.split("|") if item.strip()]
+        elif column == "specs":
+            try:
+                fields[column] = json.loads(value)
+            except json.JSONDecodeError:
+                raise ValueError("specs: must be a JSON object")
+        else:
+            fields[column] = value
+    return fields
+
+
+async def iter_ndjson_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(line number, fields, error) per NDJSON line"""
+    line_number = 0
+    async for line in iter_lines(stream):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(fields, dict):
+            yield line_number, None, "Each line must be a JSON object"
+            continue
+        yield line_number, fields, None
+
+
+ROW_READERS = {"csv": iter_csv_rows, "ndjson": iter_ndjson_rows}
+
+
+class ProductImporter:
+    """Validate rows and upsert them by slug with one bulk_write per batch.
+
+    Progress counters are saved to `product_imports` after every batch,
+    so an import can be followed while the request is still uploading.
+    """
+
+    def __init__(self, database, import_format: str, dry_run: bool = False, started_by: Optional[str] = None):
+        self.database = database
+        self.id = ObjectId()
+        self.format = import_format
+        self.dry_run = dry_run
+        self.started_by = started_by
+        self.started_at = datetime.utcnow()
+        self.batch_size = settings.product_import_batch_size
+        self.max_errors = settings.product_import_max_errors
+        self.categories: Dict[str, ObjectId] = {}
+        self.category_paths: Dict[ObjectId, List[ObjectId]] = {}
+        self.operations: List[UpdateOne] = []
+        self.batch_rows: List[Tuple[int, str]] = []
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    async def load_categories(self):
+        """Category ids keyed by id, lower-cased name and slug, read once per import"""
+        async for category in self.database.categories.find({}, {"name": 1, "slug": 1, "ancestors": 1}):
+            self.category_paths[category["_id"]] = category.get("ancestors", []) + [category["_id"]]
+            self.categories[str(category["_id"])] = category["_id"]
+            self.categories[category["name"].strip().lower()] = category["_id"]
+            if category.get("slug"):
+                self.categories[category["slug"]] = category["_id"]
+
+    def resolve_category(self, value: Optional[str]) -> Optional[ObjectId]:
+        if not value:
+            return None
+        category_id = self.categories.get(value.strip().lower()) or self.categories.get(value.strip())
+        if category_id is None:
+            raise ValueError(f"category: unknown category '{value}'")
+        return category_id
+
+    def record_error(self, row: int, messages: List[str], slug: Optional[str] = None):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "slug": slug, "errors": messages})
+
+    def build_operation(self, fields: dict) -> Tuple[str, UpdateOne]:
+        """Validate one row; raises ValueError with every problem found"""
+        try:
+            product = ProductImportRow(**fields)
+        except ValidationError as e:
+            raise ValueError(*[
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ])
+
+        slug = generate_slug(product.slug or product.name)
+        if not slug:
+            raise ValueError("slug: cannot be generated from the name")
+        now = datetime.utcnow()
+
+        provided = product.model_fields_set - {"slug"}
+        values = product.model_dump(include=provided)
+        if "category" in values:
+            values["category"] = self.resolve_category(values["category"])
+            values["category_path"] = self.category_paths.get(values["category"], [])
+        values["updated_at"] = now
+
+        on_insert = {field: default for field, default in INSERT_DEFAULTS.items() if field not in values}
+        on_insert.update({**rating_fields({}), "created_at": now})
+
+        # A pipeline upsert, so effective_price is computed from the stored
+        # price/discount when the row only changes one of them
+        defaults = {field: {"$ifNull": [f"${field}", {"$literal": value}]} for field, value in on_insert.items()}
+        pipeline = literal_pipeline(values)
+        pipeline[0]["$set"].update(defaults)
+        return slug, UpdateOne({"slug": slug}, pipeline, upsert=True)
+
+    async def add(self, row: int, fields: dict):
+        self.processed += 1
+        try:
+            slug, operation = self.build_operation(fields)
+        except ValueError as e:
+            self.record_error(row, [str(message) for message in e.args], fields.get("slug") or None)
+            return
+        self.operations.append(operation)
+        self.batch_rows.append((row, slug))
+        if len(self.operations) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        operations, rows = self.operations, self.batch_rows
+        self.operations, self.batch_rows = [], []
+        if operations and not self.dry_run:
+            # Categories the batch's products are in before and after the write
+            batch = {"slug": {"$in": [slug for _, slug in rows]}}
+            categories = set(await self.database.products.distinct("category_path", batch))
+            try:
+                result = await self.database.products.bulk_write(operations, ordered=False)
+                self.inserted += result.upserted_count
+                self.updated += result.matched_count
+            except BulkWriteError as e:
+                details = e.details
+                self.inserted += details.get("nUpserted", 0)
+                self.updated += details.get("nMatched", 0)
+                for error in details.get("writeErrors", []):
+                    row, slug = rows[error["index"]]
+                    self.record_error(row, [error.get("errmsg", "write failed")], slug)
+            categories.update(await self.database.products.distinct("category_path", batch))
+            await refresh_category_stats(self.database, categories)
+        await self.save_progress()
+
+    def report(self, status: str) -> dict:
+        return {
+            "_id": self.id,
+            "status": status,
+            "format": self.format,
+            "dry_run": self.dry_run,
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "started_by": self.started_by,
+            "started_at": self.started_at,
+        }
+
+    async def save_progress(self, status: str = "running"):
+        report = self.report(status)
+        if status != "running":
+            report.update({
+                "errors": self.errors,
+                "errors_truncated": self.failed > len(self.errors),
+                "finished_at": datetime.utcnow(),
+            })
+        await self.database[IMPORTS_COLLECTION].replace_one({"_id": self.id}, report, upsert=True)
+        return report
+
+    async def run(self, stream: AsyncIterator[bytes]) -> dict:
+        await self.save_progress()
+        await self.load_categories()
+        try:
+            async for row, fields, error in ROW_READERS[self.format](stream):
+                if error is not None:
+                    self.processed += 1
+                    self.record_error(row, [error])
+                    continue
+                await self.add(row, fields)
+            await self.flush()
+        except Exception:
+            await self.save_progress("failed")
+            raise
+        finally:
+            if self.inserted or self.updated:
+                response_cache.invalidate("products")
+        return await self.save_progress("completed")
@@ -0,0 +1,223 @@
+import itertools
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+from urllib.parse import parse_qs
+from app.config import settings
+from app.database import get_database
+from app.http_metrics import route_template
+from app.utils import verify_token
+
+
+class Profile:
+    """Folded stacks sampled from the event loop thread while one request ran"""
+
+    def __init__(self, method: str, path: str, route: str, trigger: str, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route = route
+        self.trigger = trigger
+        self.interval = interval
+        self.started_at = datetime.utcnow()
+        self.duration_ms = 0.0
+        self.status_code: Optional[int] = None
+        self.stacks: Counter = Counter()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "trigger": self.trigger,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 2),
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format, ready for flamegraph.pl / speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def speedscope(self) -> dict:
+        frames: List[dict] = []
+        frame_index: Dict[str, int] = {}
+        samples = []
+        weights = []
+        for stack, count in self.stacks.items():
+            indexes = []
+            for name in stack.split(";"):
+                if name not in frame_index:
+                    frame_index[name] = len(frames)
+                    function, _, location = name.partition(" (")
+                    file, _, line = location.rstrip(")").rpartition(":")
+                    frames.append({"name": function, "file": file, "line": int(line) if line.isdigit() else None})
+                indexes.append(frame_index[name])
+            samples.append(indexes)
+            weights.append(count * self.interval * 1000)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": f"{self.method} {self.path} ({self.id})",
+            "exporter": "product-catalog",
+        }
+
+
+class StackSampler:
+    """Background thread sampling the event loop thread's Python stack.
+
+    It only runs while at least one profile is active, so a worker that
+    is not being profiled pays nothing. Concurrent requests share the loop
+    thread, so their frames can appear in each other's profiles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: List[Profile] = []
+        self._thread: Optional[threading.Thread] = None
+        self._target_thread_id: Optional[int] = None
+
+    def start(self, profile: Profile):
+        with self._lock:
+            self._active.append(profile)
+            self._target_thread_id = threading.get_ident()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile):
+        with self._lock:
+            if profile in self._active:
+                self._active.remove(profile)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active)
+                thread_id = self._target_thread_id
+                interval = min(p.interval for p in active)
+
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                folded = ";".join(reversed(stack))
+                for profile in active:
+                    profile.stacks[folded] += 1
+            time.sleep(interval)
+
+
+class Profiler:
+    """Holds the sampler, the sampling-mode configuration and the result ring"""
+
+    def __init__(self):
+        self.sampler = StackSampler()
+        self.profiles: Deque[Profile] = deque(maxlen=settings.profile_ring_size)
+        self.sample_route: Optional[str] = settings.profile_sample_route
+        self.sample_every: int = settings.profile_sample_every
+        self._route_counter = itertools.count(1)
+
+    def configure_sampling(self, route: Optional[str], every: int):
+        self.sample_route = route
+        self.sample_every = every
+        self._route_counter = itertools.count(1)
+
+    def should_sample(self, route: str) -> bool:
+        return route == self.sample_route and next(self._route_counter) % self.sample_every == 0
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return next((p for p in self.profiles if p.id == profile_id), None)
+
+
+profiler = Profiler()
+
+
+async def is_admin_token(authorization: Optional[str]) -> bool:
+    """Check a bearer token belongs to an active admin (only on opt-in requests)"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return False
+    payload = verify_token(authorization[7:])
+    if not payload or not payload.get("sub"):
+        return False
+    user = await get_database().users.find_one({"username": payload["sub"]}, {"role": 1, "is_active": 1})
+    return bool(user) and user.get("role") == "admin" and user.get("is_active", True)
+
+
+class ProfilingMiddleware:
+    """Profile a request when an admin asks for it (X-Profile: 1 or ?profile=1)
+    or when it falls on the 1-in-N sample of the configured route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = None
+        headers = dict(scope["headers"])
+        if b"x-profile" in headers or b"profile=" in scope.get("query_string", b""):
+            requested = headers.get(b"x-profile") == b"1" or parse_qs(scope["query_string"].decode("latin-1")).get("profile") == ["1"]
+            if requested and await is_admin_token(headers.get(b"authorization", b"").decode("latin-1")):
+                trigger = "request"
+
+        route = None
+        if trigger is None and profiler.sample_route and profiler.sample_every > 0:
+            route = route_template(scope["app"], scope)
+            if profiler.should_sample(route):
+                trigger = "sampling"
+
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(
+            scope["method"],
+            scope["path"],
+            route or route_template(scope["app"], scope),
+            trigger,
+            settings.profile_interval_ms / 1000,
+        )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        started = time.perf_counter()
+        profiler.sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.sampler.stop(profile)
+            profile.duration_ms = (time.perf_counter() - started) * 1000
+            profiler.profiles.append(profile)
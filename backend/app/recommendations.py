@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from bson import ObjectId
+from pymongo import ReplaceOne
+from scipy import sparse
+from app.config import settings
+from app.images import get_process_pool
+
+logger = logging.getLogger(__name__)
+
+# One document per product: {_id, related: [{product_id, score, count}], build_id, built_at}
+RELATED_COLLECTION = "product_related"
+WRITE_BATCH = 1000
+
+
+async def load_baskets(database) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Order and product index of every (order, product) pair, plus the
+    product ids by index. A product appears once per order."""
+    order_index, product_index = array("i"), array("i")
+    product_ids: Dict[str, int] = {}
+    orders = 0
+    cursor = database.orders.find(
+        {"status": {"$ne": "cancelled"}}, {"_id": 0, "items.product_id": 1}
+    ).batch_size(10_000)
+    async for order in cursor:
+        basket = {item["product_id"] for item in order.get("items", [])}
+        # A single item can't be bought together with anything
+        if len(basket) < 2:
+            continue
+        for product_id in basket:
+            order_index.append(orders)
+            product_index.append(product_ids.setdefault(product_id, len(product_ids)))
+        orders += 1
+    return (
+        np.frombuffer(order_index, dtype=np.int32),
+        np.frombuffer(product_index, dtype=np.int32),
+        list(product_ids),
+    )
+
+
+def compute_related(order_index: np.ndarray, product_index: np.ndarray, n_products: int,
+                    top_k: int, min_count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Top-k neighbours per product by cosine similarity of co-purchases.
+
+    X is the order x product incidence matrix; C = X^T X counts orders
+    containing both products (its diagonal is each product's order count).
+    score(i, j) = C[i, j] / sqrt(C[i, i] * C[j, j]). Pairs bought together
+    fewer than `min_count` times are dropped as noise.
+
+    Returns (product, neighbour, score, count) arrays, grouped by product
+    and sorted by descending score. Runs in the process pool.
+    """
+    n_orders = int(order_index.max()) + 1 if len(order_index) else 0
+    incidence = sparse.csr_matrix(
+        (np.ones(len(order_index), dtype=np.float32), (order_index, product_index)),
+        shape=(n_orders, n_products),
+    )
+    co_counts = (incidence.T @ incidence).tocsr()
+    support = co_counts.diagonal()
+    co_counts = (co_counts - sparse.diags(support)).tocsr()
+    co_counts.data[co_counts.data < min_count] = 0
+    co_counts.eliminate_zeros()
+
+    inverse_norm = sparse.diags(1 / np.sqrt(np.maximum(support, 1)))
+    scores = (inverse_norm @ co_counts @ inverse_norm).tocsr()
+    scores.sort_indices()
+    co_counts.sort_indices()
+
+    # Rank neighbours inside each row without a Python loop: sort by
+    # (row, -score), then keep positions less than top_k from the row start
+    rows = np.repeat(np.arange(n_products, dtype=np.int32), np.diff(scores.indptr))
+    order = np.lexsort((-scores.data, rows))
+    rank = np.arange(len(order)) - scores.indptr[rows[order]]
+    keep = order[rank < top_k]
+    return rows[keep], scores.indices[keep], scores.data[keep], co_counts.data[keep]
+
+
+async def build_related(database, top_k: Optional[int] = None, min_count: Optional[int] = None) -> dict:
+    """Rebuild product_related from all orders; returns build statistics"""
+    if top_k is None:
+        top_k = settings.recommendations_top_k
+    if min_count is None:
+        min_count = settings.recommendations_min_count
+    build_id = ObjectId()
+    timings = {}
+
+    started = time.perf_counter()
+    order_index, product_index, product_ids = await load_baskets(database)
+    timings["load"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    products, neighbours, scores, counts = await loop.run_in_executor(
+        get_process_pool(), compute_related, order_index, product_index, len(product_ids), top_k, min_count
+    )
+    timings["compute"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    collection = database[RELATED_COLLECTION]
+    # Where each product's run starts in the (already grouped) result arrays
+    starts = np.flatnonzero(np.diff(products, prepend=-1))
+    operations, written = [], 0
+    for start, stop in zip(starts, np.r_[starts[1:], len(products)]):
+        product_id = product_ids[products[start]]
+        if not ObjectId.is_valid(product_id):
+            continue
+        related = [
+            {"product_id": ObjectId(product_ids[neighbour]), "score": round(float(score), 4), "count": int(count)}
+            for neighbour, score, count in zip(neighbours[start:stop], scores[start:stop], counts[start:stop])
+            if ObjectId.is_valid(product_ids[neighbour])
+        ]
+        operations.append(ReplaceOne(
+            {"_id": ObjectId(product_id)},
+            {"related": related, "build_id": build_id, "built_at": now},
+            upsert=True,
+        ))
+        if len(operations) >= WRITE_BATCH:
+            await collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        written += len(operations)
+    # Products with no neighbours any more
+    removed = (await collection.delete_many({"build_id": {"$ne": build_id}})).deleted_count
+    timings["write"] = time.perf_counter() - started
+
+    result = {
+        "orders": int(order_index.max()) + 1 if len(order_index) else 0,
+        "products": len(product_ids),
+        "pairs": len(products),
+        "written": written,
+        "removed": removed,
+        "seconds": {phase: round(seconds, 2) for phase, seconds in timings.items()},
+    }
+    logger.info("Built related products: %s", result)
+    return result
@@ -0,0 +1,228 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+from app.analytics import analytics, capture_events
+from app.config import settings
+
+# Path prefix -> invalidation tag. Only anonymous GETs under these are cached.
+CACHE_RULES: List[Tuple[str, str]] = [
+    ("/api/products", "products"),
+    ("/api/categories", "categories"),
+]
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    headers: List[Tuple[bytes, bytes]]
+    etag: str
+    tag: str
+    stored_at: float
+    # Analytics events the handler recorded, replayed on every hit
+    events: Tuple = ()
+    size: int = field(init=False)
+
+    def __post_init__(self):
+        self.size = len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+
+class ResponseCache:
+    """Bounded LRU of serialized responses, budgeted in bytes and dropped by tag"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._by_tag: Dict[str, Set[str]] = {}
+        # Bumped on invalidation so responses computed before a write are not stored
+        self._generations: Dict[str, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, tag: str) -> int:
+        return self._generations.get(tag, 0)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl:
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CacheEntry, generation: int):
+        if generation != self.generation(entry.tag) or entry.size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._by_tag.setdefault(entry.tag, set()).add(key)
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def invalidate(self, *tags: str):
+        """Drop every entry carrying one of the tags (call after writes)"""
+        for tag in tags:
+            self._generations[tag] = self.generation(tag) + 1
+            for key in self._by_tag.pop(tag, set()):
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.bytes -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self._by_tag.clear()
+        self.bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        keys = self._by_tag.get(entry.tag)
+        if keys is not None:
+            keys.discard(key)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+response_cache = ResponseCache(settings.response_cache_max_bytes, settings.response_cache_ttl)
+
+
+def cache_key(method: str, path: str, query_string: bytes) -> str:
+    """Method, path and the query string with parameters sorted"""
+    params = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    return f"{method} {path}?{urlencode(params)}"
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCacheMiddleware:
+    """Cache anonymous GET responses of the public catalog endpoints"""
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+        self.cache_control = f"public, max-age={settings.response_cache_ttl}".encode()
+
+    def _tag_for(self, path: str) -> Optional[str]:
+        for prefix, tag in CACHE_RULES:
+            if path == prefix or path.startswith(prefix + "/"):
+                return tag
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.response_cache_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        tag = self._tag_for(scope["path"])
+        headers = dict(scope["headers"])
+        if tag is None or b"authorization" in headers:
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(scope["method"], scope["path"], scope.get("query_string", b""))
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1")
+        request_cache_control = headers.get(b"cache-control", b"").decode("latin-1")
+
+        if "no-cache" not in request_cache_control and "no-store" not in request_cache_control:
+            entry = self.cache.get(key)
+            if entry is not None:
+                analytics.replay(entry.events)
+                await self._send_entry(send, entry, if_none_match, b"HIT")
+                return
+
+        generation = self.cache.generation(tag)
+        events = capture_events()
+        start = None
+        chunks = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                await self._finish(send, key, tag, generation, start, b"".join(chunks), if_none_match, events)
+                return
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    async def _finish(self, send, key, tag, generation, start, body, if_none_match, events):
+        original_headers = start.get("headers", [])
+        response_cache_control = b""
+        response_headers = []
+        cacheable = start["status"] == 200
+        for name, value in original_headers:
+            lowered = name.lower()
+            if lowered == b"cache-control":
+                response_cache_control = value
+            elif lowered == b"set-cookie":
+                cacheable = False
+            if lowered not in (b"content-length", b"etag", b"cache-control", b"vary"):
+                response_headers.append((name, value))
+
+        if not cacheable:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        entry = CacheEntry(
+            body=body,
+            headers=response_headers,
+            etag=make_etag(body),
+            tag=tag,
+            stored_at=time.monotonic(),
+            events=tuple(events),
+        )
+        if b"no-store" not in response_cache_control:
+            self.cache.put(key, entry, generation)
+        await self._send_entry(send, entry, if_none_match, b"MISS")
+
+    async def _send_entry(self, send, entry: CacheEntry, if_none_match: str, state: bytes):
+        validators = [
+            (b"etag", entry.etag.encode()),
+            (b"cache-control", self.cache_control),
+            (b"vary", b"Authorization"),
+            (b"x-cache", state),
+        ]
+        if etag_matches(if_none_match, entry.etag):
+            await send({"type": "http.response.start", "status": 304, "headers": validators})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": entry.headers + validators + [(b"content-length", str(len(entry.body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": entry.body})
@@ -0,0 +1,42 @@
+from typing import Dict, List
+
+RATINGS = (1, 2, 3, 4, 5)
+
+# Products keep running aggregates of their reviews: rating_sum, reviews_count
+# and rating_histogram ({"1": n, ..., "5": n}), plus rating = sum / count so
+# sorting by rating reads an indexed field.
+
+
+def rating_fields(histogram: Dict[int, int]) -> dict:
+    """Aggregate fields for a product whose reviews have this star histogram"""
+    count = sum(histogram.get(stars, 0) for stars in RATINGS)
+    total = sum(stars * histogram.get(stars, 0) for stars in RATINGS)
+    return {
+        "rating_histogram": {str(stars): histogram.get(stars, 0) for stars in RATINGS},
+        "rating_sum": total,
+        "reviews_count": count,
+        "rating": total / count if count else 0.0,
+    }
+
+
+def rating_change_pipeline(changes: Dict[int, int]) -> List[dict]:
+    """Update pipeline adding `changes` ({stars: +1/-1}) to a product's
+    aggregates and deriving rating from the result, in one atomic write"""
+    increments = {
+        f"rating_histogram.{stars}": {"$add": [{"$ifNull": [f"$rating_histogram.{stars}", 0]}, delta]}
+        for stars, delta in changes.items() if delta
+    }
+    count = sum(changes.values())
+    total = sum(stars * delta for stars, delta in changes.items())
+    return [
+        {"$set": {
+            **increments,
+            "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, total]},
+            "reviews_count": {"$add": [{"$ifNull": ["$reviews_count", 0]}, count]},
+        }},
+        {"$set": {"rating": {"$cond": [
+            {"$gt": ["$reviews_count", 0]},
+            {"$divide": ["$rating_sum", "$reviews_count"]},
+            0.0,
+        ]}}},
+    ]
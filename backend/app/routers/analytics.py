@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from app.database import get_database
+from app.auth import get_current_admin_user
+from app.analytics import PRODUCT_STATS_COLLECTION, SEARCH_TERMS_COLLECTION
+from app.models.analytics import ProductStatsResponse, SearchTermStatsResponse
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+
+def first_day(days: int) -> str:
+    return (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+
+@router.get("/products", response_model=List[ProductStatsResponse])
+async def get_product_stats(
+    current_user: dict = Depends(get_current_admin_user),
+    days: int = Query(7, ge=1, le=365),
+    sort: str = Query("views", pattern="^(views|add_to_cart)$"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Most viewed (or added to cart) products over the last `days` days (admin only)"""
+    rows = await get_database()[PRODUCT_STATS_COLLECTION].aggregate([
+        {"$match": {"day": {"$gte": first_day(days)}}},
+        {"$group": {
+            "_id": "$product_id",
+            "views": {"$sum": "$views"},
+            "add_to_cart": {"$sum": "$add_to_cart"},
+            "add_to_cart_units": {"$sum": "$add_to_cart_units"},
+        }},
+        {"$sort": {sort: -1}},
+        {"$limit": limit},
+        {"$lookup": {"from": "products", "localField": "_id", "foreignField": "_id", "as": "product"}},
+    ]).to_list(length=limit)
+    return [
+        ProductStatsResponse(
+            product_id=str(row["_id"]),
+            name=row["product"][0]["name"] if row["product"] else None,
+            views=row["views"],
+            add_to_cart=row["add_to_cart"],
+            add_to_cart_units=row["add_to_cart_units"],
+            conversion=row["add_to_cart"] / row["views"] if row["views"] else 0.0,
+        )
+        for row in rows
+    ]
+
+
+@router.get("/searches", response_model=List[SearchTermStatsResponse])
+async def get_search_stats(
+    current_user: dict = Depends(get_current_admin_user),
+    days: int = Query(7, ge=1, le=365),
+    zero_results: bool = Query(False, description="Only terms that found nothing at least once"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Most frequent search terms (accents and case folded) over the last `days` days (admin only)"""
+    pipeline = [
+        {"$match": {"day": {"$gte": first_day(days)}}},
+        {"$group": {"_id": "$term", "searches": {"$sum": "$searches"}, "zero_results": {"$sum": "$zero_results"}}},
+    ]
+    if zero_results:
+        pipeline.append({"$match": {"zero_results": {"$gt": 0}}})
+    pipeline += [{"$sort": {"zero_results" if zero_results else "searches": -1}}, {"$limit": limit}]
+    rows = await get_database()[SEARCH_TERMS_COLLECTION].aggregate(pipeline).to_list(length=limit)
+    return [
+        SearchTermStatsResponse(term=row["_id"], searches=row["searches"], zero_results=row["zero_results"])
+        for row in rows
+    ]
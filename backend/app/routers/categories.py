@@ -1,17 +1,20 @@
-from typing import List
+from typing import List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status
-from app.database import get_database
-from app.models.category import CategoryCreate, CategoryUpdate, CategoryResponse
+from app.database import get_catalog_database, get_database
+from app.models.category import CategoryCreate, CategoryUpdate, CategoryResponse, CategoryStats, CategoryTreeNode
+from app.category_tree import build_tree, category_path, move_category
+from app.category_stats import STATS_COLLECTION, get_category_stats, refresh_category_stats
 from app.auth import get_current_admin_user
 from app.utils import generate_slug
+from app.response_cache import response_cache
 from bson import ObjectId
 from datetime import datetime
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
 
 
-def category_to_response(category: dict) -> CategoryResponse:
-    """Convert MongoDB document to CategoryResponse"""
+def category_to_response(category: dict, stats: Optional[dict] = None) -> CategoryResponse:
+    """Convert MongoDB document (and its category_stats document) to CategoryResponse"""
     return CategoryResponse(
         id=str(category["_id"]),
         name=category["name"],
@@ -19,6 +22,8 @@ def category_to_response(category: dict) -> CategoryResponse:
         description=category.get("description"),
         image=category.get("image"),
         parent=str(category["parent"]) if category.get("parent") else None,
+        ancestors=[str(ancestor) for ancestor in category.get("ancestors", [])],
+        stats=CategoryStats(**stats) if stats else CategoryStats(),
         is_active=category.get("is_active", True),
         created_at=category.get("created_at", datetime.utcnow()),
         updated_at=category.get("updated_at", datetime.utcnow())
@@ -28,18 +33,51 @@ def category_to_response(category: dict) -> CategoryResponse:
 @router.get("", response_model=List[CategoryResponse])
 async def get_categories():
     """Get all categories"""
-    database = get_database()
+    database = get_catalog_database()
     
     cursor = database.categories.find({"is_active": True}).sort("name", 1)
     categories = await cursor.to_list(length=None)
+    stats = await get_category_stats(database, [c["_id"] for c in categories])
     
-    return [category_to_response(c) for c in categories]
+    return [category_to_response(c, stats.get(c["_id"])) for c in categories]
+
+
+def tree_to_response(node: dict, stats: dict) -> CategoryTreeNode:
+    """Convert a nested category (see build_tree) to CategoryTreeNode"""
+    return CategoryTreeNode(
+        **category_to_response(node, stats.get(node["_id"])).model_dump(),
+        children=[tree_to_response(child, stats) for child in node["children"]],
+    )
+
+
+@router.get("/tree", response_model=List[CategoryTreeNode])
+async def get_category_tree():
+    """Get active categories nested under their parents"""
+    database = get_catalog_database()
+    
+    cursor = database.categories.find({"is_active": True}).sort("name", 1)
+    categories = await cursor.to_list(length=None)
+    stats = await get_category_stats(database, [c["_id"] for c in categories])
+    
+    return [tree_to_response(node, stats) for node in build_tree(categories)]
+
+
+async def resolve_parent(database, parent: Optional[str]) -> Tuple[Optional[ObjectId], List[ObjectId]]:
+    """Parent id and the ancestors a child of it gets"""
+    if not parent:
+        return None, []
+    if not ObjectId.is_valid(parent):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid parent ID")
+    try:
+        return ObjectId(parent), await category_path(database, ObjectId(parent))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Parent category not found")
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
 async def get_category(category_id: str):
     """Get a single category by ID"""
-    database = get_database()
+    database = get_catalog_database()
     
     if not ObjectId.is_valid(category_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid category ID")
@@ -48,8 +86,9 @@ async def get_category(category_id: str):
     
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    stats = await database[STATS_COLLECTION].find_one({"_id": category["_id"]})
     
-    return category_to_response(category)
+    return category_to_response(category, stats)
 
 
 @router.post("", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
@@ -67,12 +106,14 @@ async def create_category(
     if existing:
         slug = f"{slug}-{int(datetime.utcnow().timestamp())}"
     
+    parent, ancestors = await resolve_parent(database, category_data.parent)
     category_dict = {
         "name": category_data.name,
         "slug": slug,
         "description": category_data.description,
         "image": category_data.image,
-        "parent": ObjectId(category_data.parent) if category_data.parent else None,
+        "parent": parent,
+        "ancestors": ancestors,
         "is_active": True,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
@@ -80,6 +121,7 @@ async def create_category(
     
     result = await database.categories.insert_one(category_dict)
     category_dict["_id"] = result.inserted_id
+    response_cache.invalidate("categories")
     
     return category_to_response(category_dict)
 
@@ -109,18 +151,34 @@ async def update_category(
         update_dict["description"] = category_data.description
     if category_data.image is not None:
         update_dict["image"] = category_data.image
-    if category_data.parent is not None:
-        update_dict["parent"] = ObjectId(category_data.parent) if category_data.parent else None
     if category_data.is_active is not None:
         update_dict["is_active"] = category_data.is_active
     
+    # Moving a category rewrites the ancestors of its subtree and their products
+    moved = False
+    if category_data.parent is not None:
+        parent, _ = await resolve_parent(database, category_data.parent)
+        if parent != category.get("parent"):
+            try:
+                ancestors = await move_category(database, category, parent)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            update_dict["parent"] = parent
+            moved = True
+            # The subtree keeps its own counts; old and new ancestors gain/lose it
+            await refresh_category_stats(database, category.get("ancestors", []) + ancestors)
+    
     await database.categories.update_one(
         {"_id": ObjectId(category_id)},
         {"$set": update_dict}
     )
+    response_cache.invalidate("categories")
+    if moved:
+        response_cache.invalidate("products")
     
     updated_category = await database.categories.find_one({"_id": ObjectId(category_id)})
-    return category_to_response(updated_category)
+    stats = await database[STATS_COLLECTION].find_one({"_id": updated_category["_id"]})
+    return category_to_response(updated_category, stats)
 
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -134,10 +192,18 @@ async def delete_category(
     if not ObjectId.is_valid(category_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid category ID")
     
+    if await database.categories.find_one({"parent": ObjectId(category_id)}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Category has subcategories; move or delete them first"
+        )
+    
     result = await database.categories.delete_one({"_id": ObjectId(category_id)})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    await database[STATS_COLLECTION].delete_one({"_id": ObjectId(category_id)})
+    response_cache.invalidate("categories")
     
     return None
 
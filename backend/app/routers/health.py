@@ -1,5 +1,10 @@
+import asyncio
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.admission import admission, loop_monitor
+from app.config import settings
 from app.database import get_database
+from app.mongo_monitoring import pool_wait_summary
 
 router = APIRouter(prefix="/api/health", tags=["health"])
 
@@ -22,3 +27,40 @@ async def health_check():
             "error": str(e)
         }
 
+
+
+@router.get("/pool")
+async def pool_stats():
+    """MongoDB connection pool checkout wait times per server"""
+    return {"servers": pool_wait_summary()}
+
+
+@router.get("/live")
+async def liveness():
+    """Liveness probe: the worker's event loop is running"""
+    return {"status": "alive", "event_loop_lag_ms": round(loop_monitor.lag * 1000, 2)}
+
+
+@router.get("/ready")
+async def readiness():
+    """Readiness probe: database reachable, event loop responsive, queues not full.
+    Answers 503 so a load balancer stops routing here while it sheds load."""
+    problems = []
+    try:
+        await asyncio.wait_for(get_database().command("ping"), timeout=2)
+    except Exception as e:
+        problems.append(f"database: {str(e) or 'ping timed out'}")
+    lag_ms = loop_monitor.lag * 1000
+    if lag_ms > settings.admission_max_loop_lag_ms:
+        problems.append(f"event loop lag {lag_ms:.0f} ms")
+    saturated = admission.saturated()
+    if saturated:
+        problems.append(f"admission queues full: {', '.join(saturated)}")
+
+    body = {
+        "status": "not_ready" if problems else "ready",
+        "problems": problems,
+        "event_loop_lag_ms": round(lag_ms, 2),
+        "admission": admission.snapshot(),
+    }
+    return JSONResponse(status_code=503 if problems else 200, content=body)
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from bson import ObjectId
+from app.database import get_database
+from app.auth import get_current_admin_user
+from app.jobs import JOBS_COLLECTION, SCHEDULES_COLLECTION, enqueue, registry
+from app.models.job import JOB_STATUSES, JobCreate, JobResponse, JobScheduleResponse, JobStatsResponse
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+def job_to_response(job: dict) -> JobResponse:
+    return JobResponse(id=str(job["_id"]), **{k: v for k, v in job.items() if k != "_id"})
+
+
+@router.get("", response_model=List[JobResponse])
+async def get_jobs(
+    current_user: dict = Depends(get_current_admin_user),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    queue: Optional[str] = Query(None),
+    name: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+):
+    """Most recent jobs (admin only)"""
+    query = {}
+    if status_filter:
+        if status_filter not in JOB_STATUSES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid status")
+        query["status"] = status_filter
+    if queue:
+        query["queue"] = queue
+    if name:
+        query["name"] = name
+
+    cursor = get_database()[JOBS_COLLECTION].find(query).sort("created_at", -1).limit(limit)
+    return [job_to_response(job) async for job in cursor]
+
+
+@router.get("/stats", response_model=JobStatsResponse)
+async def get_job_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Jobs per queue and status, and the periodic schedules (admin only)"""
+    database = get_database()
+    counts = {}
+    async for row in database[JOBS_COLLECTION].aggregate([
+        {"$group": {"_id": {"queue": "$queue", "status": "$status"}, "count": {"$sum": 1}}}
+    ]):
+        counts.setdefault(row["_id"]["queue"], {})[row["_id"]["status"]] = row["count"]
+
+    schedules = [
+        JobScheduleResponse(name=doc["_id"], spec=doc["spec"], next_run_at=doc["next_run_at"],
+                            last_run_at=doc.get("last_run_at"))
+        async for doc in database[SCHEDULES_COLLECTION].find().sort("_id", 1)
+    ]
+    return JobStatsResponse(counts=counts, schedules=schedules)
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
+async def create_job(job_data: JobCreate, current_user: dict = Depends(get_current_admin_user)):
+    """Queue a registered job, e.g. recommendations.build (admin only)"""
+    if job_data.name not in registry:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job; available: {', '.join(sorted(registry))}"
+        )
+    run_at = datetime.utcnow() + timedelta(seconds=job_data.delay_seconds)
+    job = await enqueue(get_database(), job_data.name, job_data.payload, run_at=run_at)
+    return job_to_response(job)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, current_user: dict = Depends(get_current_admin_user)):
+    """One job with its result or last error (admin only)"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid job ID")
+    job = await get_database()[JOBS_COLLECTION].find_one({"_id": ObjectId(job_id)})
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job_to_response(job)
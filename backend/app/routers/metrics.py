@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.metrics import register_collector, Gauge, render_prometheus
+from app.response_cache import response_cache
+
+router = APIRouter(tags=["metrics"])
+
+response_cache_entries = Gauge("response_cache_entries", "Entries in the catalog response cache")
+response_cache_bytes = Gauge("response_cache_bytes", "Bytes held by the catalog response cache")
+response_cache_lookups = Gauge("response_cache_lookups", "Catalog response cache lookups since start", ["result"])
+
+
+@register_collector
+def collect_response_cache():
+    stats = response_cache.stats()
+    response_cache_entries.set(stats["entries"])
+    response_cache_bytes.set(stats["bytes"])
+    response_cache_lookups.set(stats["hits"], result="hit")
+    response_cache_lookups.set(stats["misses"], result="miss")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
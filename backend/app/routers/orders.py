@@ -1,9 +1,15 @@
+import asyncio
+import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
 from datetime import datetime, timedelta
 
+from app.config import settings
 from app.database import get_database
+from app.order_archive import ARCHIVE_COLLECTION, get_archive_stats, with_archive
+from app.order_feed import order_feed
 from app.auth import get_current_active_user, get_current_admin_user
 from app.models.order import (
     OrderCreate,
@@ -31,9 +37,21 @@ def order_to_response(order: dict) -> OrderResponse:
         status_notes=order.get("status_notes", []),
         created_at=order.get("created_at", datetime.utcnow()),
         updated_at=order.get("updated_at", datetime.utcnow()),
+        archived_at=order.get("archived_at"),
     )
 
 
+async def find_orders(database, query: dict, include_archived: bool, limit: int) -> List[dict]:
+    """Newest orders matching `query`, from orders_archive too when asked for history"""
+    if not include_archived:
+        return await database.orders.find(query).sort("created_at", -1).to_list(length=limit)
+    # Each side returns its own newest `limit` through its created_at index;
+    # only those (at most 2 * limit) are merged
+    newest = [{"$sort": {"created_at": -1}}, {"$limit": limit}]
+    pipeline = with_archive([{"$match": query}] + newest) + newest
+    return await database.orders.aggregate(pipeline).to_list(length=limit)
+
+
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: OrderCreate,
@@ -99,24 +117,21 @@ async def create_order(
 
     result = await database.orders.insert_one(order_dict)
     order_dict["_id"] = result.inserted_id
+    order_feed.publish_local("created", order_dict)
 
     # Clear cart after successful order
-    await database.carts.update_one(
-        {"_id": cart["_id"]},
-        {"$set": {"items": [], "updated_at": datetime.utcnow()}},
-    )
+    await database.carts.delete_one({"_id": cart["_id"]})
 
     return order_to_response(order_dict)
 
 
 @router.get("", response_model=List[OrderResponse])
-async def get_my_orders(current_user: dict = Depends(get_current_active_user)):
+async def get_my_orders(
+    current_user: dict = Depends(get_current_active_user),
+    include_archived: bool = Query(False, description="Gồm cả đơn cũ đã lưu trữ"),
+):
     database = get_database()
-    cursor = (
-        database.orders.find({"user_id": current_user["id"]})
-        .sort("created_at", -1)
-    )
-    orders = await cursor.to_list(length=100)
+    orders = await find_orders(database, {"user_id": current_user["id"]}, include_archived, 100)
     return [order_to_response(order) for order in orders]
 
 
@@ -127,6 +142,7 @@ async def get_all_orders(
     search: Optional[str] = Query(None, description="Tìm theo tên/email khách hàng"),
     start_date: Optional[str] = Query(None, description="ISO date from"),
     end_date: Optional[str] = Query(None, description="ISO date to"),
+    include_archived: bool = Query(False, description="Tìm cả trong đơn đã lưu trữ"),
 ):
     database = get_database()
     query = {}
@@ -149,8 +165,7 @@ async def get_all_orders(
         if end_date:
             query["created_at"]["$lte"] = datetime.fromisoformat(end_date)
 
-    cursor = database.orders.find(query).sort("created_at", -1)
-    orders = await cursor.to_list(length=200)
+    orders = await find_orders(database, query, include_archived, 200)
     return [order_to_response(order) for order in orders]
 
 
@@ -172,9 +187,14 @@ async def get_order_summary(current_user: dict = Depends(get_current_admin_user)
     status_list = await status_cursor.to_list(length=None)
     status_counts = {item["_id"]: item["count"] for item in status_list if item["_id"]}
 
+    # Archived orders count too, from totals kept by the archiving job
+    archived = await get_archive_stats(database)
+    for order_status, count in archived["status_counts"].items():
+        status_counts[order_status] = status_counts.get(order_status, 0) + count
+
     return OrderSummaryResponse(
-        total_orders=total_orders,
-        total_revenue=total_revenue,
+        total_orders=total_orders + archived["total_orders"],
+        total_revenue=total_revenue + archived["total_revenue"],
         status_counts=status_counts
     )
 
@@ -184,9 +204,11 @@ async def get_order_metrics(current_user: dict = Depends(get_current_admin_user)
     database = get_database()
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     start = today - timedelta(days=6)
+    # Both charts cover the last 7 days, archived orders included (the window
+    # is selected through each collection's created_at index)
+    recent = with_archive([{"$match": {"created_at": {"$gte": start}}}])
 
-    revenue_cursor = database.orders.aggregate([
-        {"$match": {"created_at": {"$gte": start}}},
+    revenue_cursor = database.orders.aggregate(recent + [
         {
             "$group": {
                 "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
@@ -201,7 +223,7 @@ async def get_order_metrics(current_user: dict = Depends(get_current_admin_user)
         for item in revenue_data
     ]
 
-    top_products_cursor = database.orders.aggregate([
+    top_products_cursor = database.orders.aggregate(recent + [
         {"$unwind": "$items"},
         {
             "$group": {
@@ -230,6 +252,55 @@ async def get_order_metrics(current_user: dict = Depends(get_current_admin_user)
     )
 
 
+def sse_message(event: str, data: dict, event_id: Optional[str] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, ensure_ascii=False)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/events")
+async def stream_order_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: dict = Depends(get_current_admin_user),
+):
+    """Server-sent events of created, updated and deleted orders for the admin dashboard"""
+    if len(order_feed.subscribers) >= settings.order_events_max_subscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Quá nhiều kết nối theo dõi đơn hàng",
+            headers={"Retry-After": str(settings.order_events_retry_ms // 1000 or 1)},
+        )
+    subscription = order_feed.subscribe(last_event_id)
+
+    async def events():
+        try:
+            yield f"retry: {settings.order_events_retry_ms}\n\n"
+            yield sse_message("ready", {"mode": order_feed.mode})
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), settings.order_events_keepalive)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                order = event["order"]
+                yield sse_message(event["type"], {
+                    "order_id": event["order_id"],
+                    "order": order_to_response(order).model_dump(mode="json") if order else None,
+                }, event["id"])
+        finally:
+            order_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order_detail(
     order_id: str,
@@ -240,6 +311,9 @@ async def get_order_detail(
 
     database = get_database()
     order = await database.orders.find_one({"_id": ObjectId(order_id)})
+    if not order:
+        # An id lookup is cheap, so old links keep working after archiving
+        order = await database[ARCHIVE_COLLECTION].find_one({"_id": ObjectId(order_id)})
     if not order:
         raise HTTPException(status_code=404, detail="Không tìm thấy đơn hàng")
 
@@ -279,5 +353,6 @@ async def update_order_status(
     )
 
     updated_order = await database.orders.find_one({"_id": ObjectId(order_id)})
+    order_feed.publish_local("updated", updated_order)
     return order_to_response(updated_order)
 
@@ -0,0 +1,193 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.auth import get_current_admin_user
+from app.database import get_database
+from app.models.pricing import SCHEDULE_STATUSES, BulkPricingRequest, BulkPricingResponse, PriceScheduleResponse
+from app.models.product import ProductImportResponse
+from app.pricing import SCHEDULES_COLLECTION, apply_change, claim, end_schedule, start_schedule, to_utc
+from app.product_import import IMPORTS_COLLECTION, ROW_READERS, ProductImporter
+
+# Registered before the products router so /import(s) is not taken for a product id
+router = APIRouter(prefix="/api/products", tags=["products"])
+
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-lines": "ndjson",
+}
+
+
+def import_to_response(doc: dict) -> ProductImportResponse:
+    """Convert MongoDB document to ProductImportResponse"""
+    return ProductImportResponse(id=str(doc["_id"]), **{k: v for k, v in doc.items() if k != "_id"})
+
+
+@router.post("/import", response_model=ProductImportResponse)
+async def import_products(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson (default: from Content-Type)"),
+    dry_run: bool = Query(False, description="Validate only, write nothing"),
+    current_user: dict = Depends(get_current_admin_user),
+):
+    """Bulk create/update products from a streamed CSV or NDJSON body (admin only)"""
+    import_format = format or CONTENT_TYPE_FORMATS.get(
+        request.headers.get("content-type", "").split(";")[0].strip().lower()
+    )
+    if import_format not in ROW_READERS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson",
+        )
+
+    importer = ProductImporter(get_database(), import_format, dry_run, current_user["username"])
+    report = await importer.run(request.stream())
+    return import_to_response(report)
+
+
+@router.get("/imports", response_model=List[ProductImportResponse])
+async def list_imports(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_admin_user),
+):
+    """List recent imports with their progress, without row errors (admin only)"""
+    database = get_database()
+    cursor = database[IMPORTS_COLLECTION].find({}, {"errors": 0}).sort("started_at", -1).limit(limit)
+    return [import_to_response(doc) for doc in await cursor.to_list(length=limit)]
+
+
+@router.get("/imports/{import_id}", response_model=ProductImportResponse)
+async def get_import(import_id: str, current_user: dict = Depends(get_current_admin_user)):
+    """Get an import's progress or final report (admin only)"""
+    if not ObjectId.is_valid(import_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid import ID")
+
+    doc = await get_database()[IMPORTS_COLLECTION].find_one({"_id": ObjectId(import_id)})
+    if not doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import not found")
+    return import_to_response(doc)
+
+
+def schedule_to_response(doc: dict) -> PriceScheduleResponse:
+    """Convert MongoDB document to PriceScheduleResponse"""
+    return PriceScheduleResponse(
+        id=str(doc["_id"]),
+        name=doc.get("name"),
+        status=doc["status"],
+        filter=doc.get("filter"),
+        change=doc.get("change"),
+        items_count=len(doc.get("items") or []),
+        starts_at=doc.get("starts_at"),
+        ends_at=doc.get("ends_at"),
+        applied=doc.get("applied"),
+        reverted=doc.get("reverted"),
+        error=doc.get("error"),
+        created_by=doc.get("created_by"),
+        created_at=doc["created_at"],
+    )
+
+
+def validate_ids(pricing: BulkPricingRequest):
+    ids = [item.product_id for item in pricing.items or []]
+    if pricing.filter is not None:
+        ids += pricing.filter.ids or []
+        if pricing.filter.category:
+            ids.append(pricing.filter.category)
+    invalid = [value for value in ids if not ObjectId.is_valid(value)]
+    if invalid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid ID: {invalid[0]}")
+
+
+@router.post("/pricing", response_model=BulkPricingResponse)
+async def bulk_pricing(
+    pricing: BulkPricingRequest,
+    current_user: dict = Depends(get_current_admin_user),
+):
+    """Change price/discount of many products at once, now or as a timed sale (admin only)"""
+    database = get_database()
+    validate_ids(pricing)
+    starts_at = to_utc(pricing.starts_at)
+    ends_at = to_utc(pricing.ends_at)
+    now = datetime.utcnow()
+
+    if starts_at is None and ends_at is None:
+        result = await apply_change(database, pricing.filter, pricing.change, pricing.items)
+        return BulkPricingResponse(status="applied", result=result)
+
+    if ends_at is not None and ends_at <= now:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ends_at is in the past")
+
+    schedule = {
+        "name": pricing.name,
+        "status": "scheduled",
+        "filter": pricing.filter.model_dump() if pricing.filter else None,
+        "change": pricing.change.model_dump() if pricing.change else None,
+        "items": [item.model_dump() for item in pricing.items] if pricing.items else None,
+        "starts_at": starts_at or now,
+        "ends_at": ends_at,
+        "created_by": current_user["username"],
+        "created_at": now,
+    }
+    result = await database[SCHEDULES_COLLECTION].insert_one(schedule)
+    schedule["_id"] = result.inserted_id
+
+    # Sales starting now are applied in this request; later ones by the scheduler loop
+    if schedule["starts_at"] <= now:
+        claimed = await claim(database, {"_id": schedule["_id"], "status": "scheduled"}, "starting")
+        if claimed:
+            schedule = await start_schedule(database, claimed)
+    return BulkPricingResponse(
+        status=schedule["status"],
+        result=schedule.get("applied"),
+        schedule=schedule_to_response(schedule),
+    )
+
+
+@router.get("/pricing/schedules", response_model=List[PriceScheduleResponse])
+async def list_price_schedules(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_admin_user),
+):
+    """List sales, newest first (admin only)"""
+    query = {}
+    if status_filter:
+        if status_filter not in SCHEDULE_STATUSES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid status")
+        query["status"] = status_filter
+    cursor = get_database()[SCHEDULES_COLLECTION].find(query).sort("created_at", -1).limit(limit)
+    return [schedule_to_response(doc) for doc in await cursor.to_list(length=limit)]
+
+
+@router.delete("/pricing/schedules/{schedule_id}", response_model=PriceScheduleResponse)
+async def cancel_price_schedule(schedule_id: str, current_user: dict = Depends(get_current_admin_user)):
+    """Cancel a sale; a running sale has its previous prices restored (admin only)"""
+    if not ObjectId.is_valid(schedule_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid schedule ID")
+    database = get_database()
+    collection = database[SCHEDULES_COLLECTION]
+
+    schedule = await collection.find_one_and_update(
+        {"_id": ObjectId(schedule_id), "status": "scheduled"},
+        {"$set": {"status": "cancelled"}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if schedule:
+        return schedule_to_response(schedule)
+
+    schedule = await claim(database, {"_id": ObjectId(schedule_id), "status": "active"}, "ending")
+    if schedule:
+        return schedule_to_response(await end_schedule(database, schedule, status="cancelled"))
+
+    existing = await collection.find_one({"_id": ObjectId(schedule_id)})
+    if not existing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Schedule not found")
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Schedule is {existing['status']} and cannot be cancelled",
+    )
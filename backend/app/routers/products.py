@@ -1,9 +1,17 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from app.database import get_database
-from app.models.product import ProductCreate, ProductUpdate, ProductResponse
+from app.database import get_catalog_database, get_database
+from app.models.product import ProductCreate, ProductUpdate, ProductResponse, RelatedProductResponse
 from app.auth import get_current_active_user, get_current_admin_user
 from app.utils import generate_slug
+from app.pricing import effective_price, literal_pipeline
+from app.reviews import rating_fields
+from app.category_tree import category_path
+from app.category_stats import record_product_change
+from app.recommendations import RELATED_COLLECTION
+from app.search import product_search
+from app.analytics import analytics
+from app.response_cache import response_cache
 from bson import ObjectId
 from datetime import datetime
 import math
@@ -21,6 +29,7 @@ def product_to_response(product: dict) -> ProductResponse:
         price=product["price"],
         currency=product.get("currency", "VND"),
         discount=product.get("discount", 0.0),
+        effective_price=product.get("effective_price", effective_price(product["price"], product.get("discount"))),
         category=str(product["category"]) if product.get("category") else None,
         tags=product.get("tags", []),
         brand=product.get("brand"),
@@ -29,42 +38,57 @@ def product_to_response(product: dict) -> ProductResponse:
         stock=product.get("stock", 0),
         rating=product.get("rating", 0.0),
         reviews_count=product.get("reviews_count", 0),
+        rating_histogram=product.get("rating_histogram", {}),
         created_at=product.get("created_at", datetime.utcnow()),
         updated_at=product.get("updated_at", datetime.utcnow())
     )
 
 
+async def resolve_category_path(database, category: Optional[ObjectId]) -> List[ObjectId]:
+    try:
+        return await category_path(database, category)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Category not found")
+
+
 @router.get("", response_model=dict)
 async def get_products(
     q: Optional[str] = Query(None, description="Search query"),
-    category: Optional[str] = Query(None, description="Category ID"),
-    min_price: Optional[float] = Query(None, description="Minimum price"),
-    max_price: Optional[float] = Query(None, description="Maximum price"),
+    category: Optional[str] = Query(None, description="Category ID (includes its subcategories)"),
+    min_price: Optional[float] = Query(None, description="Minimum price after discount"),
+    max_price: Optional[float] = Query(None, description="Maximum price after discount"),
     brand: Optional[str] = Query(None, description="Brand filter"),
     tags: Optional[str] = Query(None, description="Comma-separated tags"),
-    sort: Optional[str] = Query("created_at", description="Sort field (price, created_at, rating, name)"),
+    sort: Optional[str] = Query(None, description="Sort field (relevance, price, created_at, rating, name); relevance when searching, else created_at"),
     order: Optional[str] = Query("desc", description="Sort order (asc, desc)"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page")
 ):
     """Get products with search, filter, and pagination"""
-    database = get_database()
+    database = get_catalog_database()
     
     # Build query
     query = {}
     
+    # Search ranks with the in-process index; $text until it is built
+    ranked = None
     if q:
-        query["$text"] = {"$search": q}
+        ranked = product_search.search(q)
+        if ranked is None:
+            query["$text"] = {"$search": q}
+        else:
+            query["_id"] = {"$in": [product_id for product_id, _ in ranked]}
     
     if category:
-        query["category"] = ObjectId(category)
+        query["category_path"] = ObjectId(category)
     
+    # Prices are what the customer pays, i.e. after discount
     if min_price is not None or max_price is not None:
-        query["price"] = {}
+        query["effective_price"] = {}
         if min_price is not None:
-            query["price"]["$gte"] = min_price
+            query["effective_price"]["$gte"] = min_price
         if max_price is not None:
-            query["price"]["$lte"] = max_price
+            query["effective_price"]["$lte"] = max_price
     
     if brand:
         query["brand"] = {"$regex": brand, "$options": "i"}
@@ -76,21 +100,40 @@ async def get_products(
     # Sort
     sort_order = -1 if order == "desc" else 1
     sort_field_map = {
-        "price": "price",
+        "price": "effective_price",
         "created_at": "created_at",
         "rating": "rating",
         "name": "name"
     }
-    sort_field = sort_field_map.get(sort, "created_at")
-    
-    # Count total
-    total = await database.products.count_documents(query)
-    
-    # Get products
+    if sort is None:
+        sort = "relevance" if q else "created_at"
     skip = (page - 1) * limit
-    cursor = database.products.find(query).sort(sort_field, sort_order).skip(skip).limit(limit)
-    products = await cursor.to_list(length=limit)
     
+    if q and sort == "relevance" and ranked is not None:
+        # Filter the ranked ids in MongoDB, then page through them in rank order
+        matching = {p["_id"] async for p in database.products.find(query, {"_id": 1})}
+        ordered = [product_id for product_id, _ in ranked if product_id in matching]
+        total = len(ordered)
+        page_ids = ordered[skip:skip + limit]
+        found = {p["_id"]: p async for p in database.products.find({"_id": {"$in": page_ids}})}
+        products = [found[product_id] for product_id in page_ids if product_id in found]
+    else:
+        if q and sort == "relevance":
+            sort_spec = [("score", {"$meta": "textScore"})]
+        else:
+            sort_spec = [(sort_field_map.get(sort, "created_at"), sort_order)]
+        
+        # Count total
+        total = await database.products.count_documents(query)
+        
+        # Get products
+        cursor = database.products.find(query).sort(sort_spec).skip(skip).limit(limit)
+        products = await cursor.to_list(length=limit)
+    
+    # Later pages of the same search are not new searches
+    if q and page == 1:
+        analytics.record_search(q, total)
+
     # Convert to response
     products_list = [product_to_response(p) for p in products]
     
@@ -106,7 +149,7 @@ async def get_products(
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(product_id: str):
     """Get a single product by ID"""
-    database = get_database()
+    database = get_catalog_database()
     
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid product ID")
@@ -116,19 +159,59 @@ async def get_product(product_id: str):
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     
+    analytics.record_view(product["_id"])
     return product_to_response(product)
 
 
+@router.get("/{product_id}/related", response_model=List[RelatedProductResponse])
+async def get_related_products(
+    product_id: str,
+    limit: int = Query(8, ge=1, le=50, description="Number of products")
+):
+    """Get products frequently bought together with a product (precomputed by build_recommendations.py)"""
+    database = get_catalog_database()
+    
+    if not ObjectId.is_valid(product_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid product ID")
+    
+    # One round trip: the neighbour list joined with the products it names
+    cursor = database[RELATED_COLLECTION].aggregate([
+        {"$match": {"_id": ObjectId(product_id)}},
+        {"$project": {"related": {"$slice": ["$related", limit]}}},
+        {"$lookup": {
+            "from": "products",
+            "localField": "related.product_id",
+            "foreignField": "_id",
+            "as": "products"
+        }},
+    ])
+    docs = await cursor.to_list(length=1)
+    if not docs:
+        return []
+    
+    products = {p["_id"]: p for p in docs[0]["products"]}
+    return [
+        RelatedProductResponse(
+            **product_to_response(products[item["product_id"]]).model_dump(),
+            score=item["score"],
+            bought_together=item["count"]
+        )
+        for item in docs[0]["related"]
+        if item["product_id"] in products
+    ]
+
+
 @router.get("/slug/{slug}", response_model=ProductResponse)
 async def get_product_by_slug(slug: str):
     """Get a product by slug"""
-    database = get_database()
+    database = get_catalog_database()
     
     product = await database.products.find_one({"slug": slug})
     
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     
+    analytics.record_view(product["_id"])
     return product_to_response(product)
 
 
@@ -148,6 +231,7 @@ async def create_product(
     if existing:
         slug = f"{slug}-{int(datetime.utcnow().timestamp())}"
     
+    category = ObjectId(product_data.category) if product_data.category else None
     product_dict = {
         "name": product_data.name,
         "slug": slug,
@@ -155,20 +239,24 @@ async def create_product(
         "price": product_data.price,
         "currency": product_data.currency,
         "discount": product_data.discount,
-        "category": ObjectId(product_data.category) if product_data.category else None,
+        "effective_price": effective_price(product_data.price, product_data.discount),
+        "category": category,
+        "category_path": await resolve_category_path(database, category),
         "tags": product_data.tags,
         "brand": product_data.brand,
         "images": product_data.images,
         "specs": product_data.specs,
         "stock": product_data.stock,
-        "rating": 0.0,
-        "reviews_count": 0,
+        **rating_fields({}),
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
     
     result = await database.products.insert_one(product_dict)
     product_dict["_id"] = result.inserted_id
+    await record_product_change(database, None, product_dict)
+    product_search.add(product_dict)
+    response_cache.invalidate("products")
     
     return product_to_response(product_dict)
 
@@ -206,6 +294,7 @@ async def update_product(
         update_dict["discount"] = product_data.discount
     if product_data.category is not None:
         update_dict["category"] = ObjectId(product_data.category) if product_data.category else None
+        update_dict["category_path"] = await resolve_category_path(database, update_dict["category"])
     if product_data.tags is not None:
         update_dict["tags"] = product_data.tags
     if product_data.brand is not None:
@@ -217,12 +306,16 @@ async def update_product(
     if product_data.stock is not None:
         update_dict["stock"] = product_data.stock
     
+    # Pipeline update so effective_price follows the stored price/discount
     await database.products.update_one(
         {"_id": ObjectId(product_id)},
-        {"$set": update_dict}
+        literal_pipeline(update_dict)
     )
-    
     updated_product = await database.products.find_one({"_id": ObjectId(product_id)})
+    await record_product_change(database, product, updated_product)
+    product_search.add(updated_product)
+    response_cache.invalidate("products")
+    
     return product_to_response(updated_product)
 
 
@@ -237,10 +330,13 @@ async def delete_product(
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid product ID")
     
-    result = await database.products.delete_one({"_id": ObjectId(product_id)})
+    product = await database.products.find_one_and_delete({"_id": ObjectId(product_id)})
     
-    if result.deleted_count == 0:
+    if product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    await record_product_change(database, product, None)
+    product_search.remove(product["_id"])
+    response_cache.invalidate("products")
     
     return None
 
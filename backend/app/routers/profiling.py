@@ -0,0 +1,64 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from app.auth import get_current_admin_user
+from app.profiling import profiler
+
+router = APIRouter(prefix="/api/admin/profiles", tags=["profiling"])
+
+
+class SamplingConfig(BaseModel):
+    route: str = Field(..., description="Route template, e.g. /api/orders/metrics")
+    every: int = Field(..., ge=1, description="Profile 1 in N requests")
+
+
+@router.get("", response_model=List[dict])
+async def list_profiles(current_user: dict = Depends(get_current_admin_user)):
+    """List profiles held by this worker (newest first)"""
+    return [p.summary() for p in reversed(profiler.profiles)]
+
+
+@router.get("/sampling")
+async def get_sampling(current_user: dict = Depends(get_current_admin_user)):
+    """Get this worker's sampling-mode configuration"""
+    return {"route": profiler.sample_route, "every": profiler.sample_every}
+
+
+@router.put("/sampling")
+async def set_sampling(config: SamplingConfig, current_user: dict = Depends(get_current_admin_user)):
+    """Profile 1 in N requests to a route (per worker, until restart)"""
+    profiler.configure_sampling(config.route, config.every)
+    return {"route": profiler.sample_route, "every": profiler.sample_every}
+
+
+@router.delete("/sampling", status_code=status.HTTP_204_NO_CONTENT)
+async def disable_sampling(current_user: dict = Depends(get_current_admin_user)):
+    """Turn sampling mode off"""
+    profiler.configure_sampling(None, 0)
+    return None
+
+
+@router.get("/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: Optional[str] = Query("speedscope", description="speedscope or collapsed"),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Download a profile as speedscope JSON or collapsed stacks"""
+    profile = profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+
+    filename = f"profile-{profile.id}"
+    if format == "collapsed":
+        return PlainTextResponse(
+            profile.collapsed(),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.folded"'}
+        )
+    if format == "speedscope":
+        return JSONResponse(
+            profile.speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.speedscope.json"'}
+        )
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Format must be speedscope or collapsed")
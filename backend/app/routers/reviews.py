@@ -0,0 +1,156 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from datetime import datetime
+import math
+
+from app.database import get_catalog_database, get_database
+from app.auth import get_current_active_user
+from app.models.review import ReviewCreate, ReviewUpdate, ReviewResponse
+from app.reviews import rating_change_pipeline
+from app.response_cache import response_cache
+
+router = APIRouter(prefix="/api/products", tags=["reviews"])
+
+
+def review_to_response(review: dict) -> ReviewResponse:
+    """Convert MongoDB document to ReviewResponse"""
+    return ReviewResponse(
+        id=str(review["_id"]),
+        product_id=str(review["product_id"]),
+        user_id=review["user_id"],
+        username=review["username"],
+        rating=review["rating"],
+        title=review.get("title"),
+        comment=review.get("comment"),
+        created_at=review["created_at"],
+        updated_at=review["updated_at"]
+    )
+
+
+def validate_ids(*ids: str):
+    if not all(ObjectId.is_valid(value) for value in ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ID")
+
+
+async def apply_rating_change(database, product_id: ObjectId, changes: dict):
+    """Fold a review change into the product's rating aggregates"""
+    await database.products.update_one({"_id": product_id}, rating_change_pipeline(changes))
+    response_cache.invalidate("products")
+
+
+@router.get("/{product_id}/reviews", response_model=dict)
+async def get_reviews(
+    product_id: str,
+    rating: Optional[int] = Query(None, ge=1, le=5, description="Only reviews with this many stars"),
+    page: int = Query(1, ge=1, description="Page number"),
+    limit: int = Query(10, ge=1, le=50, description="Items per page")
+):
+    """Get a product's reviews, newest first"""
+    validate_ids(product_id)
+    database = get_catalog_database()
+
+    query = {"product_id": ObjectId(product_id)}
+    if rating is not None:
+        query["rating"] = rating
+
+    total = await database.reviews.count_documents(query)
+    cursor = database.reviews.find(query).sort("created_at", -1).skip((page - 1) * limit).limit(limit)
+    reviews = await cursor.to_list(length=limit)
+
+    return {
+        "items": [review_to_response(r) for r in reviews],
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "pages": math.ceil(total / limit) if total > 0 else 0
+    }
+
+
+@router.post("/{product_id}/reviews", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
+async def create_review(
+    product_id: str,
+    review_data: ReviewCreate,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Review a product (one review per user and product)"""
+    validate_ids(product_id)
+    database = get_database()
+
+    if not await database.products.find_one({"_id": ObjectId(product_id)}, {"_id": 1}):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+
+    now = datetime.utcnow()
+    review = {
+        "product_id": ObjectId(product_id),
+        "user_id": current_user["id"],
+        "username": current_user["username"],
+        "rating": review_data.rating,
+        "title": review_data.title,
+        "comment": review_data.comment,
+        "created_at": now,
+        "updated_at": now
+    }
+    try:
+        result = await database.reviews.insert_one(review)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="You have already reviewed this product")
+    review["_id"] = result.inserted_id
+
+    await apply_rating_change(database, review["product_id"], {review_data.rating: 1})
+    return review_to_response(review)
+
+
+@router.put("/{product_id}/reviews/{review_id}", response_model=ReviewResponse)
+async def update_review(
+    product_id: str,
+    review_id: str,
+    review_data: ReviewUpdate,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Edit your own review"""
+    validate_ids(product_id, review_id)
+    database = get_database()
+
+    update_dict = {"updated_at": datetime.utcnow()}
+    for field in ("rating", "title", "comment"):
+        value = getattr(review_data, field)
+        if value is not None:
+            update_dict[field] = value
+
+    # The previous version tells which histogram bucket to move the review out of
+    before = await database.reviews.find_one_and_update(
+        {"_id": ObjectId(review_id), "product_id": ObjectId(product_id), "user_id": current_user["id"]},
+        {"$set": update_dict},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not before:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found")
+
+    if review_data.rating is not None and review_data.rating != before["rating"]:
+        await apply_rating_change(database, before["product_id"], {before["rating"]: -1, review_data.rating: 1})
+    return review_to_response({**before, **update_dict})
+
+
+@router.delete("/{product_id}/reviews/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_review(
+    product_id: str,
+    review_id: str,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Delete your own review (admins can delete any)"""
+    validate_ids(product_id, review_id)
+    database = get_database()
+
+    query = {"_id": ObjectId(review_id), "product_id": ObjectId(product_id)}
+    if current_user.get("role") != "admin":
+        query["user_id"] = current_user["id"]
+
+    review = await database.reviews.find_one_and_delete(query)
+    if not review:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found")
+
+    await apply_rating_change(database, review["product_id"], {review["rating"]: -1})
+    return None
@@ -0,0 +1,19 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from bson import ObjectId
+from app.trending import trending
+
+# Registered before the products router so /trending is not taken for a product id
+router = APIRouter(prefix="/api/products", tags=["products"])
+
+
+@router.get("/trending", responses={200: {"description": "List of TrendingProductResponse"}})
+async def get_trending_products(
+    category: Optional[str] = Query(None, description="Category ID (includes its subcategories)"),
+    limit: int = Query(8, ge=1, le=24, description="Number of products")
+):
+    """Get bestsellers by recent sales, from the ranking kept in memory"""
+    if category is not None and not ObjectId.is_valid(category):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid category ID")
+    body = await trending.get(category, limit)
+    return Response(content=body, media_type="application/json")
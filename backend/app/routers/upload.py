@@ -1,64 +1,279 @@
-import os
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status, UploadFile, File
+from fastapi.responses import RedirectResponse
+from pydantic import BaseModel
 from app.auth import get_current_active_user
 from app.config import settings
+from app.database import get_database
+from app.images import VARIANT_SIZES, VARIANT_FORMATS, pick_variant_format, process_upload, variant_key
+from app.static_files import guess_content_type, is_immutable_name, serve_file
+from app.storage import CHUNK_SIZE, get_storage
 from pathlib import Path
-import aiofiles
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import mimetypes
 import uuid
 
 router = APIRouter(prefix="/api/upload", tags=["upload"])
+logger = logging.getLogger(__name__)
 
-# Create upload directory if it doesn't exist
-upload_dir = Path(settings.upload_dir)
-upload_dir.mkdir(parents=True, exist_ok=True)
+# How long after its form expires a presigned upload can still be completed,
+# for uploads started just before the deadline
+PENDING_UPLOAD_GRACE = timedelta(minutes=15)
+
+
+class PresignRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+
+
+class UploadComplete(BaseModel):
+    filename: str
+
+
+def check_content_type(content_type: str):
+    if content_type not in settings.allowed_extensions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(settings.allowed_extensions)}"
+        )
+
+
+def require_presigned_uploads(storage):
+    if not storage.supports_presigned_uploads:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Direct uploads are not supported by the configured storage"
+        )
+
+
+def file_extension(filename: str, content_type: str) -> str:
+    return Path(filename).suffix.lower() or mimetypes.guess_extension(content_type) or ""
+
+
+def upload_to_response(filename: str, content_type: str, size: int) -> dict:
+    file_url = f"/api/upload/{filename}"
+    return {
+        "filename": filename,
+        "url": file_url,
+        "content_type": content_type,
+        "size": size,
+        "variants": {variant: f"{file_url}?size={variant}" for variant in VARIANT_SIZES}
+    }
+
+
+async def record_upload(filename: str, content_type: str, size: int, user_id: str):
+    database = get_database()
+    await database.uploads.update_one(
+        {"filename": filename},
+        {"$setOnInsert": {
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "uploaded_by": user_id,
+            "variants": [],
+            "created_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+
+async def generate_upload_variants(filename: str):
+    """Background task: build the resized variants of a fresh upload"""
+    try:
+        await process_upload(filename)
+    except Exception:
+        # The original is still served, so a bad image must not fail the upload
+        logger.exception("Failed to generate variants for %s", filename)
 
 
 @router.post("")
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Upload a file (image)"""
-    # Check file type
-    if file.content_type not in settings.allowed_extensions:
+    check_content_type(file.content_type)
+
+    # Name the file after its content so the URL can be cached forever.
+    # The body is already spooled by the form parser, so hashing it first is cheap.
+    digest = hashlib.sha256()
+    while chunk := await file.read(CHUNK_SIZE):
+        digest.update(chunk)
+    unique_filename = f"{digest.hexdigest()[:32]}{file_extension(file.filename, file.content_type)}"
+
+    storage = get_storage()
+    existing = await storage.stat(unique_filename)
+
+    # Identical content is already stored (with its variants)
+    if existing:
+        size = existing.size
+    else:
+        await file.seek(0)
+
+        async def chunks():
+            while chunk := await file.read(CHUNK_SIZE):
+                yield chunk
+
+        size = await storage.save(unique_filename, chunks(), file.content_type)
+        background_tasks.add_task(generate_upload_variants, unique_filename)
+
+    await record_upload(unique_filename, file.content_type, size, current_user["id"])
+
+    return upload_to_response(unique_filename, file.content_type, size)
+
+
+@router.post("/presign")
+async def presign_upload(
+    upload: PresignRequest,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get a presigned form so the client uploads straight to object storage"""
+    check_content_type(upload.content_type)
+
+    if upload.size <= 0 or upload.size > settings.max_upload_size:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File type not allowed. Allowed types: {', '.join(settings.allowed_extensions)}"
+            detail=f"File size must be between 1 and {settings.max_upload_size} bytes"
         )
-    
-    # Generate unique filename
-    file_ext = Path(file.filename).suffix
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = upload_dir / unique_filename
-    
-    # Save file
-    content = await file.read()
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
-    
-    # Return file URL
-    file_url = f"/api/upload/{unique_filename}"
-    
+
+    storage = get_storage()
+    require_presigned_uploads(storage)
+
+    # The content isn't known yet, so use a random (still never reused) name
+    filename = f"{uuid.uuid4().hex}{file_extension(upload.filename, upload.content_type)}"
+    presigned = await storage.presign_upload(filename, upload.content_type, settings.max_upload_size)
+
+    # Only names issued here, to this user, can be completed
+    now = datetime.utcnow()
+    await get_database().pending_uploads.insert_one({
+        "_id": filename,
+        "user_id": current_user["id"],
+        "content_type": upload.content_type,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=settings.s3_presign_expires) + PENDING_UPLOAD_GRACE
+    })
+
     return {
-        "filename": unique_filename,
-        "url": file_url,
-        "content_type": file.content_type,
-        "size": len(content)
+        "filename": filename,
+        "upload_url": presigned["url"],
+        "fields": presigned["fields"],
+        "expires_in": settings.s3_presign_expires
     }
 
 
-@router.get("/{filename}")
-async def get_file(filename: str):
-    """Get uploaded file"""
-    file_path = upload_dir / filename
-    
-    if not file_path.exists():
+@router.post("/complete")
+async def complete_upload(
+    upload: UploadComplete,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Register a file the client uploaded through a presigned form"""
+    storage = get_storage()
+    require_presigned_uploads(storage)
+    if "/" in upload.filename:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file name")
+
+    database = get_database()
+    query = {"_id": upload.filename, "user_id": current_user["id"], "expires_at": {"$gt": datetime.utcnow()}}
+    pending = await database.pending_uploads.find_one(query)
+    if not pending:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    content_type = pending["content_type"]
+
+    # Not uploaded (yet): the client may retry once its upload has finished
+    stored = await storage.stat(upload.filename)
+    if not stored:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    # Consume the name so a repeated call can't queue the variants again
+    if not await database.pending_uploads.find_one_and_delete(query):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+
+    await record_upload(upload.filename, content_type, stored.size, current_user["id"])
+    background_tasks.add_task(generate_upload_variants, upload.filename)
+
+    return upload_to_response(upload.filename, content_type, stored.size)
+
+
+@router.get("/{filename}/variants")
+async def get_file_variants(filename: str):
+    """Get the recorded variant metadata of an upload"""
+    database = get_database()
+    upload = await database.uploads.find_one({"filename": filename}, {"_id": 0})
+
+    if not upload:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
-    
-    return FileResponse(
-        path=file_path,
-        media_type='image/jpeg'
+
+    return upload
+
+
+async def stored_file_response(request: Request, name: str, media_type: str, immutable: bool, headers: dict):
+    """Serve a stored file from disk, or redirect to object storage"""
+    storage = get_storage()
+
+    if storage.supports_local_paths:
+        return serve_file(request, storage.local_path(name), media_type=media_type, immutable=immutable, headers=headers)
+
+    # Object storage serves the bytes (and ranges) itself; the redirect
+    # may only be cached while the presigned URL is still valid
+    url = await storage.download_url(name)
+    max_age = min(settings.upload_max_age, settings.s3_presign_expires // 2)
+    return RedirectResponse(
+        url,
+        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        headers={"Cache-Control": f"private, max-age={max_age}", **headers}
     )
 
+
+@router.get("/{filename}")
+async def get_file(
+    request: Request,
+    filename: str,
+    size: Optional[str] = Query(None, description="Variant size (thumb, card, detail)")
+):
+    """Get uploaded file, or one of its resized variants"""
+    if size is not None and size not in VARIANT_SIZES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown size. Allowed sizes: {', '.join(VARIANT_SIZES)}"
+        )
+
+    storage = get_storage()
+
+    if size:
+        fmt = pick_variant_format(request.headers.get("accept"))
+        key = variant_key(filename, size, fmt)
+        if await storage.exists(key):
+            return await stored_file_response(
+                request,
+                key,
+                media_type=VARIANT_FORMATS[fmt][2],
+                immutable=is_immutable_name(filename),
+                headers={"Vary": "Accept"}
+            )
+
+    if not await storage.exists(filename):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    if size:
+        # Fall back to the original until the variant has been generated,
+        # without letting caches keep it under the variant URL
+        return await stored_file_response(
+            request,
+            filename,
+            media_type=guess_content_type(Path(filename)),
+            immutable=False,
+            headers={"Vary": "Accept", "Cache-Control": "no-cache"}
+        )
+
+    return await stored_file_response(
+        request,
+        filename,
+        media_type=guess_content_type(Path(filename)),
+        immutable=is_immutable_name(filename),
+        headers={}
+    )
@@ -0,0 +1,442 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.config import settings
+from app.database import get_database
+from app.order_archive import ARCHIVE_COLLECTION, archive_collection_options
+from app.pricing import EFFECTIVE_PRICE
+from app.reviews import rating_fields
+
+logger = logging.getLogger(__name__)
+
+META_COLLECTION = "schema_meta"
+LOCK_TTL = timedelta(minutes=10)
+
+# Desired indexes per collection. Changing this list changes the spec hash,
+# which is what tells workers (and manage_schema.py) that a build is due.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "products": [
+        # Text index for products search
+        IndexModel([("name", "text"), ("description", "text"), ("brand", "text")]),
+        IndexModel([("category", ASCENDING)]),
+        # Category and its ancestors (multikey): subtree filtering in one query
+        IndexModel([("category_path", ASCENDING)]),
+        # Price after discount, used by listing filters and price sort
+        IndexModel([("effective_price", ASCENDING)]),
+        IndexModel([("category_path", ASCENDING), ("effective_price", ASCENDING)]),
+        IndexModel([("slug", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING)]),
+        # Search index sync polls for recently changed products
+        IndexModel([("updated_at", ASCENDING)]),
+        # Average of the reviews, kept on the product for rating sort
+        IndexModel([("rating", ASCENDING)]),
+        # Products in a running timed sale (the field is absent otherwise)
+        IndexModel([("sale_backup.schedule_id", ASCENDING)], sparse=True),
+    ],
+    "categories": [
+        IndexModel([("parent", ASCENDING)]),
+        # Subtree lookups when a category is moved
+        IndexModel([("ancestors", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("username", ASCENDING)], unique=True),
+    ],
+    "orders": [
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)]),
+        # Status filters, and finished orders due for archiving
+        IndexModel([("status", ASCENDING), ("updated_at", ASCENDING)]),
+    ],
+    ARCHIVE_COLLECTION: [
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING)]),
+    ],
+    "carts": [
+        # One cart per user: concurrent first adds can't create two
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        # Abandoned carts are deleted CART_TTL_DAYS after their last change
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "reviews": [
+        # Paginated listing per product, newest first
+        IndexModel([("product_id", ASCENDING), ("created_at", ASCENDING)]),
+        # One review per user and product
+        IndexModel([("product_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)]),
+    ],
+    "uploads": [
+        IndexModel([("filename", ASCENDING)], unique=True),
+    ],
+    # Presigned upload names not completed yet (_id is the file name)
+    "pending_uploads": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "product_imports": [
+        IndexModel([("started_at", ASCENDING)]),
+    ],
+    "jobs": [
+        # Claiming: due queued jobs, then running jobs whose lease expired
+        IndexModel([("queue", ASCENDING), ("status", ASCENDING), ("run_at", ASCENDING)]),
+        IndexModel([("queue", ASCENDING), ("status", ASCENDING), ("lease_until", ASCENDING)]),
+        IndexModel([("schedule", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)]),
+        # Finished jobs are deleted once JOB_RETENTION_SECONDS have passed
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "product_stats_daily": [
+        # Target of the analytics $inc upserts; per-day ranges for reports
+        IndexModel([("product_id", ASCENDING), ("day", ASCENDING)], unique=True),
+        IndexModel([("day", ASCENDING)]),
+    ],
+    "search_terms_daily": [
+        IndexModel([("term", ASCENDING), ("day", ASCENDING)], unique=True),
+        IndexModel([("day", ASCENDING)]),
+    ],
+    "search_events": [
+        IndexModel([("at", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "price_schedules": [
+        IndexModel([("status", ASCENDING), ("starts_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("ends_at", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)]),
+    ],
+}
+
+# Indexes that were created by earlier versions and are no longer wanted
+OBSOLETE_INDEXES: Dict[str, List[str]] = {
+    # Was built on a field name no document uses; category_path replaced category
+    "products": ["createdAt_1", "price_1", "category_1_effective_price_1"],
+    # Prefix of status_1_updated_at_1
+    "orders": ["status_1"],
+}
+
+
+def collection_options() -> Dict[str, dict]:
+    """Options that only apply when a collection is created, before its indexes"""
+    return {ARCHIVE_COLLECTION: archive_collection_options()}
+
+
+def index_spec_hash() -> str:
+    """Stable fingerprint of INDEXES and OBSOLETE_INDEXES"""
+    spec = {
+        "indexes": {
+            collection: [
+                {**{k: v for k, v in model.document.items() if k != "key"}, "key": list(model.document["key"].items())}
+                for model in models
+            ]
+            for collection, models in INDEXES.items()
+        },
+        "obsolete": OBSOLETE_INDEXES,
+    }
+    encoded = json.dumps(spec, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class Migration:
+    """A versioned data migration applied in resumable batches.
+
+    Documents of `collection` matching `query` are visited in `_id` order;
+    `update_for` returns the update for one document, as an update document
+    or pipeline (or None to skip it). Progress is checkpointed after every
+    batch, so an interrupted run continues where it stopped.
+    """
+
+    version: int
+    description: str
+    collection: str
+    query: dict = {}
+
+    async def prepare(self, database):
+        """Load anything `update_for` needs (runs once per invocation)"""
+
+    def update_for(self, doc: dict) -> Optional[Union[dict, List[dict]]]:
+        raise NotImplementedError
+
+
+class BackfillProductDefaults(Migration):
+    version = 1
+    description = "Backfill missing discount/stock/tags/rating/reviews_count on products"
+    collection = "products"
+    defaults = {"discount": 0.0, "stock": 0, "tags": [], "rating": 0.0, "reviews_count": 0}
+    query = {"$or": [{field: {"$exists": False}} for field in defaults]}
+
+    def update_for(self, doc):
+        missing = {field: value for field, value in self.defaults.items() if field not in doc}
+        return {"$set": missing} if missing else None
+
+
+class BackfillEffectivePrice(Migration):
+    version = 2
+    description = "Backfill effective_price (price after discount) on products"
+    collection = "products"
+    query = {"effective_price": {"$exists": False}}
+
+    def update_for(self, doc):
+        # Computed server-side, so a concurrent price change can't be overwritten
+        return [{"$set": {"effective_price": EFFECTIVE_PRICE}}]
+
+
+class BackfillCategoryAncestors(Migration):
+    version = 3
+    description = "Backfill ancestors on categories from their parent chain"
+    collection = "categories"
+    query = {"ancestors": {"$exists": False}}
+
+    async def prepare(self, database):
+        self.parents = {}
+        async for category in database.categories.find({}, {"parent": 1}):
+            self.parents[category["_id"]] = category.get("parent")
+
+    def update_for(self, doc):
+        ancestors = []
+        parent = doc.get("parent")
+        # Stop at a missing parent or a cycle left by older writes
+        while parent in self.parents and parent != doc["_id"] and parent not in ancestors:
+            ancestors.insert(0, parent)
+            parent = self.parents[parent]
+        return {"$set": {"ancestors": ancestors}}
+
+
+class BackfillProductCategoryPath(Migration):
+    version = 4
+    description = "Backfill category_path (category ancestors + category) on products"
+    collection = "products"
+    query = {"category_path": {"$exists": False}}
+
+    async def prepare(self, database):
+        self.paths = {}
+        async for category in database.categories.find({}, {"ancestors": 1}):
+            self.paths[category["_id"]] = category.get("ancestors", []) + [category["_id"]]
+
+    def update_for(self, doc):
+        category = doc.get("category")
+        path = self.paths.get(category, [category]) if category else []
+        return {"$set": {"category_path": path}}
+
+
+class BackfillRatingAggregates(Migration):
+    version = 5
+    description = "Rebuild rating/reviews_count and the rating histogram on products from reviews"
+    collection = "products"
+    query = {"rating_sum": {"$exists": False}}
+
+    async def prepare(self, database):
+        self.histograms = {}
+        cursor = database.reviews.aggregate([
+            {"$group": {"_id": {"product_id": "$product_id", "rating": "$rating"}, "count": {"$sum": 1}}},
+        ])
+        async for row in cursor:
+            histogram = self.histograms.setdefault(row["_id"]["product_id"], {})
+            histogram[row["_id"]["rating"]] = row["count"]
+
+    def update_for(self, doc):
+        # Replaces the placeholder values products were created with
+        return {"$set": rating_fields(self.histograms.get(doc["_id"], {}))}
+
+
+class BackfillCartExpiry(Migration):
+    version = 6
+    description = "Drop empty and duplicate carts, backfill expires_at on carts"
+    collection = "carts"
+    query = {"expires_at": {"$exists": False}}
+
+    async def prepare(self, database):
+        # Left by reads that used to create carts; also needed before the
+        # unique user_id index can be built
+        await database.carts.delete_many({"items": {"$size": 0}})
+        cursor = database.carts.aggregate([
+            {"$sort": {"updated_at": -1}},
+            {"$group": {"_id": "$user_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+        ], allowDiskUse=True)
+        async for group in cursor:
+            await database.carts.delete_many({"_id": {"$in": group["ids"][1:]}})
+
+    def update_for(self, doc):
+        updated_at = doc.get("updated_at") or doc["_id"].generation_time.replace(tzinfo=None)
+        return {"$set": {"expires_at": updated_at + timedelta(days=settings.cart_ttl_days)}}
+
+
+MIGRATIONS: List[Migration] = [
+    BackfillProductDefaults(),
+    BackfillEffectivePrice(),
+    BackfillCategoryAncestors(),
+    BackfillProductCategoryPath(),
+    BackfillRatingAggregates(),
+    BackfillCartExpiry(),
+]
+
+LATEST_VERSION = max((m.version for m in MIGRATIONS), default=0)
+
+
+async def get_schema_state(database) -> dict:
+    """Applied index hash and migration version, in one round trip"""
+    docs = await database[META_COLLECTION].find({"_id": {"$in": ["indexes", "migrations"]}}).to_list(length=2)
+    state = {doc["_id"]: doc for doc in docs}
+    return {
+        "index_hash": state.get("indexes", {}).get("hash"),
+        "indexes_applied_at": state.get("indexes", {}).get("applied_at"),
+        "migration_version": state.get("migrations", {}).get("version", 0),
+    }
+
+
+def pending_work(state: dict) -> dict:
+    return {
+        "indexes": state["index_hash"] != index_spec_hash(),
+        "migrations": [m.version for m in MIGRATIONS if m.version > state["migration_version"]],
+    }
+
+
+async def acquire_lock(database, owner: str) -> bool:
+    """Lease lock so only one process builds indexes or migrates at a time"""
+    now = datetime.utcnow()
+    try:
+        await database[META_COLLECTION].update_one(
+            {"_id": "lock", "$or": [{"locked_until": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "locked_until": now + LOCK_TTL}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def release_lock(database, owner: str):
+    await database[META_COLLECTION].delete_one({"_id": "lock", "owner": owner})
+
+
+async def apply_indexes(database, owner: Optional[str] = None) -> dict:
+    """Build every collection's indexes with one create_indexes call each.
+
+    With the lock `owner`, the lease is renewed after each collection.
+    """
+    existing = set(await database.list_collection_names())
+    for collection, options in collection_options().items():
+        if options and collection not in existing:
+            await database.create_collection(collection, **options)
+
+    created = {}
+    for collection, models in INDEXES.items():
+        created[collection] = await database[collection].create_indexes(models)
+        if owner is not None:
+            # Keep the lease alive during long builds
+            await acquire_lock(database, owner)
+
+    dropped = {}
+    for collection, names in OBSOLETE_INDEXES.items():
+        existing = await database[collection].index_information()
+        for name in names:
+            if name in existing:
+                await database[collection].drop_index(name)
+                dropped.setdefault(collection, []).append(name)
+
+    await database[META_COLLECTION].update_one(
+        {"_id": "indexes"},
+        {"$set": {"hash": index_spec_hash(), "indexes": created, "dropped": dropped, "applied_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    return {"created": created, "dropped": dropped}
+
+
+async def run_migration(database, migration: Migration, owner: str, batch_size: int) -> int:
+    """Run one migration from its last checkpoint; returns documents updated"""
+    meta = database[META_COLLECTION]
+    progress_id = f"migration:{migration.version}"
+    progress = await meta.find_one({"_id": progress_id}) or {}
+    last_id = progress.get("last_id")
+    updated = progress.get("updated", 0)
+
+    await migration.prepare(database)
+    collection = database[migration.collection]
+
+    while True:
+        query = dict(migration.query)
+        if last_id is not None:
+            query = {"$and": [query, {"_id": {"$gt": last_id}}]}
+        docs = await collection.find(query).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+
+        operations = []
+        for doc in docs:
+            update = migration.update_for(doc)
+            if update:
+                operations.append(UpdateOne({"_id": doc["_id"]}, update))
+        if operations:
+            result = await collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+
+        last_id = docs[-1]["_id"]
+        await meta.update_one(
+            {"_id": progress_id},
+            {"$set": {"last_id": last_id, "updated": updated, "updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        # Keep the lease alive during long migrations
+        await acquire_lock(database, owner)
+
+    await meta.update_one(
+        {"_id": "migrations"},
+        {
+            "$max": {"version": migration.version},
+            "$push": {"applied": {"version": migration.version, "description": migration.description, "at": datetime.utcnow()}},
+        },
+        upsert=True,
+    )
+    await meta.delete_one({"_id": progress_id})
+    return updated
+
+
+async def run_migrations(database, owner: str, batch_size: Optional[int] = None) -> dict:
+    """Apply pending migrations in version order"""
+    state = await get_schema_state(database)
+    results = {}
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version > state["migration_version"]:
+            results[migration.version] = await run_migration(
+                database, migration, owner, batch_size or settings.migration_batch_size
+            )
+    return results
+
+
+def lock_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def ensure_schema():
+    """Startup check: one metadata read when the schema is current.
+
+    With `schema_auto_apply` disabled, pending work is only logged and left
+    to `python manage_schema.py apply`.
+    """
+    database = get_database()
+    state = await get_schema_state(database)
+    pending = pending_work(state)
+    if not pending["indexes"] and not pending["migrations"]:
+        return
+
+    if not settings.schema_auto_apply:
+        logger.warning("Schema is out of date (%s); run `python manage_schema.py apply`", pending)
+        return
+
+    owner = lock_owner()
+    if not await acquire_lock(database, owner):
+        logger.info("Another process is updating the schema, skipping")
+        return
+    try:
+        # Migrations first: they may remove data a new unique index rejects
+        if pending["migrations"]:
+            await run_migrations(database, owner)
+        if pending["indexes"]:
+            await apply_indexes(database, owner)
+    finally:
+        await release_lock(database, owner)
@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import math
+import re
+import unicodedata
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from bson import ObjectId
+from app.config import settings
+from app.database import get_catalog_database
+
+logger = logging.getLogger(__name__)
+
+# Indexed fields and their weight in a product's term frequencies
+FIELDS = {"name": 3.0, "brand": 2.0, "tags": 2.0, "description": 1.0}
+PROJECTION = {**{field: 1 for field in FIELDS}, "updated_at": 1}
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Re-read a little before the last sync, for clock skew between writers
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# NFD splits Vietnamese letters into a base letter and combining marks
+# (U+0300-U+036F), which are dropped; đ has no decomposition
+FOLD = {codepoint: None for codepoint in range(0x300, 0x370)}
+FOLD[ord("đ")] = "d"
+TOKEN = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics: "Điện thoại" -> "dien thoai" """
+    return unicodedata.normalize("NFD", text.lower()).translate(FOLD)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(fold(text))
+
+
+def trigrams(term: str) -> set:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """BM25 inverted index over products.
+
+    Documents get dense ids in insertion order. Each term has two parallel
+    arrays, document ids (ascending) and weighted term frequencies, that
+    numpy reads without copying. Updating a product appends a new document
+    and marks the old one dead; a rebuild drops the dead entries.
+    """
+
+    def __init__(self):
+        self.product_ids: List[ObjectId] = []
+        self.doc_of: Dict[ObjectId, int] = {}
+        self.alive = bytearray()
+        self.lengths = array("f")
+        self.versions: List[Optional[datetime]] = []  # updated_at of each indexed version
+        self.doc_terms: List[array] = []  # term ids per document, to update df on removal
+        self.live = 0
+        self.total_length = 0.0
+
+        self.terms: Dict[str, int] = {}
+        self.postings_docs: List[array] = []
+        self.postings_tf: List[array] = []
+        self.df = array("i")
+        # Trigram -> ids of the terms containing it, for fuzzy matching
+        self.trigram_terms: Dict[str, array] = defaultdict(lambda: array("i"))
+        self.trigram_counts = array("i")
+
+    def _term_id(self, term: str) -> int:
+        term_id = self.terms.get(term)
+        if term_id is None:
+            term_id = self.terms[term] = len(self.postings_docs)
+            self.postings_docs.append(array("i"))
+            self.postings_tf.append(array("f"))
+            self.df.append(0)
+            grams = trigrams(term)
+            for gram in grams:
+                self.trigram_terms[gram].append(term_id)
+            self.trigram_counts.append(len(grams))
+        return term_id
+
+    def add(self, product: dict):
+        """Index a product, replacing its previous version"""
+        self.remove(product["_id"])
+        frequencies: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELDS.items():
+            value = product.get(field)
+            if not value:
+                continue
+            text = " ".join(value) if isinstance(value, list) else str(value)
+            for term in tokenize(text):
+                frequencies[term] += weight
+
+        doc = len(self.product_ids)
+        self.product_ids.append(product["_id"])
+        self.doc_of[product["_id"]] = doc
+        self.alive.append(1)
+        self.versions.append(product.get("updated_at"))
+        length = sum(frequencies.values())
+        self.lengths.append(length)
+        term_ids = array("i")
+        for term, frequency in frequencies.items():
+            term_id = self._term_id(term)
+            self.postings_docs[term_id].append(doc)
+            self.postings_tf[term_id].append(frequency)
+            self.df[term_id] += 1
+            term_ids.append(term_id)
+        self.doc_terms.append(term_ids)
+        self.live += 1
+        self.total_length += length
+
+    def is_current(self, product: dict) -> bool:
+        doc = self.doc_of.get(product["_id"])
+        return doc is not None and self.versions[doc] == product.get("updated_at")
+
+    def remove(self, product_id: ObjectId):
+        doc = self.doc_of.pop(product_id, None)
+        if doc is None:
+            return
+        self.alive[doc] = 0
+        for term_id in self.doc_terms[doc]:
+            self.df[term_id] -= 1
+        self.doc_terms[doc] = array("i")
+        self.live -= 1
+        self.total_length -= self.lengths[doc]
+
+    def expand(self, token: str) -> List[Tuple[int, float]]:
+        """(term id, weight) pairs a query token matches: itself when indexed,
+        else the closest terms by trigram similarity, weighted by it"""
+        term_id = self.terms.get(token)
+        if term_id is not None and self.df[term_id] > 0:
+            return [(term_id, 1.0)]
+        if len(token) < 3:
+            return []
+
+        grams = [self.trigram_terms[gram] for gram in trigrams(token) if gram in self.trigram_terms]
+        if not grams:
+            return []
+        candidates = np.concatenate([np.frombuffer(ids, dtype=np.int32) for ids in grams])
+        shared = np.bincount(candidates, minlength=len(self.postings_docs))
+        candidates = np.flatnonzero(shared)
+        # Jaccard similarity of the trigram sets
+        counts = np.frombuffer(self.trigram_counts, dtype=np.int32)[candidates]
+        similarity = shared[candidates] / (len(trigrams(token)) + counts - shared[candidates])
+        keep = similarity >= settings.search_fuzzy_min_similarity
+        candidates, similarity = candidates[keep], similarity[keep]
+        best = np.argsort(-similarity)[:settings.search_fuzzy_expansions]
+        return [
+            (int(candidates[i]), float(similarity[i]))
+            for i in best if self.df[candidates[i]] > 0
+        ]
+
+    def search(self, query: str, limit: int) -> List[Tuple[ObjectId, float]]:
+        """Best `limit` products for a query, by descending BM25 score"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or self.live == 0:
+            return []
+
+        scores = np.zeros(len(self.product_ids), dtype=np.float32)
+        lengths = np.frombuffer(self.lengths, dtype=np.float32)
+        average_length = self.total_length / self.live
+        for token in tokens:
+            for term_id, weight in self.expand(token):
+                docs = np.frombuffer(self.postings_docs[term_id], dtype=np.int32)
+                tf = np.frombuffer(self.postings_tf[term_id], dtype=np.float32)
+                df = self.df[term_id]
+                idf = math.log(1 + (self.live - df + 0.5) / (df + 0.5))
+                norm = K1 * (1 - B + B * lengths[docs] / average_length)
+                # A document has one entry per term, so fancy-index += is safe
+                scores[docs] += weight * idf * tf * (K1 + 1) / (tf + norm)
+
+        scores *= np.frombuffer(self.alive, dtype=np.uint8)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self.product_ids[doc], float(scores[doc])) for doc in matched]
+
+    async def load(self, database):
+        """Index every product, yielding to the event loop between batches"""
+        cursor = database.products.find({}, PROJECTION).batch_size(1000)
+        async for product in cursor:
+            self.add(product)
+            if len(self.product_ids) % 1000 == 0:
+                await asyncio.sleep(0)
+
+
+class ProductSearch:
+    """Per-worker search index, rebuilt every SEARCH_REBUILD_INTERVAL seconds
+    and brought up to date with products whose updated_at moved every
+    SEARCH_SYNC_INTERVAL seconds. Writes in this worker apply immediately.
+
+    Deleted products stay in other workers' indexes until their next
+    rebuild; get_products drops them when it fetches the matches.
+    """
+
+    def __init__(self):
+        self.index: Optional[SearchIndex] = None
+        self.built_at: Optional[datetime] = None
+        self.synced_until: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def rebuild(self):
+        started = datetime.utcnow()
+        index = SearchIndex()
+        await index.load(get_catalog_database())
+        self.index, self.built_at, self.synced_until = index, started, started - SYNC_OVERLAP
+        logger.info("Search index built: %d products, %d terms", index.live, len(index.terms))
+
+    async def sync(self):
+        cursor = get_catalog_database().products.find({"updated_at": {"$gt": self.synced_until}}, PROJECTION)
+        latest = self.synced_until
+        async for product in cursor:
+            # The overlap re-reads recent writes; only new versions are indexed
+            if not self.index.is_current(product):
+                self.index.add(product)
+            latest = max(latest, product["updated_at"])
+        self.synced_until = max(self.synced_until, latest - SYNC_OVERLAP)
+
+    def add(self, product: dict):
+        if self.index is not None:
+            self.index.add(product)
+
+    def remove(self, product_id: ObjectId):
+        if self.index is not None:
+            self.index.remove(product_id)
+
+    def search(self, query: str) -> Optional[List[Tuple[ObjectId, float]]]:
+        """Ranked matches, or None while the index is not built"""
+        if self.index is None:
+            return None
+        return self.index.search(query, settings.search_max_results)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.index is None or datetime.utcnow() - self.built_at >= timedelta(
+                    seconds=settings.search_rebuild_interval
+                ):
+                    await self.rebuild()
+                else:
+                    await self.sync()
+            except Exception:
+                logger.exception("Search index update failed")
+            await asyncio.sleep(settings.search_sync_interval)
+
+    def start(self):
+        if settings.search_sync_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+product_search = ProductSearch()
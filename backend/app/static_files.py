@@ -0,0 +1,160 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple
+import aiofiles
+from fastapi import Request, status
+from fastapi.responses import Response, StreamingResponse
+from app.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+# Upload names are never reused: new ones are content hashes, older ones uuid4
+_IMMUTABLE_NAME = re.compile(
+    r"^([0-9a-f]{32}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(_[a-z]+)?(\.[A-Za-z0-9]+)?$"
+)
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+mimetypes.add_type("image/webp", ".webp")
+
+
+def guess_content_type(path: Path) -> str:
+    """Detect the content type of a file from its extension"""
+    content_type, _ = mimetypes.guess_type(path.name)
+    return content_type or "application/octet-stream"
+
+
+def is_immutable_name(name: str) -> bool:
+    """Check whether a stored name can never point at different bytes"""
+    return bool(_IMMUTABLE_NAME.match(name))
+
+
+def make_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def cache_control(immutable: bool) -> str:
+    if immutable:
+        return f"public, max-age={settings.upload_immutable_max_age}, immutable"
+    return f"public, max-age={settings.upload_max_age}, must-revalidate"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since (If-None-Match wins)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into inclusive (start, end).
+
+    Returns None for anything we don't serve partially (multiple ranges,
+    other units); raises ValueError when the range can't be satisfied.
+    """
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+async def _iter_file(path: Path, start: int, length: int):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(
+    request: Request,
+    path: Path,
+    media_type: Optional[str] = None,
+    immutable: bool = False,
+    headers: Optional[dict] = None,
+) -> Response:
+    """Serve a file with validators, conditional requests and byte ranges.
+
+    When `upload_accel_redirect_prefix` is configured, the body is left to
+    nginx through X-Accel-Redirect and only the headers are produced here.
+    """
+    stat = path.stat()
+    etag = make_etag(stat)
+    response_headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control(immutable),
+        "Accept-Ranges": "bytes",
+        **(headers or {}),
+    }
+    media_type = media_type or guess_content_type(path)
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=response_headers)
+
+    if settings.upload_accel_redirect_prefix:
+        relative = path.resolve().relative_to(Path(settings.upload_dir).resolve())
+        response_headers["X-Accel-Redirect"] = settings.upload_accel_redirect_prefix.rstrip("/") + "/" + relative.as_posix()
+        return Response(media_type=media_type, headers=response_headers)
+
+    size = stat.st_size
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response_headers["Content-Length"] = str(length)
+            return StreamingResponse(
+                _iter_file(path, start, length),
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type=media_type,
+                headers=response_headers
+            )
+
+    response_headers["Content-Length"] = str(size)
+    return StreamingResponse(_iter_file(path, 0, size), media_type=media_type, headers=response_headers)
@@ -0,0 +1,285 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional
+import aiofiles
+from app.config import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class StoredObject:
+    name: str
+    size: int
+    modified_at: datetime
+    etag: Optional[str] = None
+
+
+class StorageBackend(ABC):
+    """Where uploaded files live. Names are relative keys like `abc.png` or `variants/abc_card.webp`."""
+
+    # Set when files can be served straight from disk (and handed to nginx)
+    supports_local_paths = False
+    supports_presigned_uploads = False
+
+    @abstractmethod
+    async def save(self, name: str, chunks: AsyncIterator[bytes], content_type: Optional[str] = None) -> int:
+        ...
+
+    async def save_bytes(self, name: str, data: bytes, content_type: Optional[str] = None) -> int:
+        async def single():
+            yield data
+        return await self.save(name, single(), content_type)
+
+    @abstractmethod
+    async def read(self, name: str) -> bytes:
+        ...
+
+    @abstractmethod
+    async def stat(self, name: str) -> Optional[StoredObject]:
+        ...
+
+    async def exists(self, name: str) -> bool:
+        return await self.stat(name) is not None
+
+    @abstractmethod
+    async def delete(self, name: str):
+        ...
+
+    @abstractmethod
+    async def list_names(self, prefix: str = "") -> Iterable[str]:
+        """Top-level names under a prefix (variants are not included for an empty prefix)"""
+
+    @abstractmethod
+    async def download_url(self, name: str) -> str:
+        ...
+
+    # Optional: only called when the matching supports_* flag is set
+
+    def local_path(self, name: str) -> Path:
+        raise NotImplementedError
+
+    async def presign_upload(self, name: str, content_type: str, max_size: int) -> dict:
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """Files on a local (or shared) volume under `settings.upload_dir`"""
+
+    supports_local_paths = True
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def local_path(self, name: str) -> Path:
+        path = (self.root / name).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid file name: {name}")
+        return path
+
+    async def save(self, name, chunks, content_type=None):
+        path = self.local_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp name first so readers never see a partial file
+        tmp_path = path.with_name(f".{path.name}.part")
+        size = 0
+        async with aiofiles.open(tmp_path, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                await f.write(chunk)
+        os.replace(tmp_path, path)
+        return size
+
+    async def read(self, name):
+        async with aiofiles.open(self.local_path(name), "rb") as f:
+            return await f.read()
+
+    async def stat(self, name):
+        try:
+            path = self.local_path(name)
+            stat = path.stat()
+        except (ValueError, OSError):
+            return None
+        if not path.is_file():
+            return None
+        return StoredObject(name=name, size=stat.st_size, modified_at=datetime.utcfromtimestamp(stat.st_mtime))
+
+    async def delete(self, name):
+        try:
+            self.local_path(name).unlink()
+        except FileNotFoundError:
+            pass
+
+    async def list_names(self, prefix=""):
+        directory = self.local_path(prefix) if prefix else self.root
+        if not directory.is_dir():
+            return []
+        base = f"{prefix.rstrip('/')}/" if prefix else ""
+        return sorted(
+            f"{base}{p.name}" for p in directory.iterdir()
+            if p.is_file() and not p.name.startswith(".")
+        )
+
+    async def download_url(self, name):
+        return f"/api/upload/{name}"
+
+
+class S3Storage(StorageBackend):
+    """S3-compatible object storage (AWS S3, MinIO, ...) shared by every backend node"""
+
+    supports_presigned_uploads = True
+
+    def __init__(self):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = settings.s3_bucket
+        self.prefix = settings.s3_prefix.strip("/")
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.s3_endpoint_url,
+            region_name=settings.s3_region,
+            aws_access_key_id=settings.s3_access_key_id,
+            aws_secret_access_key=settings.s3_secret_access_key,
+            config=Config(
+                signature_version="s3v4",
+                s3={"addressing_style": "path" if settings.s3_endpoint_url else "auto"},
+                max_pool_connections=settings.s3_max_connections,
+            ),
+        )
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    async def _call(self, method: str, **kwargs):
+        # boto3 is blocking: keep it off the event loop
+        return await asyncio.to_thread(getattr(self.client, method), **kwargs)
+
+    async def save(self, name, chunks, content_type=None):
+        key = self._key(name)
+        extra = {"ContentType": content_type} if content_type else {}
+        part_size = settings.s3_multipart_chunk_size
+        buffer = bytearray()
+        size = 0
+        upload_id = None
+        parts = []
+
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                buffer.extend(chunk)
+                while len(buffer) >= part_size:
+                    if upload_id is None:
+                        created = await self._call("create_multipart_upload", Bucket=self.bucket, Key=key, **extra)
+                        upload_id = created["UploadId"]
+                    body = bytes(buffer[:part_size])
+                    del buffer[:part_size]
+                    part = await self._call(
+                        "upload_part", Bucket=self.bucket, Key=key, UploadId=upload_id,
+                        PartNumber=len(parts) + 1, Body=body,
+                    )
+                    parts.append({"ETag": part["ETag"], "PartNumber": len(parts) + 1})
+
+            if upload_id is None:
+                # Small enough for a single request
+                await self._call("put_object", Bucket=self.bucket, Key=key, Body=bytes(buffer), **extra)
+                return size
+
+            if buffer:
+                part = await self._call(
+                    "upload_part", Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    PartNumber=len(parts) + 1, Body=bytes(buffer),
+                )
+                parts.append({"ETag": part["ETag"], "PartNumber": len(parts) + 1})
+            await self._call(
+                "complete_multipart_upload", Bucket=self.bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+            return size
+        except BaseException:
+            if upload_id is not None:
+                await self._call("abort_multipart_upload", Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+    async def read(self, name):
+        response = await self._call("get_object", Bucket=self.bucket, Key=self._key(name))
+        return await asyncio.to_thread(response["Body"].read)
+
+    async def stat(self, name):
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await self._call("head_object", Bucket=self.bucket, Key=self._key(name))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredObject(
+            name=name,
+            size=head["ContentLength"],
+            modified_at=head["LastModified"].replace(tzinfo=None),
+            etag=head.get("ETag"),
+        )
+
+    async def delete(self, name):
+        await self._call("delete_object", Bucket=self.bucket, Key=self._key(name))
+
+    async def list_names(self, prefix=""):
+        base = self._key(prefix.rstrip("/") + "/" if prefix else "")
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        names = []
+        token = None
+        while True:
+            kwargs = {"Bucket": self.bucket, "Prefix": base, "Delimiter": "/"}
+            if token:
+                kwargs["ContinuationToken"] = token
+            page = await self._call("list_objects_v2", **kwargs)
+            names.extend(obj["Key"][strip:] for obj in page.get("Contents", []))
+            if not page.get("IsTruncated"):
+                return names
+            token = page["NextContinuationToken"]
+
+    async def download_url(self, name):
+        if settings.s3_public_url:
+            return f"{settings.s3_public_url.rstrip('/')}/{self._key(name)}"
+        return await self._call(
+            "generate_presigned_url",
+            ClientMethod="get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(name)},
+            ExpiresIn=settings.s3_presign_expires,
+        )
+
+    async def presign_upload(self, name, content_type, max_size):
+        presigned = await self._call(
+            "generate_presigned_post",
+            Bucket=self.bucket,
+            Key=self._key(name),
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=settings.s3_presign_expires,
+        )
+        return {"url": presigned["url"], "fields": presigned["fields"]}
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Get the configured storage backend"""
+    global _storage
+    if _storage is None:
+        if settings.storage_backend == "s3":
+            _storage = S3Storage()
+        elif settings.storage_backend == "local":
+            _storage = LocalStorage(settings.upload_dir)
+        else:
+            raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
+    return _storage
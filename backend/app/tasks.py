@@ -0,0 +1,43 @@
+import logging
+from app.category_stats import reconcile_category_stats
+from app.config import settings
+from app.database import get_database
+from app.jobs import job, schedule
+from app.order_archive import archive_orders
+from app.pricing import run_due_schedules
+from app.recommendations import build_related
+
+# Work that runs outside requests, as jobs (see app/jobs.py). Each runs in one
+# worker at a time; per-worker in-memory state (trending ranking, search
+# index) refreshes itself in every worker instead.
+
+logger = logging.getLogger(__name__)
+
+
+@job("pricing.run_due_schedules", queue="maintenance", max_attempts=1, lease_seconds=600)
+async def run_price_schedules(payload: dict) -> dict:
+    # Stuck claims are recovered by the next run, so a failed run is not retried
+    return {"handled": await run_due_schedules(get_database())}
+
+
+@job("category_stats.reconcile", queue="maintenance")
+async def reconcile_stats(payload: dict) -> dict:
+    count = await reconcile_category_stats(get_database())
+    logger.info("Reconciled stats of %d categories", count)
+    return {"categories": count}
+
+
+@job("recommendations.build", lease_seconds=1800)
+async def build_recommendations(payload: dict) -> dict:
+    return await build_related(get_database(), payload.get("top_k"), payload.get("min_count"))
+
+
+@job("orders.archive", queue="maintenance", lease_seconds=1800)
+async def archive_old_orders(payload: dict) -> dict:
+    return await archive_orders(get_database(), payload.get("older_than_days"), payload.get("batch_size"))
+
+
+schedule("pricing.run_due_schedules", every=settings.pricing_schedule_interval)
+schedule("category_stats.reconcile", every=settings.category_stats_reconcile_interval)
+schedule("recommendations.build", cron=settings.recommendations_cron)
+schedule("orders.archive", cron=settings.order_archive_cron)
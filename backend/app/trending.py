@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from bson import ObjectId
+from app.config import settings
+from app.database import get_catalog_database
+from app.models.product import TrendingProductResponse
+from app.routers.products import product_to_response
+
+logger = logging.getLogger(__name__)
+
+# Key of the storewide list in TrendingRanking.lists; categories use their id
+ALL = ""
+
+
+def trending_pipeline(now: datetime) -> List[dict]:
+    """Units sold per product, each weighted by 2^(-age / half-life)"""
+    decay = -math.log(2) / (settings.trending_half_life_hours * 3600 * 1000)  # per millisecond
+    return [
+        {"$match": {
+            "created_at": {"$gte": now - timedelta(days=settings.trending_window_days)},
+            "status": {"$ne": "cancelled"},
+        }},
+        {"$unwind": "$items"},
+        {"$group": {
+            "_id": "$items.product_id",
+            "score": {"$sum": {"$multiply": [
+                "$items.quantity",
+                {"$exp": {"$multiply": [decay, {"$subtract": [now, "$created_at"]}]}},
+            ]}},
+            "units": {"$sum": "$items.quantity"},
+        }},
+        {"$sort": {"score": -1}},
+        {"$limit": settings.trending_candidates},
+    ]
+
+
+class TrendingRanking:
+    """Per-worker ranked lists, storewide and per category, refreshed from
+    orders every TRENDING_REFRESH_INTERVAL seconds.
+
+    Each entry is kept as serialized JSON, so a request only joins bytes.
+    Per-category lists are cut from the top TRENDING_CANDIDATES products.
+    """
+
+    def __init__(self):
+        self.lists: Dict[str, List[bytes]] = {}
+        self.refreshed_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def compute(self, database) -> Dict[str, List[bytes]]:
+        now = datetime.utcnow()
+        ranked = await database.orders.aggregate(trending_pipeline(now)).to_list(length=None)
+        ids = [ObjectId(row["_id"]) for row in ranked if ObjectId.is_valid(row["_id"])]
+        products = {
+            str(product["_id"]): product
+            async for product in database.products.find({"_id": {"$in": ids}})
+        }
+
+        size = settings.trending_size
+        lists: Dict[str, List[bytes]] = {ALL: []}
+        for row in ranked:
+            product = products.get(row["_id"])
+            if product is None:
+                continue
+            entry = None
+            for key in [ALL] + [str(category_id) for category_id in product.get("category_path", [])]:
+                ranking = lists.setdefault(key, [])
+                if len(ranking) < size:
+                    if entry is None:
+                        entry = TrendingProductResponse(
+                            **product_to_response(product).model_dump(),
+                            trending_score=round(row["score"], 3),
+                            recent_sales=row["units"],
+                        ).model_dump_json().encode()
+                    ranking.append(entry)
+        return lists
+
+    async def _load(self):
+        self.lists = await self.compute(get_catalog_database())
+        self.refreshed_at = datetime.utcnow()
+
+    async def refresh(self):
+        async with self._lock:
+            await self._load()
+
+    async def get(self, category: Optional[str], limit: int) -> bytes:
+        """JSON array of the top `limit` products, storewide or in a category subtree"""
+        if self.refreshed_at is None:
+            # Asked before the first background refresh finished: wait for one
+            async with self._lock:
+                if self.refreshed_at is None:
+                    await self._load()
+        entries = self.lists.get(category or ALL, [])[:limit]
+        return b"[" + b",".join(entries) + b"]"
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Trending refresh failed")
+            await asyncio.sleep(settings.trending_refresh_interval)
+
+    def start(self):
+        if settings.trending_refresh_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+trending = TrendingRanking()
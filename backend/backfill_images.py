@@ -0,0 +1,54 @@
+"""
+Generate resized image variants for uploads that don't have them yet
+Run: python backfill_images.py [--force]
+"""
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.database import db
+from app.images import process_upload, shutdown_process_pool
+from app.storage import get_storage
+
+
+async def backfill_variants(force: bool = False):
+    """Create variants for every original in upload storage"""
+    db.client = AsyncIOMotorClient(settings.mongodb_url)
+    database = db.client[settings.database_name]
+
+    originals = await get_storage().list_names()
+    print(f"🖼️  Found {len(originals)} uploaded files")
+
+    done = set()
+    if not force:
+        cursor = database.uploads.find({"variants.0": {"$exists": True}}, {"filename": 1})
+        done = {u["filename"] async for u in cursor}
+
+    pending = [name for name in originals if name not in done]
+    print(f"ℹ️  {len(done)} already processed, {len(pending)} to go")
+
+    # Keep every pool worker busy without loading all files into memory at once
+    semaphore = asyncio.Semaphore(settings.image_workers * 2)
+    processed = 0
+    failed = 0
+
+    async def run(filename):
+        nonlocal processed, failed
+        async with semaphore:
+            try:
+                await process_upload(filename)
+                processed += 1
+            except Exception as e:
+                failed += 1
+                print(f"⚠️  {filename}: {e}")
+
+    await asyncio.gather(*(run(name) for name in pending))
+
+    print(f"✅ Generated variants for {processed} files ({failed} failed)")
+
+    shutdown_process_pool()
+    db.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill_variants(force="--force" in sys.argv))
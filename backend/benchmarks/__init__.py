@@ -0,0 +1 @@
+# Load-test and latency benchmark suite
@@ -0,0 +1,83 @@
+"""
+Time the co-purchase recommendation build at scale
+Run: python -m benchmarks.recommendations [--orders 1000000] [--products 100000] [--top-k 20]
+                                          [--database product_catalog_bench]
+
+Without --database, baskets are synthesized in memory with the same shape as
+generate_data.py (1-5 products per order, Zipf popularity) and only the matrix
+step is timed. With --database, the full build (load, compute, write) runs
+against a database seeded by `python -m benchmarks.seed`.
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.database import client_options
+from app.images import shutdown_process_pool
+from app.recommendations import build_related, compute_related
+
+
+def synthetic_baskets(orders: int, products: int, skew: float, seed: int):
+    """(order index, product index) pairs, one per distinct product in an order"""
+    rng = np.random.default_rng(seed)
+    sizes = rng.choice([1, 2, 3, 4, 5], size=orders, p=[0.45, 0.30, 0.15, 0.07, 0.03])
+    popularity = 1 / np.arange(1, products + 1) ** skew
+    product_index = rng.choice(products, size=int(sizes.sum()), p=popularity / popularity.sum()).astype(np.int32)
+    order_index = np.repeat(np.arange(orders, dtype=np.int32), sizes)
+    # Drop repeats of a product within an order, then single-product orders
+    pairs = np.unique(np.stack([order_index, product_index], axis=1), axis=0)
+    order_index, product_index = pairs[:, 0], pairs[:, 1]
+    _, inverse, counts = np.unique(order_index, return_inverse=True, return_counts=True)
+    keep = counts[inverse] >= 2
+    _, order_index = np.unique(order_index[keep], return_inverse=True)
+    return order_index.astype(np.int32), product_index[keep]
+
+
+def run_synthetic(args):
+    started = time.perf_counter()
+    order_index, product_index = synthetic_baskets(args.orders, args.products, args.skew, args.seed)
+    print(f"🧺 {args.orders:,} orders -> {order_index.max() + 1:,} multi-product baskets, "
+          f"{len(order_index):,} items ({time.perf_counter() - started:.1f}s to synthesize)")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        products, _, _, _ = compute_related(order_index, product_index, args.products, args.top_k, args.min_count)
+        timings.append(time.perf_counter() - started)
+    print(f"✅ {len(products):,} related pairs for {len(np.unique(products)):,} products")
+    print(f"⏱️  compute: best {min(timings):.2f}s, median {sorted(timings)[len(timings) // 2]:.2f}s "
+          f"over {args.repeat} run(s)")
+
+
+async def run_database(args):
+    client = AsyncIOMotorClient(settings.mongodb_url, **client_options())
+    try:
+        started = time.perf_counter()
+        result = await build_related(client[args.database], args.top_k, args.min_count)
+    finally:
+        client.close()
+        shutdown_process_pool()
+    seconds = result["seconds"]
+    print(f"✅ {result['orders']:,} baskets, {result['products']:,} products, {result['pairs']:,} related pairs")
+    print(f"⏱️  load {seconds['load']}s, compute {seconds['compute']}s, write {seconds['write']}s, "
+          f"total {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of product popularity")
+    parser.add_argument("--top-k", type=int, default=settings.recommendations_top_k)
+    parser.add_argument("--min-count", type=int, default=settings.recommendations_min_count)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", help="Run the full build against this database instead")
+    args = parser.parse_args()
+
+    if args.database:
+        asyncio.run(run_database(args))
+    else:
+        run_synthetic(args)
@@ -0,0 +1,324 @@
+"""
+Drive a traffic mix against a running API and report latency per endpoint
+Run: python -m benchmarks.run [--base-url http://localhost:8000] [--duration 60] [--concurrency 32]
+                              [--mix browse=40,search=20,filter=20,cart=10,checkout=5,admin=5]
+                              [--output results.json] [--baseline baseline.json] [--save-baseline baseline.json]
+
+Seed the target database first with `python -m benchmarks.seed`. With
+--baseline the run exits non-zero when an endpoint's p95 (or error rate)
+regressed past --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+import httpx
+from benchmarks.seed import BENCH_ADMIN, BENCH_PASSWORD
+
+DEFAULT_MIX = "browse=40,search=20,filter=20,cart=10,checkout=5,admin=5"
+SEARCH_TERMS = ["iphone", "samsung", "laptop", "dell", "macbook", "tai nghe", "sony", "áo", "giày", "nike"]
+SORTS = ["created_at", "price", "rating", "name"]
+
+
+class Stats:
+    """Latencies and errors per endpoint template for requests started
+    inside the measurement window (after the warm-up)"""
+
+    def __init__(self, measure_from: float, measure_until: float):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.measure_from = measure_from
+        self.measure_until = measure_until
+        self.elapsed = measure_until - measure_from
+
+    def record(self, endpoint: str, started: float, seconds: float, ok: bool):
+        if not self.measure_from <= started < self.measure_until:
+            return
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def summary(self) -> dict:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values.sort()
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "rps": round(len(values) / self.elapsed, 2) if self.elapsed else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {
+            "duration_s": round(self.elapsed, 2),
+            "requests": total,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "rps": round(total / self.elapsed, 2) if self.elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Session:
+    """One virtual user: an HTTP client, an optional token and shared fixtures"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, fixtures: dict, rng: random.Random,
+                 token: Optional[str] = None, admin_token: Optional[str] = None):
+        self.client = client
+        self.stats = stats
+        self.fixtures = fixtures
+        self.rng = rng
+        self.token = token
+        self.admin_token = admin_token
+
+    async def request(self, method: str, endpoint: str, url: str, token: Optional[str] = None, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response = None
+            ok = False
+        self.stats.record(f"{method} {endpoint}", started, time.perf_counter() - started, ok)
+        return response
+
+    def product_id(self) -> str:
+        return self.rng.choice(self.fixtures["product_ids"])
+
+
+async def browse(session: Session):
+    rng = session.rng
+    await session.request("GET", "/api/categories", "/api/categories")
+    await session.request("GET", "/api/products", "/api/products", params={"page": rng.randint(1, 50), "limit": 20})
+    await session.request("GET", "/api/products/{id}", f"/api/products/{session.product_id()}")
+
+
+async def search(session: Session):
+    await session.request(
+        "GET", "/api/products?q", "/api/products",
+        params={"q": session.rng.choice(SEARCH_TERMS), "limit": 20},
+    )
+
+
+async def filter_products(session: Session):
+    rng = session.rng
+    params = {"sort": rng.choice(SORTS), "order": rng.choice(["asc", "desc"]), "limit": 20}
+    if session.fixtures["category_ids"]:
+        params["category"] = rng.choice(session.fixtures["category_ids"])
+    low = rng.choice([0, 1_000_000, 5_000_000, 10_000_000])
+    params["min_price"] = low
+    params["max_price"] = low + rng.choice([2_000_000, 10_000_000, 30_000_000])
+    if session.fixtures["brands"] and rng.random() < 0.3:
+        params["brand"] = rng.choice(session.fixtures["brands"])
+    await session.request("GET", "/api/products?filter", "/api/products", params=params)
+
+
+async def cart_churn(session: Session):
+    product_id = session.product_id()
+    token = session.token
+    await session.request("POST", "/api/cart/items", "/api/cart/items", token, json={"product_id": product_id, "quantity": 1})
+    await session.request("GET", "/api/cart", "/api/cart", token)
+    await session.request(
+        "PUT", "/api/cart/items/{id}", f"/api/cart/items/{product_id}", token,
+        params={"quantity": session.rng.randint(2, 4)},
+    )
+    await session.request("DELETE", "/api/cart/items/{id}", f"/api/cart/items/{product_id}", token)
+
+
+async def checkout(session: Session):
+    token = session.token
+    for _ in range(session.rng.randint(1, 3)):
+        await session.request(
+            "POST", "/api/cart/items", "/api/cart/items", token,
+            json={"product_id": session.product_id(), "quantity": 1},
+        )
+    await session.request("POST", "/api/orders", "/api/orders", token, json={
+        "full_name": "Bench Customer",
+        "email": "customer@example.com",
+        "phone": "0900000000",
+        "address": "1 Bench Street",
+    })
+    await session.request("GET", "/api/orders", "/api/orders", token)
+
+
+async def admin_dashboard(session: Session):
+    token = session.admin_token
+    await session.request("GET", "/api/orders/summary", "/api/orders/summary", token)
+    await session.request("GET", "/api/orders/metrics", "/api/orders/metrics", token)
+    await session.request("GET", "/api/orders/all", "/api/orders/all", token)
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "browse": browse,
+    "search": search,
+    "filter": filter_products,
+    "cart": cart_churn,
+    "checkout": checkout,
+    "admin": admin_dashboard,
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def login(client: httpx.AsyncClient, username: str) -> Optional[str]:
+    response = await client.post("/api/auth/login", data={"username": username, "password": BENCH_PASSWORD})
+    if response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+async def load_fixtures(client: httpx.AsyncClient) -> dict:
+    """Product ids, categories and brands to build realistic requests from"""
+    product_ids = []
+    brands = set()
+    for page in range(1, 6):
+        response = await client.get("/api/products", params={"page": page, "limit": 100})
+        response.raise_for_status()
+        for product in response.json()["items"]:
+            product_ids.append(product["id"])
+            if product.get("brand"):
+                brands.add(product["brand"])
+    categories = (await client.get("/api/categories")).json()
+    if not product_ids:
+        raise SystemExit("❌ No products found, seed the database first (python -m benchmarks.seed)")
+    return {
+        "product_ids": product_ids,
+        "category_ids": [c["id"] for c in categories],
+        "brands": sorted(brands),
+    }
+
+
+async def worker(session: Session, mix: Dict[str, float], deadline: float):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        scenario = session.rng.choices(names, weights)[0]
+        if scenario in ("cart", "checkout") and not session.token:
+            scenario = "browse"
+        if scenario == "admin" and not session.admin_token:
+            scenario = "browse"
+        await SCENARIOS[scenario](session)
+
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        fixtures = await load_fixtures(client)
+        tokens = await asyncio.gather(*(login(client, f"bench_user_{i}") for i in range(args.concurrency)))
+        admin_token = await login(client, BENCH_ADMIN)
+        if not all(tokens) or not admin_token:
+            print("⚠️  Some bench accounts could not log in; their cart/checkout/admin traffic becomes browse")
+
+        measure_from = time.perf_counter() + args.warmup
+        deadline = measure_from + args.duration
+        stats = Stats(measure_from, deadline)
+        sessions = [
+            Session(client, stats, fixtures, random.Random(args.seed + i), tokens[i], admin_token)
+            for i in range(args.concurrency)
+        ]
+        print(f"🚀 {args.warmup}s warm-up, then measuring for {args.duration}s with {args.concurrency} virtual users")
+        await asyncio.gather(*(worker(session, args.mix, deadline) for session in sessions))
+    return stats.summary()
+
+
+def print_report(summary: dict):
+    print(f"\n📊 {summary['requests']} requests in {summary['duration_s']}s "
+          f"({summary['rps']} req/s, {summary['errors']} errors)\n")
+    header = f"{'endpoint':<32} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, data in summary["endpoints"].items():
+        print(f"{endpoint:<32} {data['requests']:>7} {data['errors']:>5} {data['rps']:>8} "
+              f"{data['p50_ms']:>8} {data['p95_ms']:>8} {data['p99_ms']:>8}")
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Endpoints whose p95 or error rate got worse than the baseline allows"""
+    regressions = []
+    print(f"\n📏 Compared with baseline (tolerance {tolerance:.0%})\n")
+    for endpoint, data in summary["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if base is None:
+            print(f"   {endpoint:<32} new endpoint")
+            continue
+        change = (data["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        error_rate = data["errors"] / data["requests"] if data["requests"] else 0.0
+        base_error_rate = base["errors"] / base["requests"] if base["requests"] else 0.0
+        marker = "  "
+        if change > tolerance or error_rate > base_error_rate + 0.01:
+            marker = "❌"
+            regressions.append(endpoint)
+        elif change < -tolerance:
+            marker = "✅"
+        print(f"{marker} {endpoint:<32} p95 {base['p95_ms']:>8} -> {data['p95_ms']:>8} ms ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="Seconds of traffic before measuring")
+    parser.add_argument("--concurrency", type=int, default=32, help="Virtual users")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Compare against a stored results file")
+    parser.add_argument("--save-baseline", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed p95 regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    summary["config"] = {
+        "base_url": args.base_url,
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+    }
+    print_report(summary)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=2)
+            print(f"\n💾 Saved {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(summary, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} endpoint(s) regressed")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
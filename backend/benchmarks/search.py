@@ -0,0 +1,122 @@
+"""
+Compare the in-process search index with MongoDB $text on relevance and latency
+Run: python -m benchmarks.search [--database product_catalog_bench] [--queries 500] [--k 10]
+
+Queries are made from the names of sampled products in three forms: as
+written, without diacritics ("dien thoai") and with a typo in one word.
+A query hits when a product whose name starts with the same words is in
+the top k; MRR uses the rank of the first one. Latency covers fetching
+the top k documents, so both sides pay the same MongoDB round trip. Seed
+the database first with `python -m benchmarks.seed`.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.database import client_options
+from app.search import SearchIndex, fold
+
+FORMS = ("exact", "unaccented", "typo")
+
+
+def make_typo(rng: random.Random, word: str) -> str:
+    """Drop, repeat or swap one inner character"""
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:i] + word[i + 1:]
+    if kind == 1:
+        return word[:i] + word[i] + word[i:]
+    return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+
+
+def prefix(name: str) -> str:
+    return " ".join(name.split()[:3])
+
+
+def make_queries(rng: random.Random, names: list, count: int) -> list:
+    """(form, query, name prefix) triples"""
+    queries = []
+    for name in rng.sample(names, min(count, len(names))):
+        words = prefix(name).split()
+        form = rng.choice(FORMS)
+        if form == "unaccented":
+            words = fold(" ".join(words)).split()
+        elif form == "typo":
+            long_words = [i for i, word in enumerate(words) if len(word) >= 4]
+            if not long_words:
+                form = "exact"
+            else:
+                i = rng.choice(long_words)
+                words[i] = make_typo(rng, words[i])
+        queries.append((form, " ".join(words), prefix(name)))
+    return queries
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args):
+    client = AsyncIOMotorClient(settings.mongodb_url, **client_options())
+    database = client[args.database]
+    try:
+        started = time.perf_counter()
+        index = SearchIndex()
+        await index.load(database)
+        print(f"📚 Indexed {index.live:,} products, {len(index.terms):,} terms "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        names = await database.products.distinct("name")
+        queries = make_queries(random.Random(args.seed), names, args.queries)
+
+        async def engine(query):
+            ids = [product_id for product_id, _ in index.search(query, args.k)]
+            found = {p["_id"]: p async for p in database.products.find({"_id": {"$in": ids}}, {"name": 1})}
+            return [found[product_id]["name"] for product_id in ids if product_id in found]
+
+        async def text(query):
+            cursor = database.products.find(
+                {"$text": {"$search": query}}, {"name": 1, "score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})]).limit(args.k)
+            return [p["name"] async for p in cursor]
+
+        results = {}
+        for label, method in (("index", engine), ("$text", text)):
+            latencies = []
+            hits, reciprocal_ranks = defaultdict(int), defaultdict(float)
+            for form, query, target in queries:
+                started = time.perf_counter()
+                found = [prefix(name) for name in await method(query)]
+                latencies.append((time.perf_counter() - started) * 1000)
+                if target in found:
+                    hits[form] += 1
+                    reciprocal_ranks[form] += 1 / (found.index(target) + 1)
+            results[label] = (latencies, hits, reciprocal_ranks)
+    finally:
+        client.close()
+
+    per_form = {form: sum(1 for q in queries if q[0] == form) for form in FORMS}
+    print(f"🔎 {len(queries)} queries ({', '.join(f'{n} {form}' for form, n in per_form.items())}), top {args.k}")
+    for label, (latencies, hits, reciprocal_ranks) in results.items():
+        recall = "  ".join(
+            f"{form} {hits[form] / per_form[form]:.0%}/{reciprocal_ranks[form] / per_form[form]:.2f}"
+            for form in FORMS if per_form[form]
+        )
+        print(f"  {label:6} hit@{args.k}/MRR: {recall}")
+        print(f"  {'':6} latency: p50 {percentile(latencies, 0.5):.1f}ms, "
+              f"p95 {percentile(latencies, 0.95):.1f}ms, max {max(latencies):.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=f"{settings.database_name}_bench")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args))
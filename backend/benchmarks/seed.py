@@ -0,0 +1,42 @@
+"""
+Seed a benchmark database at a chosen scale
+Run: python -m benchmarks.seed --scale 100k [--database product_catalog_bench] [--drop]
+
+Scales: 10k, 100k, 1m (products and orders; users are a tenth of that).
+Every benchmark user shares the password `bench123`; the admin is `bench_admin`.
+Data comes from generate_data.py, so the same --seed gives the same database.
+"""
+import argparse
+import asyncio
+from app.config import settings
+from generate_data import generate
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BENCH_PREFIX = "bench"
+BENCH_PASSWORD = "bench123"
+BENCH_ADMIN = f"{BENCH_PREFIX}_admin"
+
+
+async def seed(scale: str, database_name: str, drop: bool, seed_value: int):
+    count = SCALES[scale]
+    await generate(
+        database_name,
+        products=count,
+        users=max(count // 10, 1),
+        orders=count,
+        carts=count // 100,
+        seed=seed_value,
+        prefix=BENCH_PREFIX,
+        password=BENCH_PASSWORD,
+        drop=drop,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--database", default=f"{settings.database_name}_bench")
+    parser.add_argument("--drop", action="store_true", help="Drop the benchmark database first")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible data")
+    args = parser.parse_args()
+    asyncio.run(seed(args.scale, args.database, args.drop, args.seed))
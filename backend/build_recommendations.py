@@ -0,0 +1,36 @@
+"""
+Rebuild "frequently bought together" products from the order history
+Run: python build_recommendations.py [--top-k 20] [--min-count 2] [--database NAME]
+
+Every non-cancelled order with two or more products counts. Results go to
+the product_related collection, served by GET /api/products/{id}/related.
+"""
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.database import client_options
+from app.images import shutdown_process_pool
+from app.recommendations import build_related
+
+
+async def main(database_name: str, top_k: int, min_count: int):
+    client = AsyncIOMotorClient(settings.mongodb_url, **client_options())
+    try:
+        result = await build_related(client[database_name], top_k, min_count)
+    finally:
+        client.close()
+        shutdown_process_pool()
+    seconds = result["seconds"]
+    print(f"✅ {result['orders']:,} baskets, {result['products']:,} products, {result['pairs']:,} related pairs")
+    print(f"✅ {result['written']:,} products written, {result['removed']:,} stale removed")
+    print(f"⏱️  load {seconds['load']}s, compute {seconds['compute']}s, write {seconds['write']}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=settings.recommendations_top_k)
+    parser.add_argument("--min-count", type=int, default=settings.recommendations_min_count)
+    parser.add_argument("--database", default=settings.database_name)
+    args = parser.parse_args()
+    asyncio.run(main(args.database, args.top_k, args.min_count))
@@ -0,0 +1,441 @@
+"""
+Generate a synthetic catalog, users, reviews, carts and orders at any scale
+Run: python generate_data.py --products 100000 --users 50000 --orders 1000000 --carts 20000
+                             [--seed 42] [--end-date 2024-06-30] [--days 365]
+                             [--database NAME] [--drop] [--concurrency 8] [--batch-size 5000]
+
+The same seed and end date always produce the same documents, _ids included,
+so a run can be repeated (or resumed: documents that already exist are skipped).
+Product and customer popularity follow a Zipf distribution and order times
+lean towards recent days and evening hours. Product rating aggregates match
+the generated reviews (one per user and product). Every generated account uses
+--password; `<prefix>_admin` is an admin.
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Callable, List, Optional
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+from app.config import settings
+from app.database import client_options
+from app.pricing import effective_price
+from app.reviews import RATINGS, rating_fields
+from app.category_stats import reconcile_category_stats
+from app.schema import LATEST_VERSION, META_COLLECTION, apply_indexes
+from app.utils import get_password_hash, generate_slug
+from seed_data import CATEGORIES, PRODUCTS
+
+# Leading byte of generated ObjectIds after the timestamp, one per collection
+KIND_CATEGORY, KIND_PRODUCT, KIND_USER, KIND_CART, KIND_ORDER, KIND_REVIEW = range(6)
+# Review j of product i gets index (i << REVIEW_BITS) | j
+REVIEW_BITS = 24
+DUPLICATE_KEY = 11000
+
+VARIANTS = ["", "", "Plus", "Lite", "Mini", "Max", "2024", "SE", "Pro"]
+COLORS = ["Đen", "Trắng", "Xanh", "Bạc", "Vàng", "Hồng", "Xám"]
+LAST_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ"]
+MIDDLE_NAMES = ["Văn", "Thị", "Minh", "Quốc", "Ngọc", "Thanh", "Hữu", "Gia"]
+FIRST_NAMES = ["An", "Bình", "Châu", "Dũng", "Hà", "Hải", "Hùng", "Lan", "Linh", "Long", "Mai", "Nam", "Phúc", "Quân", "Trang", "Tuấn", "Vy"]
+STREETS = ["Nguyễn Huệ", "Lê Lợi", "Trần Phú", "Hai Bà Trưng", "Lý Thường Kiệt", "Điện Biên Phủ", "Phạm Ngũ Lão"]
+# (city, relative share of customers)
+CITIES = [("TP.HCM", 40), ("Hà Nội", 30), ("Đà Nẵng", 10), ("Cần Thơ", 6), ("Hải Phòng", 6), ("Huế", 4), ("Nha Trang", 4)]
+NOTES = ["", "", "", "Giao nhanh giúp mình", "Kiểm tra hàng trước khi nhận", "Giao giờ hành chính"]
+# Share of orders per hour of day (UTC+7 shopping peaks at lunch and in the evening)
+HOUR_WEIGHTS = [1, 1, 1, 1, 2, 3, 4, 5, 6, 7, 6, 4, 3, 3, 4, 5, 6, 5, 4, 3, 2, 2, 1, 1]
+# Review titles by star rating
+REVIEW_TITLES = {
+    1: ["Thất vọng", "Không như mô tả", "Hàng lỗi"],
+    2: ["Chưa hài lòng", "Chất lượng tạm", "Giao hàng chậm"],
+    3: ["Tạm ổn", "Đúng giá tiền", "Bình thường"],
+    4: ["Hài lòng", "Sản phẩm tốt", "Đáng mua"],
+    5: ["Tuyệt vời", "Rất hài lòng", "Sẽ ủng hộ tiếp"],
+}
+
+
+def make_id(kind: int, index: int, created_at: datetime) -> ObjectId:
+    """Deterministic ObjectId: creation timestamp, collection kind, index"""
+    seconds = int(created_at.replace(tzinfo=timezone.utc).timestamp())
+    return ObjectId(seconds.to_bytes(4, "big") + bytes([kind]) + index.to_bytes(7, "big"))
+
+
+def zipf_cumulative(n: int, skew: float) -> List[float]:
+    """Cumulative weights of ranks 0..n-1 for rng.choices / bisect"""
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(n)))
+
+
+def coprime_stride(n: int, start: int) -> int:
+    """A stride coprime with n, used to scatter popularity ranks over indexes"""
+    stride = start % n or 1
+    while math.gcd(stride, n) != 1:
+        stride += 1
+    return stride
+
+
+class DataGenerator:
+    """Pure functions of (seed, index) for every document, so batches can be
+    built in any order by concurrent tasks and still come out identical"""
+
+    def __init__(self, seed: int, products: int, users: int, end: datetime, days: int,
+                 prefix: str, hashed_password: str, skew: float):
+        self.seed = seed
+        self.products = products
+        self.users = users
+        self.end = end
+        self.days = days
+        self.prefix = prefix
+        self.hashed_password = hashed_password
+
+        self.category_ids = {
+            category["name"]: make_id(KIND_CATEGORY, i, end - timedelta(days=2 * days))
+            for i, category in enumerate(CATEGORIES)
+        }
+        self.template_slugs = [generate_slug(template["name"]) for template in PRODUCTS]
+
+        # Popularity rank r is product (r * stride) % n, so best sellers are spread across the catalog
+        self.product_stride = coprime_stride(products, 7919 + seed)
+        self.product_rank_of = pow(self.product_stride, -1, products)
+        self.product_popularity = zipf_cumulative(products, skew)
+        self.user_stride = coprime_stride(users, 104729 + seed)
+        self.user_popularity = zipf_cumulative(users, skew * 0.7)
+        self.cart_stride = coprime_stride(users, 15485863 + seed)
+        self.review_stride = coprime_stride(users, 32452843 + seed)
+        self.city_cumulative = list(itertools.accumulate(weight for _, weight in CITIES))
+        self.product_info = lru_cache(maxsize=200_000)(self._product_info)
+        self.user_id = lru_cache(maxsize=200_000)(self._user_id)
+
+    def rng(self, kind: int, index: int) -> random.Random:
+        return random.Random((self.seed << 48) | (kind << 40) | index)
+
+    def spread_time(self, rng: random.Random, days: int) -> datetime:
+        """A time in the last `days` days, denser towards the end date and peak hours"""
+        age = days * (1 - math.sqrt(rng.random()))
+        day = self.end - timedelta(days=int(age))
+        hour = rng.choices(range(24), HOUR_WEIGHTS)[0]
+        return day.replace(hour=0, minute=0, second=0) + timedelta(
+            hours=hour, minutes=rng.randrange(60), seconds=rng.randrange(60)
+        )
+
+    def person(self, rng: random.Random) -> str:
+        return f"{rng.choice(LAST_NAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(FIRST_NAMES)}"
+
+    def product(self, i: int) -> dict:
+        rng = self.rng(KIND_PRODUCT, i)
+        t = rng.randrange(len(PRODUCTS))
+        template = PRODUCTS[t]
+        variant = rng.choice(VARIANTS)
+        color = rng.choice(COLORS)
+        name = " ".join(part for part in (template["name"], variant, color) if part)
+        created_at = self.spread_time(rng, 2 * self.days)
+        rank = (i * self.product_rank_of) % self.products
+        price = round(template["price"] * rng.uniform(0.6, 1.4), -4)
+        discount = rng.choice([0, 0, 0, 0, 5, 10, 15, 20])
+        # Each user reviews a product at most once
+        reviews_count = min(int(2000 / (rank + 1) ** 0.6 * rng.uniform(0.5, 1.5)), self.users)
+        # Split the reviews over the stars, mostly 4-5 like real shops
+        weights = [1, 1, rng.uniform(1, 4), rng.uniform(4, 10), rng.uniform(6, 20)]
+        histogram = {stars: int(reviews_count * w / sum(weights)) for stars, w in zip(RATINGS, weights)}
+        histogram[5] += reviews_count - sum(histogram.values())
+        return {
+            "_id": make_id(KIND_PRODUCT, i, created_at),
+            "name": name,
+            "slug": f"{self.template_slugs[t]}-{i}",
+            "description": template["description"],
+            "price": price,
+            "currency": "VND",
+            "discount": discount,
+            "effective_price": effective_price(price, discount),
+            "category": self.category_ids[template["category"]],
+            "category_path": [self.category_ids[template["category"]]],
+            "tags": template["tags"],
+            "brand": template["brand"],
+            "images": [f"https://picsum.photos/seed/{self.seed}-{i}/800/600"],
+            "specs": {**template["specs"], "color": color},
+            "stock": 0 if rng.random() < 0.05 else rng.randint(1, 300),
+            **rating_fields(histogram),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+    def _product_info(self, i: int) -> tuple:
+        """What orders and carts copy from a product: id, name, unit price, image"""
+        product = self.product(i)
+        return str(product["_id"]), product["name"], product["effective_price"], product["images"][0]
+
+    def _user_id(self, i: int) -> str:
+        # Same first draw as user(), so the id matches the inserted document
+        return str(make_id(KIND_USER, i, self.spread_time(self.rng(KIND_USER, i), 2 * self.days)))
+
+    def user(self, i: int) -> dict:
+        rng = self.rng(KIND_USER, i)
+        created_at = self.spread_time(rng, 2 * self.days)
+        username = f"{self.prefix}_user_{i}"
+        return {
+            "_id": make_id(KIND_USER, i, created_at),
+            "username": username,
+            "email": f"{username}@example.com",
+            "hashed_password": self.hashed_password,
+            "full_name": self.person(rng),
+            "role": "user",
+            "is_active": True,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+    def admin(self) -> dict:
+        created_at = self.end - timedelta(days=2 * self.days)
+        username = f"{self.prefix}_admin"
+        return {
+            "_id": make_id(KIND_USER, self.users, created_at),
+            "username": username,
+            "email": f"{username}@example.com",
+            "hashed_password": self.hashed_password,
+            "full_name": "Admin",
+            "role": "admin",
+            "is_active": True,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+    def reviews(self, i: int) -> List[dict]:
+        """The reviews behind product i's rating_histogram, by distinct users"""
+        product = self.product(i)
+        rng = self.rng(KIND_REVIEW, i)
+        first_user = rng.randrange(self.users)
+        # spread_time may land on the end date's own hours, after `end`
+        window = max(self.end - product["created_at"], timedelta(0))
+        stars = [
+            rating for rating in RATINGS
+            for _ in range(product["rating_histogram"][str(rating)])
+        ]
+        rng.shuffle(stars)
+        reviews = []
+        for j, rating in enumerate(stars):
+            user = (first_user + j * self.review_stride) % self.users
+            created_at = product["created_at"] + window * rng.random()
+            reviews.append({
+                "_id": make_id(KIND_REVIEW, (i << REVIEW_BITS) | j, created_at),
+                "product_id": product["_id"],
+                "user_id": self.user_id(user),
+                "username": f"{self.prefix}_user_{user}",
+                "rating": rating,
+                "title": rng.choice(REVIEW_TITLES[rating]),
+                "comment": None,
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+        return reviews
+
+    def review_batch(self, start: int, stop: int) -> List[dict]:
+        return [review for i in range(start, stop) for review in self.reviews(i)]
+
+    def popular_product(self, rng: random.Random) -> int:
+        rank = bisect.bisect(self.product_popularity, rng.random() * self.product_popularity[-1])
+        return (min(rank, self.products - 1) * self.product_stride) % self.products
+
+    def line_items(self, rng: random.Random) -> List[dict]:
+        items = {}
+        for _ in range(rng.choices((1, 2, 3, 4, 5), (45, 30, 15, 7, 3))[0]):
+            product_id, name, price, image = self.product_info(self.popular_product(rng))
+            if product_id not in items:
+                items[product_id] = {"product_id": product_id, "product_name": name, "price": price,
+                                     "quantity": rng.choices((1, 2, 3), (80, 15, 5))[0], "image": image}
+        return list(items.values())
+
+    def cart(self, j: int) -> dict:
+        rng = self.rng(KIND_CART, j)
+        user = (j * self.cart_stride) % self.users
+        updated_at = self.spread_time(rng, 14)
+        items = [
+            {"product_id": item["product_id"], "quantity": item["quantity"], "price": item["price"]}
+            for item in self.line_items(rng)
+        ]
+        return {
+            "_id": make_id(KIND_CART, j, updated_at),
+            "user_id": self.user_id(user),
+            "items": items,
+            "created_at": updated_at,
+            "updated_at": updated_at,
+            "expires_at": updated_at + timedelta(days=settings.cart_ttl_days),
+        }
+
+    def order(self, i: int, rng: random.Random) -> dict:
+        rank = bisect.bisect(self.user_popularity, rng.random() * self.user_popularity[-1])
+        user = (min(rank, self.users - 1) * self.user_stride) % self.users
+        created_at = self.spread_time(rng, self.days)
+        age = self.end - created_at
+        if age < timedelta(days=1):
+            status = rng.choices(("pending", "processing", "cancelled"), (60, 35, 5))[0]
+        elif age < timedelta(days=7):
+            status = rng.choices(("processing", "completed", "cancelled"), (40, 52, 8))[0]
+        else:
+            status = rng.choices(("completed", "cancelled"), (90, 10))[0]
+        updated_at = created_at if status == "pending" else created_at + timedelta(hours=rng.randint(1, 72))
+        items = self.line_items(rng)
+        city_index = bisect.bisect(self.city_cumulative, rng.random() * self.city_cumulative[-1])
+        return {
+            "_id": make_id(KIND_ORDER, i, created_at),
+            "user_id": self.user_id(user),
+            "items": items,
+            "total": round(sum(item["price"] * item["quantity"] for item in items), 2),
+            "status": status,
+            "shipping": {
+                "full_name": self.person(rng),
+                "email": f"{self.prefix}_user_{user}@example.com",
+                "phone": f"09{rng.randrange(10 ** 8):08d}",
+                "address": f"{rng.randint(1, 300)} {rng.choice(STREETS)}, {CITIES[min(city_index, len(CITIES) - 1)][0]}",
+            },
+            "note": rng.choice(NOTES),
+            "status_notes": [] if status == "pending" else [f"{updated_at.isoformat()} - Chuyển sang trạng thái {status}"],
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def order_batch(self, start: int, stop: int) -> List[dict]:
+        # One stream per batch: orders are never looked up by index
+        rng = self.rng(KIND_ORDER, start)
+        return [self.order(i, rng) for i in range(start, stop)]
+
+
+async def insert_batch(collection, documents: List[dict]) -> int:
+    """insert_many that treats already-present _ids as done (re-runs and resumes)"""
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+async def load(collection, count: int, make_batch: Callable[[int, int], List[dict]],
+               batch_size: int, concurrency: int, label: str, total: Optional[int] = None):
+    """Build and insert `count` documents with `concurrency` tasks sharing the batch list.
+
+    `total` is the number of documents when a batch index stands for several
+    (e.g. a product's reviews); it defaults to `count`.
+    """
+    total = count if total is None else total
+    started = time.perf_counter()
+    batches = iter(range(0, count, batch_size))
+    inserted = 0
+
+    async def worker():
+        nonlocal inserted
+        for start in batches:
+            inserted += await insert_batch(collection, make_batch(start, min(start + batch_size, count)))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed else 0
+    print(f"✅ {label}: {inserted} inserted, {total - inserted} already present ({elapsed:.1f}s, {rate:,.0f} docs/s)")
+
+
+async def generate(
+    database_name: str,
+    products: int,
+    users: int,
+    orders: int,
+    carts: int,
+    seed: int = 42,
+    end: Optional[datetime] = None,
+    days: int = 365,
+    prefix: str = "gen",
+    password: str = "password123",
+    skew: float = 1.1,
+    drop: bool = False,
+    concurrency: int = 8,
+    batch_size: int = 5000,
+):
+    end = end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    users = max(users, 1)
+    products = max(products, 1)
+    carts = min(carts, users)
+
+    client = AsyncIOMotorClient(settings.mongodb_url, **client_options())
+    database = client[database_name]
+    started = time.perf_counter()
+    print(f"🌱 Generating into {database_name} (seed {seed}, end {end.date()})")
+    if drop:
+        await client.drop_database(database_name)
+
+    # One bcrypt hash for everyone: hashing per user would dominate the run
+    generator = DataGenerator(seed, products, users, end, days, prefix, get_password_hash(password), skew)
+
+    categories = [
+        {
+            "_id": generator.category_ids[category["name"]],
+            "name": category["name"],
+            "slug": generate_slug(category["name"]),
+            "description": category["description"],
+            "image": None,
+            "parent": None,
+            "ancestors": [],
+            "is_active": True,
+            "created_at": end - timedelta(days=2 * days),
+            "updated_at": end - timedelta(days=2 * days),
+        }
+        for category in CATEGORIES
+    ]
+    await load(database.categories, len(categories), lambda a, b: categories[a:b], batch_size, 1, "categories")
+    await load(database.products, products, lambda a, b: [generator.product(i) for i in range(a, b)],
+               batch_size, concurrency, "products")
+    await load(database.users, users, lambda a, b: [generator.user(i) for i in range(a, b)],
+               batch_size, concurrency, "users")
+    await insert_batch(database.users, [generator.admin()])
+    # Batches of products, each holding up to a few thousand reviews
+    reviews = sum(generator.product(i)["reviews_count"] for i in range(products))
+    await load(database.reviews, products, generator.review_batch, max(batch_size // 50, 1),
+               concurrency, "reviews", total=reviews)
+    await load(database.carts, carts, lambda a, b: [generator.cart(j) for j in range(a, b)],
+               batch_size, concurrency, "carts")
+    await load(database.orders, orders, generator.order_batch, batch_size, concurrency, "orders")
+
+    # Indexes after loading is much faster than maintaining them per insert
+    index_started = time.perf_counter()
+    await apply_indexes(database)
+    await database[META_COLLECTION].update_one(
+        {"_id": "migrations"}, {"$max": {"version": LATEST_VERSION}}, upsert=True
+    )
+    print(f"✅ Indexes built ({time.perf_counter() - index_started:.1f}s)")
+    print(f"✅ Category stats: {await reconcile_category_stats(database)} categories")
+    print(f"🎉 Done in {time.perf_counter() - started:.1f}s "
+          f"(accounts: {prefix}_user_<n> / {prefix}_admin, password: {password})")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--carts", type=int, default=1_000, help="Users with an open cart")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=datetime.fromisoformat, help="Latest timestamp (default: today 00:00 UTC)")
+    parser.add_argument("--days", type=int, default=365, help="Order history length")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of product popularity")
+    parser.add_argument("--prefix", default="gen", help="Username prefix")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--database", default=settings.database_name)
+    parser.add_argument("--drop", action="store_true", help="Drop the database first")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent insert tasks")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    asyncio.run(generate(
+        args.database, args.products, args.users, args.orders, args.carts,
+        seed=args.seed, end=args.end_date, days=args.days, prefix=args.prefix, password=args.password,
+        skew=args.skew, drop=args.drop, concurrency=args.concurrency, batch_size=args.batch_size,
+    ))
+
+
+if __name__ == "__main__":
+    main()
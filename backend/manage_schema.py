@@ -0,0 +1,74 @@
+"""
+Inspect and apply MongoDB indexes and data migrations out of band
+Run: python manage_schema.py [status|indexes|migrate|apply]
+  status   show what is applied and what is pending
+  indexes  build the index set (one create_indexes batch per collection)
+  migrate  run pending data migrations (resumable)
+  apply    migrate + indexes
+"""
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.database import db, client_options
+from app.schema import (
+    LATEST_VERSION,
+    acquire_lock,
+    apply_indexes,
+    get_schema_state,
+    index_spec_hash,
+    lock_owner,
+    pending_work,
+    release_lock,
+    run_migrations,
+)
+
+
+async def main(command: str):
+    db.client = AsyncIOMotorClient(settings.mongodb_url, **client_options())
+    database = db.client[settings.database_name]
+
+    state = await get_schema_state(database)
+    pending = pending_work(state)
+
+    if command == "status":
+        print(f"📐 Index spec hash: {index_spec_hash()[:12]} (applied: {(state['index_hash'] or 'never')[:12]})")
+        print(f"   Indexes last applied: {state['indexes_applied_at'] or 'never'}")
+        print(f"   Index build pending: {'yes' if pending['indexes'] else 'no'}")
+        print(f"🔁 Migration version: {state['migration_version']} (latest: {LATEST_VERSION})")
+        print(f"   Pending migrations: {pending['migrations'] or 'none'}")
+        db.client.close()
+        return
+
+    owner = lock_owner()
+    if not await acquire_lock(database, owner):
+        print("⚠️  Another process holds the schema lock, try again later")
+        db.client.close()
+        sys.exit(1)
+
+    try:
+        # Migrations first: they may remove data a new unique index rejects
+        if command in ("migrate", "apply"):
+            results = await run_migrations(database, owner)
+            if not results:
+                print("ℹ️  No pending migrations")
+            for version, updated in results.items():
+                print(f"✅ Migration {version}: {updated} documents updated")
+
+        if command in ("indexes", "apply"):
+            result = await apply_indexes(database, owner)
+            for collection, names in result["created"].items():
+                print(f"✅ {collection}: {', '.join(names)}")
+            for collection, names in result["dropped"].items():
+                print(f"🗑️  {collection}: dropped {', '.join(names)}")
+    finally:
+        await release_lock(database, owner)
+        db.client.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command not in ("status", "indexes", "migrate", "apply"):
+        print(__doc__)
+        sys.exit(2)
+    asyncio.run(main(command))
@@ -5,6 +5,9 @@ Run: python seed_data.py
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
+from app.category_stats import reconcile_category_stats
+from app.pricing import effective_price
+from app.reviews import rating_fields
 from app.utils import get_password_hash, generate_slug
 from datetime import datetime, timedelta
 from bson import ObjectId
@@ -128,6 +131,7 @@ async def seed_database():
                 "description": cat_data["description"],
                 "image": None,
                 "parent": None,
+                "ancestors": [],
                 "is_active": True,
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
@@ -140,7 +144,7 @@ async def seed_database():
             print(f"ℹ️  Category already exists: {cat_data['name']}")
     
     # Create products
-    created_count = 0
+    new_products = []
     for product_data in PRODUCTS:
         slug = generate_slug(product_data["name"])
         existing = await database.products.find_one({"slug": slug})
@@ -154,31 +158,36 @@ async def seed_database():
                 f"https://picsum.photos/800/600?random={random.randint(1001, 2000)}"
             ]
             
+            discount = random.choice([0, 0, 0, 5, 10, 15])  # Most products have no discount
             product_dict = {
                 "name": product_data["name"],
                 "slug": slug,
                 "description": product_data["description"],
                 "price": product_data["price"],
                 "currency": "VND",
-                "discount": random.choice([0, 0, 0, 5, 10, 15]),  # Most products have no discount
+                "discount": discount,
+                "effective_price": effective_price(product_data["price"], discount),
                 "category": ObjectId(category_id) if category_id else None,
+                "category_path": [ObjectId(category_id)] if category_id else [],
                 "tags": product_data["tags"],
                 "brand": product_data["brand"],
                 "images": images,
                 "specs": product_data["specs"],
                 "stock": product_data["stock"],
-                "rating": round(random.uniform(3.5, 5.0), 1),  # Random rating between 3.5 and 5.0
-                "reviews_count": random.randint(10, 500),
+                # No reviews yet; they are added through the reviews API
+                **rating_fields({}),
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
             }
             
-            await database.products.insert_one(product_dict)
-            created_count += 1
+            new_products.append(product_dict)
     
-    print(f"✅ Created {created_count} new products")
+    if new_products:
+        await database.products.insert_many(new_products)
+    print(f"✅ Created {len(new_products)} new products")
     total = await database.products.count_documents({})
     print(f"✅ Total products in database: {total}")
+    print(f"✅ Category stats: {await reconcile_category_stats(database)} categories")
 
     # Seed demo orders
     products = await database.products.find().to_list(length=200)
@@ -229,7 +238,7 @@ async def seed_orders(database, products, user_id):
     ]
 
     order_count = 8
-    created_orders = 0
+    orders = []
 
     for _ in range(order_count):
         shipping = random.choice(shipping_templates).copy()
@@ -274,10 +283,10 @@ async def seed_orders(database, products, user_id):
             "updated_at": created_at,
         }
 
-        await database.orders.insert_one(order)
-        created_orders += 1
+        orders.append(order)
 
-    print(f"✅ Created {created_orders} demo orders")
+    await database.orders.insert_many(orders)
+    print(f"✅ Created {len(orders)} demo orders")
 
 
 if __name__ == "__main__":
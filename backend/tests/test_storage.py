@@ -0,0 +1,103 @@
+import pytest
+from moto import mock_aws
+from app.config import settings
+from app.storage import S3Storage
+
+BUCKET = "test-uploads"
+PART_SIZE = 5 * 1024 * 1024  # smallest part S3 accepts
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setattr(settings, "s3_bucket", BUCKET)
+    monkeypatch.setattr(settings, "s3_prefix", "uploads")
+    monkeypatch.setattr(settings, "s3_endpoint_url", None)
+    monkeypatch.setattr(settings, "s3_region", "us-east-1")
+    monkeypatch.setattr(settings, "s3_access_key_id", "testing")
+    monkeypatch.setattr(settings, "s3_secret_access_key", "testing")
+    monkeypatch.setattr(settings, "s3_public_url", None)
+    monkeypatch.setattr(settings, "s3_multipart_chunk_size", PART_SIZE)
+    with mock_aws():
+        storage = S3Storage()
+        storage.client.create_bucket(Bucket=BUCKET)
+        yield storage
+
+
+async def chunks_of(data: bytes, size: int = 1024 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+@pytest.mark.asyncio
+async def test_small_file_roundtrip(s3):
+    size = await s3.save_bytes("small.png", b"png bytes", "image/png")
+
+    assert size == 9
+    assert await s3.read("small.png") == b"png bytes"
+    head = s3.client.head_object(Bucket=BUCKET, Key="uploads/small.png")
+    assert head["ContentType"] == "image/png"
+    assert await s3.list_names() == ["small.png"]
+
+
+@pytest.mark.asyncio
+async def test_large_file_uses_multipart(s3):
+    data = bytes(range(256)) * (11 * 1024 * 1024 // 256)  # two full parts and a tail
+
+    size = await s3.save("large.png", chunks_of(data), "image/png")
+
+    assert size == len(data)
+    stored = await s3.stat("large.png")
+    assert stored.size == len(data)
+    assert stored.etag.strip('"').endswith("-3")
+    assert await s3.read("large.png") == data
+    assert s3.client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_save_aborts_multipart(s3):
+    async def broken():
+        yield b"x" * PART_SIZE
+        raise RuntimeError("client went away")
+
+    with pytest.raises(RuntimeError):
+        await s3.save("broken.png", broken())
+
+    assert await s3.stat("broken.png") is None
+    assert s3.client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+@pytest.mark.asyncio
+async def test_stat_and_delete(s3):
+    assert await s3.stat("missing.png") is None
+    assert not await s3.exists("missing.png")
+
+    await s3.save_bytes("gone.png", b"data")
+    assert await s3.exists("gone.png")
+    await s3.delete("gone.png")
+
+    assert await s3.stat("gone.png") is None
+    assert await s3.list_names() == []
+
+
+@pytest.mark.asyncio
+async def test_variants_listed_by_prefix(s3):
+    await s3.save_bytes("a.png", b"a")
+    await s3.save_bytes("variants/a_card.webp", b"card")
+
+    assert await s3.list_names() == ["a.png"]
+    assert await s3.list_names("variants") == ["variants/a_card.webp"]
+
+
+@pytest.mark.asyncio
+async def test_presign_upload(s3):
+    presigned = await s3.presign_upload("direct.png", "image/png", 1024)
+
+    assert BUCKET in presigned["url"]
+    fields = presigned["fields"]
+    assert fields["key"] == "uploads/direct.png"
+    assert fields["Content-Type"] == "image/png"
+    assert "policy" in fields
+
+    url = await s3.download_url("direct.png")
+    assert "uploads/direct.png" in url
+    assert "Signature" in url or "X-Amz-Signature" in url
@@ -5,6 +5,11 @@ export const getCategories = async () => {
   return response.data
 }
 
+export const getCategoryTree = async () => {
+  const response = await client.get('/api/categories/tree')
+  return response.data
+}
+
 export const getCategory = async (id) => {
   const response = await client.get(`/api/categories/${id}`)
   return response.data
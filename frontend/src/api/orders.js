@@ -5,8 +5,8 @@ export const createOrder = async (payload) => {
   return response.data
 }
 
-export const getOrders = async () => {
-  const response = await client.get('/api/orders')
+export const getOrders = async (params = {}) => {
+  const response = await client.get('/api/orders', { params })
   return response.data
 }
 
@@ -35,3 +35,67 @@ export const getOrderDetail = async (orderId) => {
   return response.data
 }
 
+
+// Live feed of order changes (admin). EventSource can't send the bearer token,
+// so the stream is read with fetch; reconnects resume after the last event id.
+// Returns a function that closes the feed.
+export const subscribeOrderEvents = (onEvent) => {
+  const controller = new AbortController()
+  let lastEventId = null
+  let retry = 3000
+
+  const dispatch = (block) => {
+    let event = 'message'
+    let id = null
+    const data = []
+    for (const line of block.split('\n')) {
+      if (line.startsWith(':')) continue
+      const index = line.indexOf(':')
+      const field = index === -1 ? line : line.slice(0, index)
+      const value = index === -1 ? '' : line.slice(index + 1).replace(/^ /, '')
+      if (field === 'event') event = value
+      else if (field === 'data') data.push(value)
+      else if (field === 'id') id = value
+      else if (field === 'retry') retry = Number(value) || retry
+    }
+    if (id) lastEventId = id
+    if (data.length) onEvent(event, JSON.parse(data.join('\n')))
+  }
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const token = localStorage.getItem('token')
+        const response = await fetch(`${client.defaults.baseURL}/api/orders/events`, {
+          headers: {
+            Accept: 'text/event-stream',
+            ...(token && { Authorization: `Bearer ${token}` }),
+            ...(lastEventId && { 'Last-Event-ID': lastEventId }),
+          },
+          signal: controller.signal,
+        })
+        if (response.status === 401 || response.status === 403) return
+        if (response.ok) {
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+          let buffer = ''
+          for (;;) {
+            const { value, done } = await reader.read()
+            if (done) break
+            buffer += value.replace(/\r\n?/g, '\n')
+            let end
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+              dispatch(buffer.slice(0, end))
+              buffer = buffer.slice(end + 2)
+            }
+          }
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return
+      }
+      await new Promise((resolve) => setTimeout(resolve, retry))
+    }
+  }
+
+  connect()
+  return () => controller.abort()
+}
@@ -10,6 +10,16 @@ export const getProduct = async (id) => {
   return response.data
 }
 
+export const getTrendingProducts = async (params = {}) => {
+  const response = await client.get('/api/products/trending', { params })
+  return response.data
+}
+
+export const getRelatedProducts = async (id, limit = 4) => {
+  const response = await client.get(`/api/products/${id}/related`, { params: { limit } })
+  return response.data
+}
+
 export const getProductBySlug = async (slug) => {
   const response = await client.get(`/api/products/slug/${slug}`)
   return response.data
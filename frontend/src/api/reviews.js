@@ -0,0 +1,20 @@
+import client from './client'
+
+export const getReviews = async (productId, params = {}) => {
+  const response = await client.get(`/api/products/${productId}/reviews`, { params })
+  return response.data
+}
+
+export const createReview = async (productId, data) => {
+  const response = await client.post(`/api/products/${productId}/reviews`, data)
+  return response.data
+}
+
+export const updateReview = async (productId, reviewId, data) => {
+  const response = await client.put(`/api/products/${productId}/reviews/${reviewId}`, data)
+  return response.data
+}
+
+export const deleteReview = async (productId, reviewId) => {
+  await client.delete(`/api/products/${productId}/reviews/${reviewId}`)
+}
@@ -1,12 +1,17 @@
 import { useState, useEffect } from 'react'
 import { useQuery } from '@tanstack/react-query'
-import { getCategories } from '../api/categories'
+import { getCategoryTree } from '../api/categories'
+
+// Flatten the category tree into indented options, parents before children
+const flattenTree = (nodes, depth = 0) =>
+  nodes.flatMap((node) => [{ ...node, depth }, ...flattenTree(node.children, depth + 1)])
 
 export default function FilterPanel({ onFilterChange, filters }) {
-  const { data: categories = [] } = useQuery({
-    queryKey: ['categories'],
-    queryFn: getCategories,
+  const { data: tree = [] } = useQuery({
+    queryKey: ['categories', 'tree'],
+    queryFn: getCategoryTree,
   })
+  const categories = flattenTree(tree)
 
   const [localFilters, setLocalFilters] = useState({
     category: filters.category || '',
@@ -15,6 +20,9 @@ export default function FilterPanel({ onFilterChange, filters }) {
     brand: filters.brand || '',
   })
 
+  // Price bounds of the selected category, shown as input hints
+  const selectedStats = categories.find((cat) => cat.id === localFilters.category)?.stats
+
   useEffect(() => {
     onFilterChange(localFilters)
   }, [localFilters])
@@ -58,7 +66,7 @@ export default function FilterPanel({ onFilterChange, filters }) {
             <option value="">Tất cả</option>
             {categories.map((cat) => (
               <option key={cat.id} value={cat.id}>
-                {cat.name}
+                {'\u00A0\u00A0'.repeat(cat.depth)}{cat.name} ({cat.stats?.product_count ?? 0})
               </option>
             ))}
           </select>
@@ -72,14 +80,14 @@ export default function FilterPanel({ onFilterChange, filters }) {
           <div className="flex space-x-2">
             <input
               type="number"
-              placeholder="Từ"
+              placeholder={selectedStats?.min_price != null ? `Từ ${Math.floor(selectedStats.min_price).toLocaleString('vi-VN')}` : 'Từ'}
               value={localFilters.minPrice}
               onChange={(e) => handleChange('minPrice', e.target.value)}
               className="w-full px-3 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500"
             />
             <input
               type="number"
-              placeholder="Đến"
+              placeholder={selectedStats?.max_price != null ? `Đến ${Math.ceil(selectedStats.max_price).toLocaleString('vi-VN')}` : 'Đến'}
               value={localFilters.maxPrice}
               onChange={(e) => handleChange('maxPrice', e.target.value)}
               className="w-full px-3 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500"
@@ -1,4 +1,4 @@
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { getProducts, deleteProduct } from '../api/products'
 import { getCategories, deleteCategory } from '../api/categories'
@@ -7,6 +7,7 @@ import {
   getOrderSummary,
   getOrderMetrics,
   updateOrderStatus,
+  subscribeOrderEvents,
 } from '../api/orders'
 import toast from 'react-hot-toast'
 import ProductForm from '../components/ProductForm'
@@ -338,6 +339,102 @@ const ORDER_STATUSES = [
   { value: 'cancelled', label: 'Đã hủy' },
 ]
 
+// Same conditions as GET /api/orders/all, for orders arriving over the live feed
+const matchesOrderFilters = (order, filters) => {
+  if (filters.status && order.status !== filters.status) return false
+  if (filters.search) {
+    const search = filters.search.toLowerCase()
+    const { full_name = '', email = '' } = order.shipping || {}
+    if (!full_name.toLowerCase().includes(search) && !email.toLowerCase().includes(search)) return false
+  }
+  if (filters.startDate && order.created_at < filters.startDate) return false
+  if (filters.endDate && order.created_at > filters.endDate) return false
+  return true
+}
+
+// Applies one change to the cached order lists, summary and metrics instead of
+// refetching them. Returns false when the cache can't be patched reliably.
+const applyOrderEvent = (queryClient, type, orderId, order) => {
+  const lists = queryClient.getQueriesData({ queryKey: ['orders', 'admin'] })
+  const previous = lists
+    .flatMap(([, list]) => list || [])
+    .find((item) => item.id === orderId)
+  if (type === 'archived' || type === 'deleted') {
+    // Orders only leave for the archive, which the summary and metrics still
+    // count; lists that include archived orders keep (and refresh) them
+    lists.forEach(([queryKey, list]) => {
+      if (!list) return
+      if (!queryKey[2]?.includeArchived) {
+        queryClient.setQueryData(queryKey, list.filter((item) => item.id !== orderId))
+      } else if (order) {
+        queryClient.setQueryData(queryKey, list.map((item) => (item.id === orderId ? order : item)))
+      }
+    })
+    return true
+  }
+  if (type !== 'created' && !previous) return false
+  if (type === 'created' && previous) return true
+
+  lists.forEach(([queryKey, list]) => {
+    if (!list) return
+    const filters = queryKey[2] || {}
+    const rest = list.filter((item) => item.id !== orderId)
+    if (!matchesOrderFilters(order, filters)) {
+      queryClient.setQueryData(queryKey, rest)
+    } else if (type === 'created' || rest.length === list.length) {
+      queryClient.setQueryData(
+        queryKey,
+        [order, ...rest].sort((a, b) => b.created_at.localeCompare(a.created_at))
+      )
+    } else {
+      queryClient.setQueryData(queryKey, list.map((item) => (item.id === orderId ? order : item)))
+    }
+  })
+
+  const counts = {}
+  const created = type === 'created'
+  if (previous && previous.status !== order.status) counts[previous.status] = -1
+  if (previous?.status !== order.status) counts[order.status] = 1
+  const total = created ? order.total : 0
+  queryClient.setQueryData(['orders', 'summary'], (summary) => {
+    if (!summary) return summary
+    const status_counts = { ...summary.status_counts }
+    Object.entries(counts).forEach(([status, delta]) => {
+      status_counts[status] = (status_counts[status] || 0) + delta
+    })
+    return {
+      total_orders: summary.total_orders + (created ? 1 : 0),
+      total_revenue: summary.total_revenue + total,
+      status_counts,
+    }
+  })
+
+  if (created) {
+    const date = order.created_at.slice(0, 10)
+    queryClient.setQueryData(['orders', 'metrics'], (metrics) => {
+      if (!metrics) return metrics
+      const revenue_by_date = metrics.revenue_by_date.some((item) => item.date === date)
+        ? metrics.revenue_by_date.map((item) =>
+            item.date === date ? { ...item, total: item.total + total } : item
+          )
+        : [...metrics.revenue_by_date, { date, total }]
+      const top_products = metrics.top_products.map((product) => {
+        const item = order.items.find((entry) => entry.product_id === product.product_id)
+        return item
+          ? {
+              ...product,
+              quantity: product.quantity + item.quantity,
+              revenue: product.revenue + item.price * item.quantity,
+            }
+          : product
+      })
+      top_products.sort((a, b) => b.revenue - a.revenue)
+      return { ...metrics, revenue_by_date, top_products }
+    })
+  }
+  return true
+}
+
 function OrdersManagement() {
   const queryClient = useQueryClient()
   const [filters, setFilters] = useState({
@@ -345,6 +442,7 @@ function OrdersManagement() {
     search: '',
     startDate: '',
     endDate: '',
+    includeArchived: false,
   })
   const [selectedOrder, setSelectedOrder] = useState(null)
 
@@ -366,16 +464,35 @@ function OrdersManagement() {
         ...(filters.search && { search: filters.search }),
         ...(filters.startDate && { start_date: filters.startDate }),
         ...(filters.endDate && { end_date: filters.endDate }),
+        ...(filters.includeArchived && { include_archived: true }),
       }),
   })
 
+  const invalidateOrders = () => {
+    queryClient.invalidateQueries(['orders', 'admin'])
+    queryClient.invalidateQueries(['orders', 'summary'])
+    queryClient.invalidateQueries(['orders', 'metrics'])
+  }
+
+  // Live updates: patch the cached queries per event, reload only when the
+  // feed lost its place (reset) or the change can't be applied locally
+  useEffect(
+    () =>
+      subscribeOrderEvents((type, data) => {
+        if (type === 'ready') return
+        if (type === 'reset' || !applyOrderEvent(queryClient, type, data.order_id, data.order)) {
+          invalidateOrders()
+        }
+      }),
+    [queryClient]
+  )
+
   const updateStatusMutation = useMutation({
     mutationFn: ({ id, status, note }) => updateOrderStatus(id, { status, note }),
-    onSuccess: () => {
+    onSuccess: (order) => {
       toast.success('Cập nhật trạng thái thành công')
-      queryClient.invalidateQueries(['orders', 'admin'])
-      queryClient.invalidateQueries(['orders', 'summary'])
-      queryClient.invalidateQueries(['orders', 'metrics'])
+      // The feed delivers the same change; applying it twice is a no-op
+      if (!applyOrderEvent(queryClient, 'updated', order.id, order)) invalidateOrders()
     },
     onError: (error) => {
       toast.error(error.response?.data?.detail || 'Không thể cập nhật trạng thái')
@@ -446,7 +563,7 @@ function OrdersManagement() {
           )}
         </div>
         <div className="bg-white p-4 rounded-lg shadow-md h-72">
-          <p className="font-semibold mb-4">Top sản phẩm theo doanh thu</p>
+          <p className="font-semibold mb-4">Top sản phẩm theo doanh thu 7 ngày gần nhất</p>
           {metrics?.top_products?.length ? (
             <ResponsiveContainer width="100%" height="100%">
               <BarChart data={metrics.top_products}>
@@ -469,7 +586,7 @@ function OrdersManagement() {
             <h3 className="text-xl font-semibold">Danh sách đơn hàng</h3>
             <p className="text-sm text-gray-500">Quản lý chi tiết từng đơn</p>
           </div>
-          <div className="grid grid-cols-1 md:grid-cols-4 gap-3 w-full lg:w-auto">
+          <div className="grid grid-cols-1 md:grid-cols-5 gap-3 w-full lg:w-auto">
             <div>
               <label className="text-xs text-gray-500">Trạng thái</label>
               <select
@@ -513,6 +630,14 @@ function OrdersManagement() {
                 className="w-full border border-gray-300 rounded-lg px-3 py-2"
               />
             </div>
+            <label className="flex items-center gap-2 text-sm text-gray-600 md:pb-2">
+              <input
+                type="checkbox"
+                checked={filters.includeArchived}
+                onChange={(e) => handleFilterChange('includeArchived', e.target.checked)}
+              />
+              Gồm đơn đã lưu trữ
+            </label>
           </div>
         </div>
 
@@ -549,7 +674,7 @@ function OrdersManagement() {
                         className="border border-gray-300 rounded-lg px-2 py-1 text-sm capitalize"
                         value={order.status}
                         onChange={(e) => handleStatusChange(order, e.target.value)}
-                        disabled={updateStatusMutation.isPending}
+                        disabled={updateStatusMutation.isPending || !!order.archived_at}
                       >
                         {ORDER_STATUSES.map((status) => (
                           <option key={status.value} value={status.value}>
@@ -1,14 +1,24 @@
 import { Link } from 'react-router-dom'
 import { useQuery } from '@tanstack/react-query'
-import { getProducts } from '../api/products'
+import { getProducts, getTrendingProducts } from '../api/products'
 import ProductCard from '../components/ProductCard'
 
 export default function Home() {
-  const { data, isLoading } = useQuery({
-    queryKey: ['products', 'featured'],
-    queryFn: () => getProducts({ limit: 8, sort: 'rating', order: 'desc' }),
+  const { data: trending, isLoading: trendingLoading } = useQuery({
+    queryKey: ['products', 'trending'],
+    queryFn: () => getTrendingProducts({ limit: 8 }),
   })
 
+  // No sales yet (fresh install): show the newest products instead
+  const { data: newest, isLoading: newestLoading } = useQuery({
+    queryKey: ['products', 'newest'],
+    queryFn: () => getProducts({ limit: 8 }),
+    enabled: trending?.length === 0,
+  })
+
+  const products = trending?.length ? trending : newest?.items
+  const isLoading = trendingLoading || (trending?.length === 0 && newestLoading)
+
   return (
     <div>
       {/* Hero Section */}
@@ -27,7 +37,7 @@ export default function Home() {
 
       {/* Featured Products */}
       <section>
-        <h2 className="text-3xl font-bold mb-6">Sản phẩm nổi bật</h2>
+        <h2 className="text-3xl font-bold mb-6">Sản phẩm bán chạy</h2>
         
         {isLoading ? (
           <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6">
@@ -43,7 +53,7 @@ export default function Home() {
           </div>
         ) : (
           <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6">
-            {data?.items?.map((product) => (
+            {products?.map((product) => (
               <ProductCard key={product.id} product={product} />
             ))}
           </div>
@@ -1,3 +1,4 @@
+import { useState } from 'react'
 import { useQuery } from '@tanstack/react-query'
 import { Navigate } from 'react-router-dom'
 import { isAuthenticated } from '../api/auth'
@@ -5,13 +6,25 @@ import { getOrders } from '../api/orders'
 
 export default function Orders() {
   const authenticated = isAuthenticated()
+  const [includeArchived, setIncludeArchived] = useState(false)
 
   const { data: orders = [], isLoading } = useQuery({
-    queryKey: ['orders'],
-    queryFn: getOrders,
+    queryKey: ['orders', { includeArchived }],
+    queryFn: () => getOrders(includeArchived ? { include_archived: true } : {}),
     enabled: authenticated,
   })
 
+  const archivedToggle = (
+    <label className="flex items-center gap-2 text-sm text-gray-600">
+      <input
+        type="checkbox"
+        checked={includeArchived}
+        onChange={(e) => setIncludeArchived(e.target.checked)}
+      />
+      Hiện cả đơn hàng cũ
+    </label>
+  )
+
   if (!authenticated) {
     return <Navigate to="/login" replace />
   }
@@ -35,13 +48,17 @@ export default function Orders() {
     return (
       <div className="text-center py-12">
         <p className="text-gray-600 text-lg mb-4">Bạn chưa có đơn hàng nào.</p>
+        {!includeArchived && <div className="flex justify-center">{archivedToggle}</div>}
       </div>
     )
   }
 
   return (
     <div>
-      <h1 className="text-3xl font-bold mb-6">Đơn hàng đã đặt</h1>
+      <div className="flex items-center justify-between mb-6">
+        <h1 className="text-3xl font-bold">Đơn hàng đã đặt</h1>
+        {archivedToggle}
+      </div>
       <div className="space-y-4">
         {orders.map((order) => (
           <div key={order.id} className="bg-white p-6 rounded-lg shadow-md">
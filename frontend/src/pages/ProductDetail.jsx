@@ -1,6 +1,10 @@
+import { useState } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
-import { getProduct } from '../api/products'
+import { getProduct, getRelatedProducts } from '../api/products'
+import { getReviews, createReview } from '../api/reviews'
+import ProductCard from '../components/ProductCard'
+import Pagination from '../components/Pagination'
 import { addToCart } from '../api/cart'
 import { FaStar, FaShoppingCart, FaArrowLeft } from 'react-icons/fa'
 import { isAuthenticated } from '../api/auth'
@@ -16,6 +20,31 @@ export default function ProductDetail() {
     queryFn: () => getProduct(id),
   })
 
+  const { data: related = [] } = useQuery({
+    queryKey: ['product', id, 'related'],
+    queryFn: () => getRelatedProducts(id),
+  })
+
+  const [reviewPage, setReviewPage] = useState(1)
+  const [reviewForm, setReviewForm] = useState({ rating: 5, comment: '' })
+
+  const { data: reviews } = useQuery({
+    queryKey: ['product', id, 'reviews', reviewPage],
+    queryFn: () => getReviews(id, { page: reviewPage, limit: 5 }),
+  })
+
+  const reviewMutation = useMutation({
+    mutationFn: (data) => createReview(id, data),
+    onSuccess: () => {
+      toast.success('Cảm ơn bạn đã đánh giá!')
+      setReviewForm({ rating: 5, comment: '' })
+      queryClient.invalidateQueries(['product', id])
+    },
+    onError: (error) => {
+      toast.error(error.response?.data?.detail || 'Không thể gửi đánh giá')
+    },
+  })
+
   const addToCartMutation = useMutation({
     mutationFn: (quantity) => addToCart(id, quantity),
     onSuccess: () => {
@@ -211,6 +240,99 @@ export default function ProductDetail() {
           </button>
         </div>
       </div>
+
+      <div className="mt-12">
+        <h2 className="text-2xl font-bold mb-6">Đánh giá sản phẩm</h2>
+        <div className="grid md:grid-cols-3 gap-8">
+          <div>
+            <p className="text-4xl font-bold mb-2">{product.rating.toFixed(1)}</p>
+            <p className="text-gray-600 mb-4">{product.reviews_count} đánh giá</p>
+            {[5, 4, 3, 2, 1].map((stars) => {
+              const count = product.rating_histogram?.[stars] || 0
+              const width = product.reviews_count ? (count / product.reviews_count) * 100 : 0
+              return (
+                <div key={stars} className="flex items-center text-sm mb-1">
+                  <span className="w-6">{stars}</span>
+                  <FaStar className="text-yellow-400 mr-2" />
+                  <div className="flex-1 h-2 bg-gray-200 rounded">
+                    <div className="h-2 bg-yellow-400 rounded" style={{ width: `${width}%` }}></div>
+                  </div>
+                  <span className="w-12 text-right text-gray-600">{count}</span>
+                </div>
+              )
+            })}
+
+            {isAuthenticated() && (
+              <form
+                className="mt-6 space-y-2"
+                onSubmit={(e) => {
+                  e.preventDefault()
+                  reviewMutation.mutate(reviewForm)
+                }}
+              >
+                <select
+                  value={reviewForm.rating}
+                  onChange={(e) => setReviewForm({ ...reviewForm, rating: Number(e.target.value) })}
+                  className="w-full px-3 py-2 border rounded-lg"
+                >
+                  {[5, 4, 3, 2, 1].map((stars) => (
+                    <option key={stars} value={stars}>{stars} sao</option>
+                  ))}
+                </select>
+                <textarea
+                  value={reviewForm.comment}
+                  onChange={(e) => setReviewForm({ ...reviewForm, comment: e.target.value })}
+                  placeholder="Nhận xét của bạn"
+                  rows={3}
+                  className="w-full px-3 py-2 border rounded-lg"
+                />
+                <button
+                  type="submit"
+                  disabled={reviewMutation.isPending}
+                  className="w-full bg-blue-600 text-white py-2 rounded-lg hover:bg-blue-700 transition disabled:opacity-50"
+                >
+                  Gửi đánh giá
+                </button>
+              </form>
+            )}
+          </div>
+
+          <div className="md:col-span-2 space-y-4">
+            {reviews?.items.length === 0 && (
+              <p className="text-gray-600">Chưa có đánh giá nào</p>
+            )}
+            {reviews?.items.map((review) => (
+              <div key={review.id} className="border-b pb-4">
+                <div className="flex items-center mb-1">
+                  <span className="font-semibold mr-2">{review.username}</span>
+                  <span className="flex text-yellow-400">
+                    {Array.from({ length: review.rating }, (_, i) => <FaStar key={i} />)}
+                  </span>
+                  <span className="ml-auto text-sm text-gray-500">
+                    {new Date(review.created_at).toLocaleDateString('vi-VN')}
+                  </span>
+                </div>
+                {review.title && <p className="font-medium">{review.title}</p>}
+                {review.comment && <p className="text-gray-600 whitespace-pre-line">{review.comment}</p>}
+              </div>
+            ))}
+            {reviews && (
+              <Pagination page={reviews.page} pages={reviews.pages} onPageChange={setReviewPage} />
+            )}
+          </div>
+        </div>
+      </div>
+
+      {related.length > 0 && (
+        <div className="mt-12">
+          <h2 className="text-2xl font-bold mb-6">Thường được mua cùng</h2>
+          <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6">
+            {related.map((item) => (
+              <ProductCard key={item.id} product={item} />
+            ))}
+          </div>
+        </div>
+      )}
     </div>
   )
 }
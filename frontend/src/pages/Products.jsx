@@ -34,6 +34,14 @@ export default function Products() {
       }),
   })
 
+  const handleSearch = (query) => {
+    setSearchQuery(query)
+    // Search results come best match first; back to newest when cleared
+    setSort(query ? 'relevance' : 'created_at')
+    setOrder('desc')
+    setPage(1)
+  }
+
   const handleFilterChange = (newFilters) => {
     setFilters(newFilters)
     setPage(1) // Reset to first page when filters change
@@ -43,7 +51,7 @@ export default function Products() {
     <div>
       <div className="flex items-center justify-between mb-6">
         <h1 className="text-3xl font-bold">Sản phẩm</h1>
-        <SearchBar onSearch={setSearchQuery} />
+        <SearchBar onSearch={handleSearch} />
       </div>
 
       <div className="flex gap-6">
@@ -71,6 +79,7 @@ export default function Products() {
                 }}
                 className="px-3 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500"
               >
+                {searchQuery && <option value="relevance-desc">Liên quan nhất</option>}
                 <option value="created_at-desc">Mới nhất</option>
                 <option value="created_at-asc">Cũ nhất</option>
                 <option value="price-asc">Giá: Thấp → Cao</option>